@@ -0,0 +1,211 @@
+# Import libraries.
+import glob
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+
+from contextlib import closing
+from typing import Any, Callable, Dict, Optional
+
+
+# Version of the store layout and payload encoding; bump on incompatible changes.
+STORE_FORMAT = 1
+
+# Default size budget of the stored payloads, in bytes.
+DEFAULT_STORE_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aggregates (
+    version TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    generation TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (version, signature)
+)
+"""
+
+
+def code_generation(directory: str) -> str:
+    """Fingerprint the Python sources of a directory and the store format.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the modules that compute the stored aggregates.
+
+    Returns
+    -------
+    str
+        A 16 character hex token that changes whenever any of the modules
+        changes.
+
+    Purpose
+    -------
+    Data versions only cover the source file and the selections, not the code
+    that turns them into aggregates. Stamping every entry with the code
+    generation keeps a deploy that changes the loader or a chart from serving
+    results of the old code.
+    """
+    digest = hashlib.sha1(f"format={STORE_FORMAT}".encode("utf-8"))
+    for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+        with open(path, "rb") as source:
+            digest.update(os.path.basename(path).encode("utf-8"))
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+class AggregateStore:
+    """On-disk store of computed aggregates, keyed by data version and query.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite database; created if missing.
+    generation : str
+        Code generation of the entries, see ``code_generation``. Entries of
+        other generations are deleted when the store is opened.
+    max_bytes : int
+        Size budget of the stored payloads. The least recently used entries
+        are evicted when a write exceeds it.
+
+    Purpose
+    -------
+    Streamlit's caches live in the server process, so every restart or deploy
+    recomputes every aggregate and chart on the first requests. Results are
+    also written here, keyed by the version token of the data and a signature
+    of the query, and read before recomputing, so a restarted server answers
+    the charts it has seen before from disk. The store is best effort: if the
+    database cannot be read or written, results are simply recomputed.
+    """
+
+    def __init__(
+        self, path: str, generation: str, max_bytes: int = DEFAULT_STORE_BYTES
+    ) -> None:
+        self.path = path
+        self.generation = generation
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with closing(self._connect()) as connection, connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(_SCHEMA)
+                connection.execute(
+                    "DELETE FROM aggregates WHERE generation != ?", (generation,)
+                )
+        except (sqlite3.Error, OSError):
+            # Every read and write then falls back to recomputing
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; one per call, so any thread may use the store."""
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, version: str, signature: str) -> Any:
+        """Return a stored result and mark it as recently used.
+
+        Raises
+        ------
+        KeyError
+            If there is no readable entry for the key.
+        """
+        try:
+            with closing(self._connect()) as connection, connection:
+                row = connection.execute(
+                    "SELECT payload FROM aggregates "
+                    "WHERE version = ? AND signature = ? AND generation = ?",
+                    (version, signature, self.generation),
+                ).fetchone()
+                if row is not None:
+                    connection.execute(
+                        "UPDATE aggregates SET last_used = ? "
+                        "WHERE version = ? AND signature = ?",
+                        (time.time(), version, signature),
+                    )
+        except (sqlite3.Error, OSError):
+            row = None
+        if row is None:
+            raise KeyError((version, signature))
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            # E.g. a payload pickled by an older version of a library
+            raise KeyError((version, signature))
+
+    def put(self, version: str, signature: str, value: Any) -> None:
+        """Store a result, evicting the least recently used entries over budget."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        version,
+                        signature,
+                        self.generation,
+                        sqlite3.Binary(payload),
+                        len(payload),
+                        time.time(),
+                    ),
+                )
+                # Keep the most recently used entries that fit in the budget
+                connection.execute(
+                    "DELETE FROM aggregates WHERE rowid IN ("
+                    " SELECT rowid FROM ("
+                    "  SELECT rowid, SUM(size) OVER ("
+                    "   ORDER BY last_used DESC, rowid DESC"
+                    "  ) AS kept FROM aggregates"
+                    " ) WHERE kept > ?"
+                    ")",
+                    (self.max_bytes,),
+                )
+        except (sqlite3.Error, OSError):
+            # A read-only or full disk only costs recomputing after a restart
+            pass
+
+    def fetch(self, version: str, signature: str, compute: Callable[[], Any]) -> Any:
+        """Return the stored result for a key, computing and storing it on a miss.
+
+        Parameters
+        ----------
+        version : str
+            Version token of the data the result is computed from.
+        signature : str
+            Query signature, unique per aggregate and parameters, e.g. from
+            ``data_layer.query_signature``.
+        compute : Callable[[], Any]
+            Computes the result; only called on a miss. The result must be
+            picklable.
+
+        Returns
+        -------
+        Any
+            The stored or computed result.
+        """
+        try:
+            value = self.get(version, signature)
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            self.put(version, signature, value)
+            return value
+        self.hits += 1
+        return value
+
+    def stats(self) -> Optional[Dict[str, int]]:
+        """Return the number of entries and stored bytes, or None if unreadable."""
+        try:
+            with closing(self._connect()) as connection:
+                entries, size = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM aggregates"
+                ).fetchone()
+        except (sqlite3.Error, OSError):
+            return None
+        return {"entries": int(entries), "bytes": int(size)}
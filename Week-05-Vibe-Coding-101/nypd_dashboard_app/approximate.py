@@ -0,0 +1,188 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from statistics import NormalDist
+from typing import Optional
+
+from selection import DataView, allocate_stratified
+
+
+# Confidence level of the error targets and of the intervals on chart counts.
+CONFIDENCE_LEVEL = 0.95
+
+# Error targets offered in approximate query mode, as the margin of error on a
+# share in percentage points.
+ERROR_TARGETS = [0.25, 0.5, 1.0, 2.0, 5.0]
+
+
+def z_value(confidence: float = CONFIDENCE_LEVEL) -> float:
+    """Return the two-sided standard normal quantile of a confidence level."""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def share_margin(
+    stratum_sizes: np.ndarray,
+    allocation: np.ndarray,
+    confidence: float = CONFIDENCE_LEVEL,
+) -> float:
+    """Return the worst-case margin of error on a share estimated from a sample.
+
+    Parameters
+    ----------
+    stratum_sizes : np.ndarray
+        Number of selected rows in each stratum. A uniform sample is a single
+        stratum.
+    allocation : np.ndarray
+        Number of rows sampled from each stratum.
+    confidence : float
+        Confidence level of the margin.
+
+    Returns
+    -------
+    float
+        Half-width of the confidence interval on the share of any value, as a
+        fraction, assuming the worst case of a 50% share in every stratum.
+        Infinite if a non-empty stratum has no sampled rows.
+
+    Purpose
+    -------
+    This is the variance of a stratified estimate of a proportion without
+    replacement, with the finite population correction, so sampling most of a
+    small stratum yields a tight bound.
+    """
+    sizes = np.asarray(stratum_sizes, dtype=np.float64)
+    taken = np.asarray(allocation, dtype=np.float64)
+    present = sizes > 0
+    sizes, taken = sizes[present], taken[present]
+    if len(sizes) == 0:
+        return 0.0
+    if np.any(taken == 0):
+        return float("inf")
+    fpc = (sizes - taken) / np.maximum(sizes - 1, 1)
+    variance = np.sum((sizes / sizes.sum()) ** 2 * fpc * 0.25 / taken)
+    return z_value(confidence) * float(np.sqrt(variance))
+
+
+def required_sample_size(
+    stratum_sizes: np.ndarray,
+    margin: float,
+    confidence: float = CONFIDENCE_LEVEL,
+    min_per_stratum: int = 0,
+) -> int:
+    """Find the smallest sample whose worst-case share margin meets a target.
+
+    Parameters
+    ----------
+    stratum_sizes : np.ndarray
+        Number of selected rows in each stratum; a single entry for uniform
+        sampling.
+    margin : float
+        Target margin of error on a share, as a fraction (0.01 for 1 point).
+    confidence : float
+        Confidence level of the margin.
+    min_per_stratum : int
+        Minimum rows per stratum of the stratified sampler, see
+        ``selection.allocate_stratified``.
+
+    Returns
+    -------
+    int
+        The smallest sample size meeting the target, at most the number of
+        selected rows.
+
+    Purpose
+    -------
+    The margin shrinks as the sample grows, so the size is found by binary
+    search over the same allocation the sampler uses. This makes the accuracy
+    versus latency trade-off explicit: a looser target loads fewer rows.
+    """
+    sizes = np.asarray(stratum_sizes, dtype=np.int64)
+    total = int(sizes.sum())
+    low, high = 1, max(total, 1)
+    while low < high:
+        middle = (low + high) // 2
+        allocation = allocate_stratified(sizes, middle, min_per_stratum)
+        if share_margin(sizes, allocation, confidence) <= margin:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def estimate_count_intervals(
+    view: DataView, column: str, confidence: float = CONFIDENCE_LEVEL
+) -> Optional[pd.DataFrame]:
+    """Estimate the counts of one column with confidence intervals.
+
+    Parameters
+    ----------
+    view : DataView
+        An approximate-query sample, or a view of it narrowed by any filter.
+    column : str
+        Column whose values are counted.
+    confidence : float
+        Confidence level of the intervals.
+
+    Returns
+    -------
+    Optional[pd.DataFrame]
+        Columns ``Estimate``, ``Lower`` and ``Upper`` indexed by value, sorted by
+        descending estimate, or None if the view is not an approximate-query
+        sample and its counts are exact.
+
+    Purpose
+    -------
+    Estimates are the weighted counts of ``WEIGHT_COLUMN``. Their variance is
+    summed over strata: within a stratum, the count of a value is a scaled
+    share of a sample drawn without replacement. A narrowed view is a domain
+    of the sample, whether its filter drops whole strata or cuts inside them
+    (e.g. a month or a PD description), so shares are taken over all rows
+    sampled from each stratum, as recorded in the sample design.
+    """
+    design = view.design
+    if design is None:
+        return None
+
+    if design.stratified:
+        stratum = design.strata_codes[view.positions()].astype(np.int64)
+        sampled = design.stratum_sampled.astype(np.float64)
+        population = design.stratum_population.astype(np.float64)
+    else:
+        stratum = np.zeros(len(view), dtype=np.int64)
+        sampled = np.array([design.sample_rows], dtype=np.float64)
+        population = np.array([design.population], dtype=np.float64)
+
+    # Count every value within every stratum in one pass
+    codes, values = pd.factorize(view[column])
+    valid = codes >= 0
+    cells = stratum[valid] * len(values) + codes[valid]
+    counts = np.bincount(cells, minlength=len(sampled) * len(values))
+    counts = counts.reshape(len(sampled), len(values))
+
+    # Strata without sampled rows have no rows in any view of the sample
+    sampled_rows = np.maximum(sampled, 1)
+    share = counts / sampled_rows[:, None]
+    fpc = np.clip(1 - sampled / np.maximum(population, 1), 0, 1)
+    variance = (
+        population[:, None] ** 2
+        * fpc[:, None]
+        * share
+        * (1 - share)
+        / np.maximum(sampled - 1, 1)[:, None]
+    )
+    estimate = (counts * (population / sampled_rows)[:, None]).sum(axis=0)
+    half_width = z_value(confidence) * np.sqrt(variance.sum(axis=0))
+
+    index = pd.Index(values)
+    if isinstance(index, pd.CategoricalIndex):
+        index = index.astype(index.categories.dtype)
+    intervals = pd.DataFrame(
+        {
+            "Estimate": estimate,
+            "Lower": np.maximum(estimate - half_width, 0),
+            "Upper": estimate + half_width,
+        },
+        index=index,
+    )
+    return intervals.sort_values("Estimate", ascending=False)
@@ -0,0 +1,457 @@
+# Import libraries.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from typing import Any, Callable, List, Sequence, Tuple
+
+from catalog import build_catalog, update_catalog
+from charts import (
+    AGE_COLORS,
+    DOW_COLORS,
+    DOW_ORDER,
+    MONTH_COLORS,
+    MONTH_NAMES,
+    RACE_COLORS,
+    age_bar_chart,
+    day_of_week_bar_chart,
+    figure_payload_size,
+    monthly_bar_chart,
+    race_bar_chart,
+)
+from count_cube import build_count_cube, check_cube_consistency, update_count_cube
+from crosstab import count_combinations
+from data_layer import fingerprint_source
+from loader_stages import (
+    append_loader_stages,
+    appended_offset,
+    run_loader_stages,
+    source_signature,
+)
+from shard_aggregation import ShardExecutor, SharedCodeMatrix
+
+
+# Offenses of the synthetic source: offense, PD description, law category and
+# relative frequency.
+SYNTHETIC_OFFENSES = [
+    ("ASSAULT 3 & RELATED OFFENSES", "ASSAULT 3", "M", 30),
+    ("FELONY ASSAULT", "ASSAULT 2,1,UNCLASSIFIED", "F", 10),
+    ("PETIT LARCENY", "LARCENY,PETIT FROM STORE", "M", 20),
+    ("GRAND LARCENY", "LARCENY,GRAND FROM PERSON", "F", 8),
+    ("DANGEROUS DRUGS", "CONTROLLED SUBSTANCE, POSSESSION 7", "M", 15),
+    ("DANGEROUS DRUGS", "CONTROLLED SUBSTANCE,SALE 5", "F", 5),
+    ("VEHICLE AND TRAFFIC LAWS", "TRAFFIC,UNCLASSIFIED MISDEMEAN", "M", 10),
+    ("OTHER STATE LAWS", None, "V", 2),
+]
+
+
+def synthetic_source(
+    n_rows: int, seed: int = 0, first_key: int = 10_000_000
+) -> pd.DataFrame:
+    """Generate arrests in the layout of the NYC Open Data source file.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of arrests.
+    seed : int
+        Seed of the random generator.
+    first_key : int
+        Smallest ``arrest_key``; keys are consecutive from it.
+
+    Returns
+    -------
+    pd.DataFrame
+        The arrests, with the source's lower-case column names, in random date
+        order. Some PD descriptions and coordinates are missing, as in the
+        real data.
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.array([offense[3] for offense in SYNTHETIC_OFFENSES], dtype=float)
+    offenses = rng.choice(len(SYNTHETIC_OFFENSES), n_rows, p=weights / weights.sum())
+    dates = pd.Timestamp("2006-01-01") + pd.to_timedelta(
+        rng.integers(0, 6900, n_rows), unit="D"
+    )
+    source = pd.DataFrame(
+        {
+            "arrest_key": np.arange(first_key, first_key + n_rows),
+            "arrest_date": dates.strftime("%Y-%m-%dT00:00:00.000"),
+            "pd_desc": [SYNTHETIC_OFFENSES[i][1] for i in offenses],
+            "ofns_desc": [SYNTHETIC_OFFENSES[i][0] for i in offenses],
+            "law_cat_cd": [SYNTHETIC_OFFENSES[i][2] for i in offenses],
+            "arrest_boro": rng.choice(
+                list("BKMQS"), n_rows, p=[0.22, 0.3, 0.25, 0.19, 0.04]
+            ),
+            "jurisdiction_code": rng.choice([0, 1, 2], n_rows),
+            "age_group": rng.choice(
+                ["18-24", "25-44", "45-64", "65+", "<18"],
+                n_rows,
+                p=[0.25, 0.45, 0.2, 0.03, 0.07],
+            ),
+            "perp_sex": rng.choice(["M", "F", "U"], n_rows, p=[0.82, 0.17, 0.01]),
+            "perp_race": rng.choice(
+                [
+                    "BLACK",
+                    "WHITE HISPANIC",
+                    "WHITE",
+                    "BLACK HISPANIC",
+                    "ASIAN / PACIFIC ISLANDER",
+                ],
+                n_rows,
+                p=[0.45, 0.25, 0.15, 0.1, 0.05],
+            ),
+            "latitude": 40.5 + rng.random(n_rows) * 0.4,
+            "longitude": -74.2 + rng.random(n_rows) * 0.5,
+        }
+    )
+    source.loc[rng.random(n_rows) < 0.001, "latitude"] = np.nan
+    return source
+
+
+def check_incremental_update(n_rows: int, appended_rows: int) -> List[str]:
+    """Append rows to a source file and compare the incremental load with a rebuild.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of arrests in the first version of the source file.
+    appended_rows : int
+        Number of arrests appended to it; one in a hundred repeats an arrest
+        key of the first version and must be dropped.
+
+    Returns
+    -------
+    List[str]
+        A description of every difference between the incrementally updated
+        dataset, count cube and catalog and those of a full rebuild of the
+        appended file; empty if they agree. Retracting the appended rows from
+        the updated cube must also give back the first version's cube.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "arrests.csv")
+        synthetic_source(n_rows).to_csv(file_path, index=False)
+        first_version = fingerprint_source(file_path)
+        first, _ = run_loader_stages(file_path, first_version)
+        first_cube = build_count_cube(first)
+        first_catalog = build_catalog(
+            first, first_version, source=source_signature(file_path)
+        )
+
+        batch = synthetic_source(appended_rows, seed=1, first_key=20_000_000)
+        repeated = np.arange(0, appended_rows, 100)
+        batch.loc[repeated, "arrest_key"] = 10_000_000 + repeated
+        batch.to_csv(file_path, mode="a", header=False, index=False)
+        version = fingerprint_source(file_path)
+
+        problems = []
+        start = time.perf_counter()
+        offset = appended_offset(file_path, first_catalog["source"])
+        appended = None
+        if offset is not None:
+            appended = append_loader_stages(file_path, version, first_version, offset)
+        if appended is None:
+            return ["The appended file was not recognized as an append"]
+        merged, rows = appended
+        cube = update_count_cube(first_cube, rows)
+        catalog = update_catalog(
+            first_catalog, rows, merged, version, source_signature(file_path)
+        )
+        incremental_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rebuilt, _ = run_loader_stages(
+            file_path, version, cache_dir=os.path.join(directory, "rebuild")
+        )
+        rebuilt_catalog = build_catalog(
+            rebuilt, version, source=source_signature(file_path)
+        )
+        build_count_cube(rebuilt)
+        rebuild_seconds = time.perf_counter() - start
+
+        expected_rows = appended_rows - len(repeated)
+        if len(rows) != expected_rows:
+            problems.append(f"{len(rows):,} appended rows instead of {expected_rows:,}")
+        if not merged.equals(rebuilt):
+            problems.append("The appended dataset differs from a rebuild")
+        problems += check_cube_consistency(cube, rebuilt)
+        problems += [
+            f"Retraction: {problem}"
+            for problem in check_cube_consistency(
+                update_count_cube(cube, rows, retract=True), first
+            )
+        ]
+        for key in ["rows", "distinct", "date_range", "columns", "duplicates"]:
+            if catalog[key] != rebuilt_catalog[key]:
+                problems.append(f"Catalog {key} differs from a rebuild")
+        if sorted(catalog["offense_paths"]) != sorted(rebuilt_catalog["offense_paths"]):
+            problems.append("Catalog offense paths differ from a rebuild")
+
+    print(
+        f"Appended {len(rows):,} rows to {len(first):,}: incremental update "
+        f"{incremental_seconds:.2f} s, full rebuild {rebuild_seconds:.2f} s"
+    )
+    return problems
+
+
+def _per_trace_bar_chart(
+    labels: List[Any], values: Any, colors: List[str], title: str, xaxis_title: str
+) -> go.Figure:
+    """Build a bar chart with one trace per bar, as the tabs did before ``charts``."""
+    fig = go.Figure()
+    for label, value, color in zip(labels, values, colors):
+        fig.add_trace(
+            go.Bar(
+                x=[label],
+                y=[value],
+                name=label,
+                marker_color=color,
+                showlegend=False,
+            )
+        )
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title="Number of Arrests",
+        height=400,
+        showlegend=False,
+    )
+    return fig
+
+
+def _per_trace_race_chart(race_counts: pd.Series) -> go.Figure:
+    """Build the race chart with ``px.bar`` and per-trace colors, as before ``charts``."""
+    races = race_counts.rename_axis("Race").reset_index(name="Arrests")
+    fig = px.bar(
+        races,
+        x="Race",
+        y="Arrests",
+        title="Top 10 Races by Number of Arrests",
+        color="Race",
+        color_discrete_map=RACE_COLORS,
+    )
+    fig.update_layout(xaxis_title="Race", yaxis_title="Number of Arrests", height=400)
+    for trace, race in zip(fig.data, races["Race"]):
+        trace.marker.color = RACE_COLORS.get(race, "#808080")
+    fig.update_traces(marker_line_width=0, opacity=0.8)
+    return fig
+
+
+def _mean_ms(build: Callable[[], go.Figure], repeats: int) -> float:
+    """Return the mean time of a figure build in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        build()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def benchmark_chart_payloads(repeats: int) -> Tuple[pd.DataFrame, List[str]]:
+    """Compare one trace per bar with the single-trace charts of ``charts``.
+
+    Parameters
+    ----------
+    repeats : int
+        Number of builds each build time is averaged over.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, List[str]]
+        Per chart, the number of traces, mean build time and serialized payload
+        size (``charts.figure_payload_size``) of both builders, for 12 months,
+        7 days, 5 age groups and 5 races of synthetic counts; and a description
+        of every chart whose single-trace build is not one trace with a smaller
+        payload.
+    """
+    source = synthetic_source(100_000)
+    dates = pd.to_datetime(source["arrest_date"])
+    month_counts = dates.dt.month.value_counts()
+    dow_counts = dates.dt.day_name().value_counts()
+    age_counts = source["age_group"].value_counts()
+    race_counts = source["perp_race"].value_counts()
+
+    months = [MONTH_NAMES[month] for month in sorted(month_counts.index)]
+    days = [day for day in DOW_ORDER if day in dow_counts.index]
+    builders = {
+        "monthly": (
+            lambda: _per_trace_bar_chart(
+                months,
+                month_counts.sort_index().to_numpy(),
+                [MONTH_COLORS[month] for month in months],
+                "Number of Arrests Per Month",
+                "Month",
+            ),
+            lambda: monthly_bar_chart(month_counts),
+        ),
+        "day of week": (
+            lambda: _per_trace_bar_chart(
+                days,
+                dow_counts.reindex(days).to_numpy(),
+                [DOW_COLORS[day] for day in days],
+                "Number of Arrests Per Day",
+                "Day of Week",
+            ),
+            lambda: day_of_week_bar_chart(dow_counts),
+        ),
+        "age group": (
+            lambda: _per_trace_bar_chart(
+                list(age_counts.index),
+                age_counts.to_numpy(),
+                [AGE_COLORS[age] for age in age_counts.index],
+                "Arrests by Age Group",
+                "Age Group",
+            ),
+            lambda: age_bar_chart(age_counts),
+        ),
+        "race": (
+            lambda: _per_trace_race_chart(race_counts),
+            lambda: race_bar_chart(race_counts),
+        ),
+    }
+
+    results = []
+    problems = []
+    for chart, (per_trace, single_trace) in builders.items():
+        per_trace_fig, single_trace_fig = per_trace(), single_trace()
+        result = {
+            "Chart": chart,
+            "Traces (per bar)": len(per_trace_fig.data),
+            "Traces (single)": len(single_trace_fig.data),
+            "Build ms (per bar)": _mean_ms(per_trace, repeats),
+            "Build ms (single)": _mean_ms(single_trace, repeats),
+            "Payload B (per bar)": figure_payload_size(per_trace_fig),
+            "Payload B (single)": figure_payload_size(single_trace_fig),
+        }
+        if result["Traces (single)"] != 1:
+            problems.append(f"The {chart} chart has {result['Traces (single)']} traces")
+        if result["Payload B (single)"] >= result["Payload B (per bar)"]:
+            problems.append(f"The single-trace {chart} chart has a larger payload")
+        results.append(result)
+    return pd.DataFrame(results), problems
+
+
+def benchmark_shards(
+    n_rows: int,
+    worker_counts: Sequence[int],
+    cardinalities: Sequence[int] = (70, 5, 6, 12),
+    repeats: int = 3,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """Time a crosstab of synthetic codes counted in shards with several pool sizes.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of the synthetic dataset.
+    worker_counts : Sequence[int]
+        Pool sizes of ``shard_aggregation.ShardExecutor`` to time.
+    cardinalities : Sequence[int]
+        Number of distinct values of each crosstab dimension.
+    repeats : int
+        Runs per pool size; the fastest is reported.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, List[str]]
+        Per pool size, the seconds of a crosstab of every row, of a view of
+        every other row and of that view weighted as an approximate-query
+        sample, with the speedup of the full crosstab over the first pool size;
+        and a description of every pool size whose counts differ from a single
+        ``crosstab.count_combinations`` of the same rows.
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            f"d{i}": rng.integers(0, cardinality, n_rows, dtype=np.int32)
+            for i, cardinality in enumerate(cardinalities)
+        }
+    )
+    dimensions = list(df.columns)
+    matrix = SharedCodeMatrix(df, dimensions)
+    codes = [df[column].to_numpy() for column in dimensions]
+    positions = np.arange(0, n_rows, 2)
+    weights = rng.uniform(1, 3, len(positions))
+    selections = {
+        "All rows": (slice(None), None),
+        "View": (positions, None),
+        "Weighted view": (positions, weights),
+    }
+    expected = {
+        name: count_combinations(
+            [column[rows] for column in codes], cardinalities, row_weights
+        )
+        for name, (rows, row_weights) in selections.items()
+    }
+
+    results = []
+    problems = []
+    for workers in worker_counts:
+        executor = ShardExecutor(workers)
+        result = {"Workers": workers}
+        for name, (rows, row_weights) in selections.items():
+            # Check the counts on the first run, which also starts the workers
+            counts = executor.count(matrix, dimensions, rows, row_weights)
+            if not np.allclose(counts, expected[name]):
+                problems.append(f"{name} counted by {workers} workers differ")
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                executor.count(matrix, dimensions, rows, row_weights)
+                timings.append(time.perf_counter() - start)
+            result[f"{name} s"] = min(timings)
+        executor.shutdown()
+        results.append(result)
+
+    results = pd.DataFrame(results)
+    results["Speedup"] = results["All rows s"].iloc[0] / results["All rows s"]
+    return results, problems
+
+
+def main() -> None:
+    """Run a benchmark or check from the command line; exit with 1 on a failure."""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks and consistency checks of the dashboard's data layer"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    cube_update = commands.add_parser(
+        "cube-update",
+        help="compare an incremental load of appended rows with a full rebuild",
+    )
+    cube_update.add_argument("--rows", type=int, default=200_000)
+    cube_update.add_argument("--appended", type=int, default=5_000)
+    payloads = commands.add_parser(
+        "payloads",
+        help="compare build time and payload of one trace per bar with one trace",
+    )
+    payloads.add_argument("--repeats", type=int, default=30)
+    shards = commands.add_parser(
+        "shards", help="time crosstabs counted in shards per worker pool size"
+    )
+    shards.add_argument("--rows", type=int, default=6_000_000)
+    shards.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    shards.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "cube-update":
+        problems = check_incremental_update(args.rows, args.appended)
+    elif args.command == "payloads":
+        results, problems = benchmark_chart_payloads(args.repeats)
+        print(results.round(1).to_string(index=False))
+    elif args.command == "shards":
+        results, problems = benchmark_shards(
+            args.rows, args.workers, repeats=args.repeats
+        )
+        print(results.round(3).to_string(index=False))
+    for problem in problems:
+        print(f"FAILED: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from selection import DataView
+
+
+# Categorical columns that get a bitmap per distinct value. Columns with hundreds
+# of values, like PD_DESC, are left out: at n/8 bytes per value their bitmaps
+# would outgrow the dataset, and a drill-down to them only narrows rows already
+# selected by their offense.
+BITMAP_COLUMNS = [
+    "ARREST_BORO",
+    "OFNS_DESC",
+    "LAW_CAT_CD",
+    "AGE_GROUP_CLEAN",
+    "PERP_SEX",
+    "PERP_RACE",
+    "MONTH",
+    "DAY_OF_WEEK",
+]
+
+
+@dataclass(frozen=True)
+class BitmapIndex:
+    """Packed bitmaps of the rows holding each value of the indexed columns.
+
+    Attributes
+    ----------
+    n_rows : int
+        Number of rows of the indexed dataset.
+    bitmaps : Dict[str, Dict[Any, np.ndarray]]
+        Per column and value, the rows holding the value as a packed uint8 array
+        with one bit per row (little bit order).
+    present : Dict[str, np.ndarray]
+        Per column, the packed bitmap of rows with a non-missing value.
+    complete : Dict[str, bool]
+        Per column, whether every row has a value.
+
+    Purpose
+    -------
+    A filter on several columns becomes an OR of the selected values' bitmaps
+    within each column and an AND across columns, working on 1 bit per row
+    instead of comparing strings. Selecting every value of a column is
+    detected up front and skips that column altogether.
+    """
+
+    n_rows: int
+    bitmaps: Dict[str, Dict[Any, np.ndarray]]
+    present: Dict[str, np.ndarray]
+    complete: Dict[str, bool]
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by all bitmaps."""
+        return sum(
+            bitmap.nbytes
+            for column in self.bitmaps.values()
+            for bitmap in column.values()
+        ) + sum(bitmap.nbytes for bitmap in self.present.values())
+
+    def column_bitmap(self, column: str, values: Sequence) -> Optional[np.ndarray]:
+        """Return the bitmap of rows whose ``column`` is one of ``values``.
+
+        Returns None if ``values`` covers every value of a column without
+        missing values, i.e. the filter keeps all rows and can be skipped.
+        """
+        bitmaps = self.bitmaps[column]
+        selected = set(values)
+        chosen = [value for value in bitmaps if value in selected]
+        if len(chosen) == len(bitmaps):
+            return None if self.complete[column] else self.present[column]
+        if len(chosen) <= len(bitmaps) // 2:
+            result = np.zeros_like(self.present[column])
+            for value in chosen:
+                result |= bitmaps[value]
+            return result
+
+        # Most values are selected: clear the few unselected ones instead
+        result = self.present[column].copy()
+        for value, bitmap in bitmaps.items():
+            if value not in selected:
+                result &= ~bitmap
+        return result
+
+    def query(self, **filters: Optional[Sequence]) -> Optional[np.ndarray]:
+        """Return the bitmap of rows matching all filters.
+
+        Parameters
+        ----------
+        **filters : Optional[Sequence]
+            Allowed values per indexed column, e.g. ``ARREST_BORO=["K"]``. A
+            column given as None is not filtered.
+
+        Returns
+        -------
+        Optional[np.ndarray]
+            The packed bitmap, or None if no filter restricts the rows.
+        """
+        result = None
+        for column, values in filters.items():
+            if values is None:
+                continue
+            bitmap = self.column_bitmap(column, values)
+            if bitmap is None:
+                continue
+            result = bitmap if result is None else result & bitmap
+        return result
+
+    def mask(self, bitmap: np.ndarray, rows: Union[slice, np.ndarray]) -> np.ndarray:
+        """Read the bits of a bitmap at the given rows as a boolean mask.
+
+        Parameters
+        ----------
+        bitmap : np.ndarray
+            Packed bitmap from ``query``.
+        rows : Union[slice, np.ndarray]
+            Positional slice, or positions, of rows of the indexed dataset.
+        """
+        if isinstance(rows, slice):
+            bits = np.unpackbits(bitmap, count=self.n_rows, bitorder="little")
+            return bits[rows].view(bool)
+        rows = np.asarray(rows)
+        return ((bitmap[rows >> 3] >> (rows & 7).astype(np.uint8)) & 1).view(bool)
+
+
+def build_bitmap_index(
+    df: pd.DataFrame, columns: Optional[List[str]] = None
+) -> BitmapIndex:
+    """Build the bitmap index of a dataset.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The full dataset.
+    columns : Optional[List[str]]
+        Columns to index. Defaults to the ``BITMAP_COLUMNS`` present in ``df``.
+
+    Returns
+    -------
+    BitmapIndex
+        One bitmap per distinct non-missing value of every indexed column.
+    """
+    columns = columns if columns is not None else BITMAP_COLUMNS
+    bitmaps = {}
+    present = {}
+    complete = {}
+    for column in columns:
+        if column not in df.columns:
+            continue
+        codes, values = pd.factorize(df[column])
+        bitmaps[column] = {
+            value: np.packbits(codes == code, bitorder="little")
+            for code, value in enumerate(values)
+        }
+        present[column] = np.packbits(codes >= 0, bitorder="little")
+        complete[column] = bool(np.all(codes >= 0))
+    return BitmapIndex(len(df), bitmaps, present, complete)
+
+
+def filter_view(
+    view: DataView, index: Optional[BitmapIndex], **filters: Optional[Sequence]
+) -> DataView:
+    """Narrow a view of the full dataset to the rows matching the filters.
+
+    Parameters
+    ----------
+    view : DataView
+        A view of the dataset ``index`` was built from.
+    index : Optional[BitmapIndex]
+        Bitmap index of the full dataset. Filters on indexed columns are
+        applied with its bitmaps, the others with ``isin`` on the columns of
+        the view they narrowed, e.g. a PD description within an offense.
+    **filters : Optional[Sequence]
+        Allowed values per column, see ``BitmapIndex.query``.
+
+    Returns
+    -------
+    DataView
+        The narrowed view; ``view`` itself if no filter restricts the rows.
+    """
+    remaining = filters
+    if index is not None and len(view.source) == index.n_rows:
+        bitmap = index.query(
+            **{
+                column: values
+                for column, values in filters.items()
+                if column in index.bitmaps
+            }
+        )
+        if bitmap is not None:
+            view = view.subset(index.mask(bitmap, view.rows))
+        remaining = {
+            column: values
+            for column, values in filters.items()
+            if column not in index.bitmaps
+        }
+
+    mask = None
+    for column, values in remaining.items():
+        if values is not None:
+            selected = view[column].isin(values).to_numpy()
+            mask = selected if mask is None else mask & selected
+    if mask is None:
+        return view
+    return view[mask]
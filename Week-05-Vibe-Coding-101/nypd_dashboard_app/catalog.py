@@ -0,0 +1,232 @@
+# Import libraries.
+import json
+import os
+
+import pandas as pd
+
+from typing import Any, Dict, List, Optional
+
+from crosstab import frame_crosstab
+from offense_hierarchy import (
+    build_offense_hierarchy,
+    hierarchy_from_records,
+    merge_hierarchies,
+    offense_levels,
+)
+from quality_profile import build_quality_report
+
+
+# Columns whose distinct values are listed in the catalog, e.g. for selectbox options.
+CATALOG_COLUMNS = [
+    "ARREST_BORO",
+    "OFNS_DESC",
+    "LAW_CAT_CD",
+    "PD_DESC",
+    "AGE_GROUP_CLEAN",
+    "PERP_SEX",
+    "PERP_RACE",
+]
+
+# Bump when the layout of the catalog changes, so old files are rebuilt.
+CATALOG_FORMAT = 5
+
+
+def catalog_path(file_path: str) -> str:
+    """Return the path of the metadata catalog written next to a dataset file."""
+    return f"{os.path.splitext(file_path)[0]}.catalog.json"
+
+
+def build_catalog(
+    df: pd.DataFrame,
+    source_version: str,
+    optimized: bool = False,
+    source: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Summarize a loaded dataset into a small metadata catalog.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The full dataset as returned by the loader.
+    source_version : str
+        Fingerprint of the source file the dataset was loaded from.
+    optimized : bool
+        Whether the dataset was loaded with the memory downcasts applied, which
+        changes its columns and data types.
+    source : Optional[Dict[str, Any]]
+        Content hash of the source file from ``loader_stages.source_signature``,
+        which tells a later version with appended rows apart from a new file.
+
+    Returns
+    -------
+    Dict[str, Any]
+        JSON-serializable catalog with the sorted distinct values of
+        ``CATALOG_COLUMNS``, the first and last arrest date and the data
+        quality report of ``quality_profile.build_quality_report`` (row count,
+        duplicated rows and per-column metrics), so a catalog can be used
+        wherever a quality report is expected. If the dataset has every level
+        of the offense hierarchy, the arrests of each law category, offense and
+        PD description path are listed under ``offense_paths``.
+    """
+    quality = build_quality_report(df)
+    distinct = {
+        column: sorted(df[column].dropna().astype(str).unique())
+        for column in CATALOG_COLUMNS
+        if column in df.columns
+    }
+    date_range = None
+    if "ARREST_DATE" in df.columns:
+        dates = df["ARREST_DATE"].dropna()
+        if len(dates) > 0:
+            date_range = [dates.min().isoformat(), dates.max().isoformat()]
+    offense_paths = None
+    levels = offense_levels(df.columns)
+    if levels is not None:
+        offense_paths = build_offense_hierarchy(frame_crosstab(df, levels)).to_records()
+    return {
+        "format": CATALOG_FORMAT,
+        "source_version": source_version,
+        "optimized": optimized,
+        "source": source,
+        "rows": quality["rows"],
+        "duplicate_rows": quality["duplicate_rows"],
+        "duplicates": quality["duplicates"],
+        "columns": quality["columns"],
+        "distinct": distinct,
+        "date_range": date_range,
+        "offense_paths": offense_paths,
+    }
+
+
+def update_catalog(
+    catalog: Dict[str, Any],
+    rows: pd.DataFrame,
+    df: pd.DataFrame,
+    source_version: str,
+    source: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Carry a catalog over to a version of the dataset with rows appended.
+
+    Parameters
+    ----------
+    catalog : Dict[str, Any]
+        Catalog of the earlier version, from ``read_catalog``.
+    rows : pd.DataFrame
+        The rows added to the earlier version, e.g. from
+        ``loader_stages.append_loader_stages``.
+    df : pd.DataFrame
+        The full dataset of the new version.
+    source_version : str
+        Fingerprint of the source file of the new version.
+    source : Optional[Dict[str, Any]]
+        Content hash of that file, as in ``build_catalog``.
+
+    Returns
+    -------
+    Dict[str, Any]
+        The catalog of the new version, equal to ``build_catalog(df, ...)``.
+        The distinct values, date range and offense paths are merged with
+        those of ``rows``; only the quality report is computed from ``df``,
+        since its duplicate and distinct counts do not add up across batches.
+    """
+    quality = build_quality_report(df)
+    distinct = {
+        column: sorted(set(values) | set(rows[column].dropna().astype(str)))
+        for column, values in catalog["distinct"].items()
+        if column in rows.columns
+    }
+    date_range = catalog["date_range"]
+    if "ARREST_DATE" in rows.columns:
+        dates = rows["ARREST_DATE"].dropna()
+        if len(dates) > 0:
+            bounds = [dates.min(), dates.max()]
+            if date_range is not None:
+                bounds = [
+                    min(bounds[0], pd.Timestamp(date_range[0])),
+                    max(bounds[1], pd.Timestamp(date_range[1])),
+                ]
+            date_range = [bounds[0].isoformat(), bounds[1].isoformat()]
+    offense_paths = catalog["offense_paths"]
+    levels = offense_levels(rows.columns)
+    if offense_paths is not None and levels is not None and len(rows) > 0:
+        offense_paths = merge_hierarchies(
+            hierarchy_from_records(offense_paths),
+            build_offense_hierarchy(frame_crosstab(rows, levels)),
+        ).to_records()
+    return {
+        **catalog,
+        "source_version": source_version,
+        "source": source,
+        "rows": quality["rows"],
+        "duplicate_rows": quality["duplicate_rows"],
+        "duplicates": quality["duplicates"],
+        "columns": quality["columns"],
+        "distinct": distinct,
+        "date_range": date_range,
+        "offense_paths": offense_paths,
+    }
+
+
+def write_catalog(path: str, catalog: Dict[str, Any]) -> None:
+    """Write a catalog atomically; a failed write only costs a rebuild later."""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, indent=1)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def read_catalog(
+    path: str, source_version: Optional[str], optimized: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Read the catalog of a dataset version.
+
+    Parameters
+    ----------
+    path : str
+        Path from ``catalog_path``.
+    source_version : Optional[str]
+        Fingerprint of the current source file, or None to read the catalog of
+        whichever version was loaded last, e.g. to update it.
+    optimized : bool
+        Whether the dataset is loaded with the memory downcasts applied.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        The catalog, or None if it is missing, unreadable or describes another
+        version of the dataset.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        catalog.get("format") != CATALOG_FORMAT
+        or (
+            source_version is not None
+            and catalog.get("source_version") != source_version
+        )
+        or catalog.get("optimized") != optimized
+    ):
+        return None
+    return catalog
+
+
+def catalog_options(
+    catalog: Optional[Dict[str, Any]], column: str
+) -> Optional[List[str]]:
+    """Return the distinct values of a column from a catalog, if it lists them."""
+    if catalog is None:
+        return None
+    return catalog["distinct"].get(column)
+
+
+def catalog_offense_paths(catalog: Optional[Dict[str, Any]]) -> Optional[List[list]]:
+    """Return the offense hierarchy paths from a catalog, if it lists them."""
+    if catalog is None:
+        return None
+    return catalog.get("offense_paths")
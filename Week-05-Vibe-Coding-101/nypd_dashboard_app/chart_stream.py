@@ -0,0 +1,114 @@
+# Import libraries.
+import threading
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+
+# Threads building chart figures, shared by all sessions. Aggregates spend most
+# of their time in numpy and pandas code that releases the GIL.
+CHART_WORKERS = 8
+
+
+@st.cache_resource(show_spinner=False)
+def chart_executor() -> ThreadPoolExecutor:
+    """Return the worker pool building chart figures, created once per process."""
+    return ThreadPoolExecutor(max_workers=CHART_WORKERS, thread_name_prefix="chart")
+
+
+def submit_in_script_context(task: Callable[[], Any]) -> Future:
+    """Run a task on the chart worker pool with the current script run context.
+
+    Parameters
+    ----------
+    task : Callable[[], Any]
+        Function without arguments. It may call the cached functions of
+        ``data_layer`` but must not draw elements; only the script thread
+        draws.
+
+    Returns
+    -------
+    Future
+        The future of the task's result.
+    """
+    ctx = get_script_run_ctx()
+
+    def run() -> Any:
+        # Streamlit's caches look up the session of the calling thread
+        thread = threading.current_thread()
+        add_script_run_ctx(thread, ctx)
+        try:
+            return task()
+        finally:
+            add_script_run_ctx(thread, None)
+
+    return chart_executor().submit(run)
+
+
+class ChartStream:
+    """Charts of one rerun, built in parallel and drawn as they complete.
+
+    Purpose
+    -------
+    Built one after another in the script thread, the charts of the analysis
+    tabs take the sum of their build times to appear. Each chart instead gets
+    a placeholder where it belongs in the layout and its figure is built on
+    the worker pool, so the tabs render immediately and the slowest chart sets
+    the latency. ``render`` then fills the placeholders in completion order.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[Future, Tuple[Any, Optional[str], str, Dict[str, Any]]] = {}
+
+    def submit(
+        self,
+        build: Callable[[], Optional[go.Figure]],
+        empty_message: Optional[str] = None,
+        error_message: str = "Error creating chart",
+        **chart_options: Any,
+    ) -> None:
+        """Reserve a chart's place in the layout and start building its figure.
+
+        Parameters
+        ----------
+        build : Callable[[], Optional[go.Figure]]
+            Returns the figure, e.g. through ``QueryPlanner.figure``; runs on
+            the worker pool.
+        empty_message : Optional[str]
+            Warning shown instead of the chart when ``build`` returns None.
+        error_message : str
+            Prefix of the error shown when ``build`` raises.
+        **chart_options : Any
+            Further arguments of ``st.plotly_chart``, e.g. the ``key`` and
+            ``on_select`` callback of a chart whose selections are used.
+        """
+        placeholder = st.empty()
+        placeholder.caption("Loading chart...")
+        self._pending[submit_in_script_context(build)] = (
+            placeholder,
+            empty_message,
+            error_message,
+            chart_options,
+        )
+
+    def render(self) -> None:
+        """Draw every submitted chart in its placeholder as soon as it is built."""
+        pending, self._pending = self._pending, {}
+        for future in as_completed(pending):
+            placeholder, empty_message, error_message, chart_options = pending[future]
+            try:
+                fig = future.result()
+            except Exception as e:
+                placeholder.error(f"{error_message}: {str(e)}")
+                continue
+            if fig is not None:
+                placeholder.plotly_chart(fig, width="stretch", **chart_options)
+            elif empty_message is not None:
+                placeholder.warning(empty_message)
+            else:
+                placeholder.empty()
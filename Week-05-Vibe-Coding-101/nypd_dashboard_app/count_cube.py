@@ -0,0 +1,433 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Dimensions of the count cube. The date must come first: cells are sorted by
+# their first dimension, which makes date ranges contiguous slices of cells.
+CUBE_DIMENSIONS = [
+    "ARREST_DATE",
+    "ARREST_BORO",
+    "OFNS_DESC",
+    "LAW_CAT_CD",
+    "PD_DESC",
+    "AGE_GROUP_CLEAN",
+    "PERP_SEX",
+    "PERP_RACE",
+]
+
+# Cube dimensions left out when the dataset lacks them, e.g. a source without PD
+# descriptions; the others are required.
+OPTIONAL_CUBE_DIMENSIONS = ["PD_DESC"]
+
+# Columns that are a function of the arrest date, answered from the date dimension.
+DATE_ATTRIBUTES = ["YEAR", "MONTH", "DAY_OF_WEEK", "QUARTER"]
+
+
+def _smallest_code_dtype(levels: int) -> np.dtype:
+    """Return the smallest integer dtype holding codes below ``levels``."""
+    return np.dtype(np.int16 if levels <= np.iinfo(np.int16).max else np.int32)
+
+
+@dataclass(frozen=True)
+class CountCube:
+    """Exact arrest counts over every combination of the cube dimensions.
+
+    Attributes
+    ----------
+    levels : Dict[str, pd.Index]
+        Sorted distinct values of each dimension, including missing values.
+    codes : Dict[str, np.ndarray]
+        Per-cell code of each dimension into its levels. Cells are the non-empty
+        combinations only, sorted by date.
+    counts : np.ndarray
+        Number of rows in each cell.
+    attributes : Dict[str, np.ndarray]
+        Value of each of ``DATE_ATTRIBUTES`` per date level.
+
+    Purpose
+    -------
+    Every chart count is a sum of cell counts grouped by one dimension, so it is
+    answered from the cube in milliseconds whatever the size of the dataset.
+    """
+
+    levels: Dict[str, pd.Index]
+    codes: Dict[str, np.ndarray]
+    counts: np.ndarray
+    attributes: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the cell arrays."""
+        return self.counts.nbytes + sum(codes.nbytes for codes in self.codes.values())
+
+    def _cells(self, **filters: Optional[Sequence]) -> np.ndarray:
+        """Return the mask of cells whose dimensions take the given values."""
+        mask = np.ones(len(self.counts), dtype=bool)
+        for dimension, values in filters.items():
+            if values is None:
+                continue
+            if dimension in self.codes:
+                allowed = self.levels[dimension].isin(values)
+                codes = self.codes[dimension]
+            else:
+                # Date attributes are filtered through the date of each cell
+                allowed = pd.Index(self.attributes[dimension]).isin(values)
+                codes = self.codes["ARREST_DATE"]
+            if allowed.all():
+                continue
+            mask &= allowed[codes]
+        return mask
+
+    def date_slice(self, start: datetime, end: datetime) -> "CountCube":
+        """Return the cube restricted to arrest dates in ``[start, end]``.
+
+        The cells of a date range are contiguous, so the result shares the
+        arrays of this cube instead of copying them.
+        """
+        dates = self.levels["ARREST_DATE"]
+        dates = dates[: int(dates.notna().sum())]  # missing dates sort last
+        first = int(dates.searchsorted(pd.Timestamp(start), side="left"))
+        last = int(dates.searchsorted(pd.Timestamp(end), side="right"))
+        date_codes = self.codes["ARREST_DATE"]
+        rows = slice(
+            int(np.searchsorted(date_codes, first, side="left")),
+            int(np.searchsorted(date_codes, last, side="left")),
+        )
+        return CountCube(
+            self.levels,
+            {dimension: codes[rows] for dimension, codes in self.codes.items()},
+            self.counts[rows],
+            self.attributes,
+        )
+
+    def filtered(self, **filters: Optional[Sequence]) -> "CountCube":
+        """Return the cube of the cells matching the filters, see ``total``.
+
+        Cells stay sorted by date and levels are kept, so every query of the
+        result equals the same query of this cube with the filters added.
+        """
+        mask = self._cells(**filters)
+        return CountCube(
+            self.levels,
+            {dimension: codes[mask] for dimension, codes in self.codes.items()},
+            self.counts[mask],
+            self.attributes,
+        )
+
+    def distinct_values(self, column: str) -> List[str]:
+        """Return the sorted values of a dimension that occur in the cube, as strings."""
+        counts = self.value_counts(column)
+        return sorted(counts.index.astype(str))
+
+    def date_bounds(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """Return the first and last arrest date in the cube, or None if empty."""
+        dates = self.levels["ARREST_DATE"][np.unique(self.codes["ARREST_DATE"])]
+        dates = dates[dates.notna()]
+        if len(dates) == 0:
+            return None, None
+        return dates[0], dates[-1]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the cells as one row per combination with its ``count``."""
+        frame = pd.DataFrame(
+            {
+                dimension: self.levels[dimension][codes]
+                for dimension, codes in self.codes.items()
+            }
+        )
+        frame["count"] = self.counts.astype(np.int64)
+        return frame
+
+    def total(self, **filters: Optional[Sequence]) -> int:
+        """Return the number of rows matching the filters.
+
+        Parameters
+        ----------
+        **filters : Optional[Sequence]
+            Allowed values per dimension or date attribute, e.g.
+            ``ARREST_BORO=["K", "Q"]`` or ``MONTH=[3]``. A dimension given as
+            None is not filtered.
+        """
+        return int(self.counts[self._cells(**filters)].sum())
+
+    def value_counts(self, column: str, **filters: Optional[Sequence]) -> pd.Series:
+        """Count the rows matching the filters by the values of one column.
+
+        Parameters
+        ----------
+        column : str
+            A cube dimension or one of ``DATE_ATTRIBUTES``.
+        **filters : Optional[Sequence]
+            Allowed values per dimension, see ``total``.
+
+        Returns
+        -------
+        pd.Series
+            Counts indexed by value, sorted by descending count, without missing
+            values and without values that do not occur, like
+            ``Series.value_counts``.
+        """
+        mask = self._cells(**filters)
+        if column in self.codes:
+            counts = np.bincount(
+                self.codes[column][mask],
+                weights=self.counts[mask],
+                minlength=len(self.levels[column]),
+            )
+            index = self.levels[column]
+        else:
+            date_counts = np.bincount(
+                self.codes["ARREST_DATE"][mask],
+                weights=self.counts[mask],
+                minlength=len(self.levels["ARREST_DATE"]),
+            )
+            values = pd.Series(date_counts).groupby(self.attributes[column]).sum()
+            counts, index = values.to_numpy(), values.index
+
+        result = pd.Series(
+            counts.astype(np.int64), index=pd.Index(index, name=column), name="count"
+        )
+        result = result[(result > 0) & result.index.notna()]
+        return result.sort_values(ascending=False, kind="stable")
+
+
+def build_count_cube(
+    df: pd.DataFrame, dimensions: Optional[List[str]] = None
+) -> Optional[CountCube]:
+    """Aggregate a dataset into a count cube.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The full dataset.
+    dimensions : Optional[List[str]]
+        Cube dimensions, starting with the arrest date. Defaults to
+        ``CUBE_DIMENSIONS``, without the ``OPTIONAL_CUBE_DIMENSIONS`` the
+        dataset lacks.
+
+    Returns
+    -------
+    Optional[CountCube]
+        The cube, or None if a (required) dimension is missing from the
+        dataset.
+
+    Purpose
+    -------
+    Each dimension is factorized into sorted codes, the codes of a row are
+    combined into one mixed-radix key with the date as the most significant
+    digit, and the distinct keys and their counts become the cells.
+    """
+    if dimensions is None:
+        dimensions = [
+            dimension
+            for dimension in CUBE_DIMENSIONS
+            if dimension in df.columns or dimension not in OPTIONAL_CUBE_DIMENSIONS
+        ]
+    if any(col not in df.columns for col in dimensions):
+        return None
+
+    levels = {}
+    row_codes = []
+    for dimension in dimensions:
+        codes, uniques = pd.factorize(df[dimension], sort=True, use_na_sentinel=False)
+        index = pd.Index(uniques, name=dimension)
+        if isinstance(index, pd.CategoricalIndex):
+            index = index.astype(index.categories.dtype)
+        levels[dimension] = index
+        row_codes.append(codes.astype(np.int64))
+
+    # Combine the codes into one key per row and count the distinct keys
+    radices = [len(levels[dimension]) for dimension in dimensions]
+    keys = np.zeros(len(df), dtype=np.int64)
+    for codes, radix in zip(row_codes, radices):
+        keys = keys * radix + codes
+    cell_keys, counts = np.unique(keys, return_counts=True)
+
+    # Decode the cell keys back into per-dimension codes
+    cell_codes = {}
+    for dimension, radix in reversed(list(zip(dimensions, radices))):
+        cell_codes[dimension] = (cell_keys % radix).astype(_smallest_code_dtype(radix))
+        cell_keys = cell_keys // radix
+    cell_codes = {dimension: cell_codes[dimension] for dimension in dimensions}
+
+    # Date attributes are the same for all rows of a date
+    attributes = {}
+    date_codes = row_codes[0]
+    for column in DATE_ATTRIBUTES:
+        if column in df.columns:
+            attributes[column] = (
+                pd.Series(df[column].to_numpy()).groupby(date_codes).first().to_numpy()
+            )
+
+    return CountCube(levels, cell_codes, counts.astype(np.int32), attributes)
+
+
+def _union_levels(left: pd.Index, right: pd.Index) -> pd.Index:
+    """Merge two sorted level indexes, keeping missing values last."""
+    union = left.append(right).unique()
+    return union[union.notna()].sort_values().append(union[union.isna()])
+
+
+def merge_cubes(base: CountCube, delta: CountCube, sign: int = 1) -> CountCube:
+    """Add (or subtract) the counts of one cube to another.
+
+    Parameters
+    ----------
+    base : CountCube
+        The maintained cube.
+    delta : CountCube
+        Cube of a batch of rows, over the same dimensions.
+    sign : int
+        1 to add the batch, -1 to retract it.
+
+    Returns
+    -------
+    CountCube
+        A new cube whose levels are the union of both cubes' levels. Cells
+        whose count drops to zero are removed; levels are kept.
+
+    Raises
+    ------
+    ValueError
+        If a retraction would make a cell count negative, i.e. it retracts
+        rows that are not in ``base``.
+
+    Purpose
+    -------
+    The codes of both cubes are remapped to the union levels and combined into
+    mixed-radix keys, so equal cells of the two cubes get equal keys and the
+    merge is one sort of the concatenated cells.
+    """
+    dimensions = list(base.codes)
+    levels = {
+        dimension: _union_levels(base.levels[dimension], delta.levels[dimension])
+        for dimension in dimensions
+    }
+    radices = [len(levels[dimension]) for dimension in dimensions]
+
+    keys = []
+    for cube in (base, delta):
+        cube_keys = np.zeros(len(cube), dtype=np.int64)
+        for dimension, radix in zip(dimensions, radices):
+            mapping = levels[dimension].get_indexer(cube.levels[dimension])
+            cube_keys = cube_keys * radix + mapping[cube.codes[dimension]]
+        keys.append(cube_keys)
+
+    counts = np.concatenate(
+        [base.counts.astype(np.int64), sign * delta.counts.astype(np.int64)]
+    )
+    cell_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    totals = np.zeros(len(cell_keys), dtype=np.int64)
+    np.add.at(totals, inverse, counts)
+    if np.any(totals < 0):
+        raise ValueError("Retracted rows are not part of the count cube")
+    present = totals > 0
+    cell_keys, totals = cell_keys[present], totals[present]
+
+    cell_codes = {}
+    for dimension, radix in reversed(list(zip(dimensions, radices))):
+        cell_codes[dimension] = (cell_keys % radix).astype(_smallest_code_dtype(radix))
+        cell_keys = cell_keys // radix
+    cell_codes = {dimension: cell_codes[dimension] for dimension in dimensions}
+
+    # Date attributes of the union date levels, from whichever cube has the date
+    dates = levels["ARREST_DATE"]
+    attributes = {}
+    for column in base.attributes.keys() & delta.attributes.keys():
+        values = np.concatenate([base.attributes[column], delta.attributes[column]])
+        positions = np.concatenate(
+            [
+                dates.get_indexer(base.levels["ARREST_DATE"]),
+                dates.get_indexer(delta.levels["ARREST_DATE"]),
+            ]
+        )
+        merged = np.empty(len(dates), dtype=values.dtype)
+        merged[positions] = values
+        attributes[column] = merged
+
+    return CountCube(levels, cell_codes, totals.astype(np.int32), attributes)
+
+
+def update_count_cube(
+    cube: CountCube, rows: pd.DataFrame, retract: bool = False
+) -> CountCube:
+    """Apply a batch of appended or retracted rows to a count cube.
+
+    Parameters
+    ----------
+    cube : CountCube
+        The maintained cube.
+    rows : pd.DataFrame
+        The batch, with the same columns as the dataset the cube was built from.
+    retract : bool
+        If True, the rows are removed from the cube instead of added.
+
+    Returns
+    -------
+    CountCube
+        The updated cube. Its distinct values (``distinct_values``) and date
+        bounds (``date_bounds``) follow from the updated cells, so they are
+        maintained by the same delta. The cost depends on the size of the
+        batch and the number of cells, not on the number of rows in the dataset.
+    """
+    delta = build_count_cube(rows, list(cube.codes))
+    if delta is None:
+        raise ValueError("The batch is missing some of the cube dimensions")
+    return merge_cubes(cube, delta, -1 if retract else 1)
+
+
+def check_cube_consistency(cube: CountCube, df: pd.DataFrame) -> List[str]:
+    """Compare an incrementally maintained cube with a rebuild from the data.
+
+    Parameters
+    ----------
+    cube : CountCube
+        The maintained cube.
+    df : pd.DataFrame
+        The dataset the cube should describe, i.e. the original rows plus all
+        appended batches minus all retracted ones.
+
+    Returns
+    -------
+    List[str]
+        A description of every difference; empty if the cube is consistent.
+    """
+    rebuilt = build_count_cube(df, list(cube.codes))
+    if rebuilt is None:
+        return ["The dataset is missing some of the cube dimensions"]
+
+    problems = []
+    dimensions = list(cube.codes)
+    cells = cube.to_frame().sort_values(dimensions, ignore_index=True)
+    expected = rebuilt.to_frame().sort_values(dimensions, ignore_index=True)
+    if len(cells) != len(expected):
+        problems.append(f"{len(cells):,} cells instead of {len(expected):,}")
+    elif not cells.equals(expected):
+        differing = ~((cells == expected) | (cells.isna() & expected.isna())).all(
+            axis=1
+        )
+        problems.append(f"{int(differing.sum()):,} cells differ from a rebuild")
+
+    for dimension in dimensions:
+        if cube.distinct_values(dimension) != rebuilt.distinct_values(dimension):
+            problems.append(f"Distinct values of {dimension} differ from a rebuild")
+    if cube.date_bounds() != rebuilt.date_bounds():
+        problems.append(
+            f"Date range {cube.date_bounds()} instead of {rebuilt.date_bounds()}"
+        )
+    for column, values in rebuilt.attributes.items():
+        maintained = cube.attributes.get(column)
+        positions = cube.levels["ARREST_DATE"].get_indexer(
+            rebuilt.levels["ARREST_DATE"]
+        )
+        if maintained is None or not np.array_equal(maintained[positions], values):
+            problems.append(f"Date attribute {column} differs from a rebuild")
+    return problems
@@ -0,0 +1,214 @@
+# Import libraries.
+import logging
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+
+# Charts whose selected bars filter every other chart, by chart id, and the column
+# whose values their points carry as ``customdata``.
+CROSS_FILTER_CHARTS = {
+    "monthly": "MONTH",
+    "day_of_week": "DAY_OF_WEEK",
+    "age_group": "AGE_GROUP_CLEAN",
+    "race": "PERP_RACE",
+}
+
+# Display names of the cross-filtered columns.
+CROSS_FILTER_NAMES = {
+    "MONTH": "Month",
+    "DAY_OF_WEEK": "Day of Week",
+    "AGE_GROUP_CLEAN": "Age Group",
+    "PERP_RACE": "Race",
+    "ARREST_BORO": "Borough",
+}
+
+# Time from a chart selection to every chart being redrawn that counts as a miss.
+LATENCY_BUDGET_MS = 100.0
+
+# Interactions kept for the latency summary.
+LATENCY_WINDOW = 200
+
+# Session state keys of the active cross-filters and the start of the last interaction.
+CROSS_FILTER_STATE = "cross_filters"
+INTERACTION_STARTED = "cross_filter_started"
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyMonitor:
+    """Durations of recent cross-filter interactions, shared by all sessions.
+
+    Purpose
+    -------
+    An interaction is answered when every chart affected by a new selection
+    is redrawn. Its duration is measured in the rerun the selection
+    triggers, which only reruns the cross-filtered analysis fragment, from
+    the selection callback to the last chart, and compared with
+    ``LATENCY_BUDGET_MS``; misses are logged with the selection that
+    caused them so slow paths can be found in the server log.
+    """
+
+    def __init__(self, budget_ms: float = LATENCY_BUDGET_MS) -> None:
+        self.budget_ms = budget_ms
+        self.durations: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.interactions = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, duration_ms: float, filters: Dict[str, List[Any]]) -> bool:
+        """Record an interaction; returns whether it missed the budget."""
+        missed = duration_ms > self.budget_ms
+        with self._lock:
+            self.durations.append(duration_ms)
+            self.interactions += 1
+            self.misses += missed
+        if missed:
+            logger.warning(
+                "Cross-filter update took %.0f ms, over the %.0f ms budget (filters: %s)",
+                duration_ms,
+                self.budget_ms,
+                filters,
+            )
+        return missed
+
+    def summary(self) -> Optional[Dict[str, float]]:
+        """Return the median and 95th percentile of recent durations and the misses."""
+        with self._lock:
+            durations = np.array(self.durations)
+            interactions, misses = self.interactions, self.misses
+        if len(durations) == 0:
+            return None
+        return {
+            "interactions": interactions,
+            "misses": misses,
+            "p50_ms": float(np.percentile(durations, 50)),
+            "p95_ms": float(np.percentile(durations, 95)),
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def latency_monitor() -> LatencyMonitor:
+    """Return the latency monitor of cross-filter interactions, one per process."""
+    return LatencyMonitor()
+
+
+def chart_key(chart_id: str) -> str:
+    """Return the widget key of a cross-filtering chart."""
+    return f"cross_filter_{chart_id}"
+
+
+def active_cross_filters() -> Dict[str, List[Any]]:
+    """Return the session's selected values per cross-filtered column."""
+    return dict(st.session_state.get(CROSS_FILTER_STATE, {}))
+
+
+def set_cross_filter(column: str, values: Sequence[Any]) -> None:
+    """Select values of a column in every chart, or clear it if ``values`` is empty.
+
+    Called from the selection callbacks at the start of a rerun, which
+    also marks the start of the interaction.
+    """
+    filters = active_cross_filters()
+    if len(values) > 0:
+        filters[column] = sorted(set(values))
+    else:
+        filters.pop(column, None)
+    st.session_state[CROSS_FILTER_STATE] = filters
+    st.session_state[INTERACTION_STARTED] = time.perf_counter()
+
+
+def clear_cross_filters() -> None:
+    """Clear every cross-filter of the session."""
+    st.session_state[CROSS_FILTER_STATE] = {}
+    st.session_state[INTERACTION_STARTED] = time.perf_counter()
+
+
+def chart_selection_callback(chart_id: str) -> Callable[[], None]:
+    """Return the ``on_select`` callback of a cross-filtering chart.
+
+    The callback reads the ``customdata`` of the selected points from the
+    chart's widget state and makes them the cross-filter of its column.
+    Selections are kept in the session rather than in the widget: a chart's
+    widget is recreated, with an empty selection, whenever its figure changes.
+    """
+
+    def update() -> None:
+        state = st.session_state.get(chart_key(chart_id))
+        points = state["selection"]["points"] if state else []
+        values = []
+        for point in points:
+            value = point.get("customdata")
+            if isinstance(value, list):
+                value = value[0] if value else None
+            if value is not None:
+                values.append(value)
+        set_cross_filter(CROSS_FILTER_CHARTS[chart_id], values)
+
+    return update
+
+
+def chart_options(chart_id: str) -> Dict[str, Any]:
+    """Return the ``st.plotly_chart`` arguments that make a chart cross-filter."""
+    return {
+        "key": chart_key(chart_id),
+        "on_select": chart_selection_callback(chart_id),
+        "selection_mode": "points",
+    }
+
+
+def table_selection_callback(
+    key: str, column: str, row_values: Sequence[Any]
+) -> Callable[[], None]:
+    """Return the ``on_select`` callback of a table whose rows select values.
+
+    Parameters
+    ----------
+    key : str
+        Widget key of the table.
+    column : str
+        Cross-filtered column.
+    row_values : Sequence[Any]
+        Value of ``column`` in each displayed row, in display order.
+    """
+
+    def update() -> None:
+        state = st.session_state.get(key)
+        rows = state["selection"]["rows"] if state else []
+        set_cross_filter(column, [row_values[row] for row in rows])
+
+    return update
+
+
+def finish_interaction() -> Optional[float]:
+    """Record the duration of the interaction that started this rerun.
+
+    Returns
+    -------
+    Optional[float]
+        Milliseconds from the selection to now, or None if this run was not
+        triggered by a cross-filter selection.
+    """
+    started = st.session_state.pop(INTERACTION_STARTED, None)
+    if started is None:
+        return None
+    duration_ms = (time.perf_counter() - started) * 1000
+    latency_monitor().record(duration_ms, active_cross_filters())
+    return duration_ms
+
+
+def describe_cross_filters(
+    filters: Dict[str, List[Any]], labels: Optional[Dict[str, Dict[Any, str]]] = None
+) -> str:
+    """Describe active cross-filters, e.g. "Month: Mar, Apr · Age Group: 25-44"."""
+    labels = labels or {}
+    parts = []
+    for column, values in filters.items():
+        names = [labels.get(column, {}).get(value, str(value)) for value in values]
+        parts.append(f"{CROSS_FILTER_NAMES.get(column, column)}: {', '.join(names)}")
+    return " · ".join(parts)
@@ -0,0 +1,387 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from count_cube import CountCube
+from selection import WEIGHT_COLUMN
+
+
+# Columns offered as crosstab dimensions, with their display names.
+CROSSTAB_DIMENSIONS = {
+    "ARREST_BORO": "Borough",
+    "OFNS_DESC": "Offense",
+    "LAW_CAT_CD": "Law Category",
+    "PD_DESC": "PD Description",
+    "AGE_GROUP_CLEAN": "Age Group",
+    "PERP_SEX": "Sex",
+    "PERP_RACE": "Race",
+    "YEAR": "Year",
+    "MONTH": "Month",
+    "DAY_OF_WEEK": "Day of Week",
+}
+
+# Largest number of dimensions of one crosstab.
+MAX_CROSSTAB_DIMENSIONS = 4
+
+# Normalizations of ``Crosstab.to_frame``, as in ``pd.crosstab``.
+NORMALIZATIONS = [False, "all", "index", "columns"]
+
+
+@dataclass(frozen=True)
+class Crosstab:
+    """Counts over every combination of up to four categorical dimensions.
+
+    Attributes
+    ----------
+    dimensions : Tuple[str, ...]
+        Names of the dimensions, one axis of ``counts`` each.
+    levels : Tuple[pd.Index, ...]
+        Sorted values of each dimension, without missing values.
+    counts : np.ndarray
+        Dense array of counts, indexed by the codes of each dimension into its
+        levels. Weighted counts are floats.
+    """
+
+    dimensions: Tuple[str, ...]
+    levels: Tuple[pd.Index, ...]
+    counts: np.ndarray
+
+    def total(self, **filters: Optional[Sequence]) -> float:
+        """Return the number of counted rows with the given values.
+
+        Filters are allowed values per dimension, as in ``CountCube.total``.
+        """
+        return self._select(**filters).sum()
+
+    def value_counts(self, column: str, **filters: Optional[Sequence]) -> pd.Series:
+        """Count the rows with the given values by the values of one dimension.
+
+        Parameters
+        ----------
+        column : str
+            One of ``dimensions``.
+        **filters : Optional[Sequence]
+            Allowed values per dimension, as in ``CountCube.total``.
+
+        Returns
+        -------
+        pd.Series
+            Counts like ``CountCube.value_counts``: indexed by value, sorted by
+            descending count, without values that do not occur.
+        """
+        axis = self.dimensions.index(column)
+        others = tuple(i for i in range(len(self.dimensions)) if i != axis)
+        counts = self._select(**filters).sum(axis=others)
+        result = pd.Series(
+            np.rint(counts).astype(np.int64),
+            index=pd.Index(self.levels[axis], name=column),
+            name="count",
+        )
+        result = result[result > 0]
+        return result.sort_values(ascending=False, kind="stable")
+
+    def rollup(
+        self, dimensions: Sequence[str], **filters: Optional[Sequence]
+    ) -> "Crosstab":
+        """Sum the counts with the given values over the other dimensions.
+
+        Parameters
+        ----------
+        dimensions : Sequence[str]
+            Dimensions of the result, in order; a subset of ``dimensions``.
+        **filters : Optional[Sequence]
+            Allowed values per dimension, as in ``CountCube.total``.
+
+        Returns
+        -------
+        Crosstab
+            The crosstab of ``dimensions``, keeping every level like
+            ``cube_crosstab``; filtered values are counted as zero.
+        """
+        axes = [self.dimensions.index(dimension) for dimension in dimensions]
+        others = tuple(i for i in range(len(self.dimensions)) if i not in axes)
+        # Summing keeps the remaining axes in their original order
+        selected = self._select(**filters).sum(axis=others)
+        kept = sorted(axes)
+
+        # Put the filtered levels of the kept dimensions back as zeros
+        counts = np.zeros(
+            tuple(len(self.levels[axis]) for axis in kept), dtype=selected.dtype
+        )
+        positions = []
+        for axis in kept:
+            values = filters.get(self.dimensions[axis])
+            allowed = (
+                np.ones(len(self.levels[axis]), dtype=bool)
+                if values is None
+                else self.levels[axis].isin(values)
+            )
+            positions.append(np.flatnonzero(allowed))
+        counts[np.ix_(*positions)] = selected
+        counts = np.transpose(counts, np.argsort(np.argsort(axes)))
+        return Crosstab(
+            tuple(dimensions), tuple(self.levels[axis] for axis in axes), counts
+        )
+
+    def _select(self, **filters: Optional[Sequence]) -> np.ndarray:
+        """Return the counts restricted to the allowed values of each dimension."""
+        counts = self.counts
+        for axis, dimension in enumerate(self.dimensions):
+            values = filters.get(dimension)
+            if values is None:
+                continue
+            allowed = self.levels[axis].isin(values)
+            if not allowed.all():
+                counts = counts.compress(allowed, axis=axis)
+        return counts
+
+    def to_frame(self, normalize=False, margins: bool = False) -> pd.DataFrame:
+        """Lay the counts out as a table like ``pd.crosstab``.
+
+        Parameters
+        ----------
+        normalize : Union[bool, str]
+            False for counts, or one of ``"all"``, ``"index"`` and
+            ``"columns"`` to divide by the grand total, the row totals or the
+            column totals.
+        margins : bool
+            Add an ``All`` row and column with the totals. As in
+            ``pd.crosstab``, normalizing by rows keeps only the ``All`` row and
+            normalizing by columns only the ``All`` column. A single dimension
+            only gets the ``All`` row.
+
+        Returns
+        -------
+        pd.DataFrame
+            The last dimension as columns and the others as the (multi-level)
+            row index, or a single ``Arrests`` column for one dimension.
+            Combinations that never occur are left out.
+        """
+        if len(self.dimensions) > 1:
+            rows = pd.MultiIndex.from_product(
+                self.levels[:-1], names=list(self.dimensions[:-1])
+            )
+            if rows.nlevels == 1:
+                rows = rows.get_level_values(0)
+            columns = pd.Index(self.levels[-1], name=self.dimensions[-1])
+        else:
+            rows = pd.Index(self.levels[0], name=self.dimensions[0])
+            columns = pd.Index(["Arrests"])
+        matrix = self.counts.reshape(len(rows), len(columns))
+
+        # Drop rows and columns that are empty, as pd.crosstab never sees them
+        keep_rows = matrix.sum(axis=1) > 0
+        keep_columns = matrix.sum(axis=0) > 0
+        matrix = matrix[keep_rows][:, keep_columns]
+        rows, columns = rows[keep_rows], columns[keep_columns]
+
+        if margins or normalize:
+            # Totals go in an extra row and column, the grand total in the corner
+            matrix = np.vstack([matrix, matrix.sum(axis=0)])
+            matrix = np.hstack([matrix, matrix.sum(axis=1)[:, None]])
+            names = rows.names
+            if rows.nlevels > 1:
+                total_row = pd.MultiIndex.from_tuples(
+                    [("All",) + ("",) * (rows.nlevels - 1)]
+                )
+            else:
+                total_row = pd.Index(["All"])
+            rows = rows.append(total_row).set_names(names)
+            columns = columns.append(pd.Index(["All"]))
+
+            if normalize == "all":
+                matrix = matrix / max(matrix[-1, -1], 1)
+            elif normalize == "index":
+                matrix = matrix / np.maximum(matrix[:, -1:], 1)
+            elif normalize == "columns":
+                matrix = matrix / np.maximum(matrix[-1:, :], 1)
+            elif normalize:
+                raise ValueError(f"Unknown normalization: {normalize!r}")
+
+            # Keep the requested margins, except the one normalized to all ones
+            keep_rows = np.ones(len(rows), dtype=bool)
+            keep_columns = np.ones(len(columns), dtype=bool)
+            keep_rows[-1] = margins and normalize != "columns"
+            keep_columns[-1] = (
+                margins and normalize != "index" and len(self.dimensions) > 1
+            )
+            matrix = matrix[keep_rows][:, keep_columns]
+            rows, columns = rows[keep_rows], columns[keep_columns]
+
+        return pd.DataFrame(matrix, index=rows, columns=columns)
+
+
+def count_combinations(
+    codes: Sequence[np.ndarray],
+    shape: Sequence[int],
+    weights: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Count every combination of codes with one flattened-index bincount.
+
+    Parameters
+    ----------
+    codes : Sequence[np.ndarray]
+        Per dimension, the code of each row or cell; negative codes (missing
+        values) drop the row.
+    shape : Sequence[int]
+        Number of levels of each dimension.
+    weights : Optional[np.ndarray]
+        Weight of each row, e.g. the row count of a cube cell.
+
+    Returns
+    -------
+    np.ndarray
+        Array of ``shape`` with the (weighted) number of rows per combination.
+    """
+    valid = np.ones(len(codes[0]), dtype=bool)
+    for dimension_codes in codes:
+        valid &= dimension_codes >= 0
+    flat = np.ravel_multi_index(
+        tuple(dimension_codes[valid].astype(np.intp) for dimension_codes in codes),
+        tuple(shape),
+    )
+    counts = np.bincount(
+        flat,
+        weights=None if weights is None else weights[valid],
+        minlength=int(np.prod(shape)),
+    )
+    if weights is not None and weights.dtype.kind in "iu":
+        counts = counts.astype(np.int64)
+    return counts.reshape(tuple(shape))
+
+
+def _check_dimensions(dimensions: Sequence[str]) -> None:
+    """Reject crosstabs without dimensions or with too many of them."""
+    if not 1 <= len(dimensions) <= MAX_CROSSTAB_DIMENSIONS:
+        raise ValueError(
+            f"A crosstab needs 1 to {MAX_CROSSTAB_DIMENSIONS} dimensions, got {len(dimensions)}"
+        )
+
+
+def cube_crosstab(
+    cube: CountCube, dimensions: Sequence[str], **filters: Optional[Sequence]
+) -> Crosstab:
+    """Cross-tabulate the cells of a count cube.
+
+    Parameters
+    ----------
+    cube : CountCube
+        The cube of the selected date range.
+    dimensions : Sequence[str]
+        Cube dimensions or date attributes (``YEAR``, ``MONTH``, ...).
+    **filters : Optional[Sequence]
+        Allowed values per cube dimension, see ``CountCube.total``.
+
+    Returns
+    -------
+    Crosstab
+        Exact counts of the rows matching the filters.
+
+    Purpose
+    -------
+    The cube holds far fewer cells than the dataset has rows, and each cell
+    already carries integer codes for every dimension, so a crosstab is one
+    bincount over the cells weighted by their counts.
+    """
+    _check_dimensions(dimensions)
+    return cube_tile(cube, dimensions, **filters)
+
+
+def cube_tile(
+    cube: CountCube, dimensions: Sequence[str], **filters: Optional[Sequence]
+) -> Crosstab:
+    """Count the cells of a count cube over any number of dimensions.
+
+    Parameters
+    ----------
+    cube : CountCube
+        The cube of the selected date range.
+    dimensions : Sequence[str]
+        Cube dimensions or date attributes, without the limit of
+        ``cube_crosstab``.
+    **filters : Optional[Sequence]
+        Allowed values per cube dimension, see ``CountCube.total``.
+
+    Returns
+    -------
+    Crosstab
+        Dense counts of the rows matching the filters.
+
+    Purpose
+    -------
+    A few low-cardinality dimensions have far fewer combinations than the cube
+    has cells, so a tile over them is counted in one pass over the cells and
+    then answers any count filtered on those dimensions with
+    ``Crosstab.value_counts`` by summing a small array.
+    """
+    mask = cube._cells(**filters)
+    codes: List[np.ndarray] = []
+    levels: List[pd.Index] = []
+    for dimension in dimensions:
+        if dimension in cube.codes:
+            dimension_codes = cube.codes[dimension][mask].astype(np.int64)
+            dimension_levels = cube.levels[dimension]
+        else:
+            # Date attributes are looked up through the date of each cell
+            date_codes, attribute_levels = pd.factorize(
+                cube.attributes[dimension], sort=True
+            )
+            dimension_codes = date_codes[cube.codes["ARREST_DATE"][mask]]
+            dimension_levels = pd.Index(attribute_levels)
+
+        # Missing values are not a level of the crosstab
+        present = dimension_levels.notna()
+        remap = np.where(present, np.cumsum(present) - 1, -1)
+        codes.append(remap[dimension_codes])
+        levels.append(pd.Index(dimension_levels[present], name=dimension))
+
+    counts = count_combinations(
+        codes, [len(level) for level in levels], cube.counts[mask].astype(np.int64)
+    )
+    return Crosstab(tuple(dimensions), tuple(levels), counts)
+
+
+def frame_crosstab(df: pd.DataFrame, dimensions: Sequence[str]) -> Crosstab:
+    """Cross-tabulate the rows of a dataset or session view.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataset, or a ``DataView`` of it. Rows of a weighted sample count
+        with their ``WEIGHT_COLUMN`` weight.
+    dimensions : Sequence[str]
+        Columns to cross-tabulate.
+
+    Returns
+    -------
+    Crosstab
+        Counts, or weighted estimates for a weighted sample.
+    """
+    _check_dimensions(dimensions)
+    codes: List[np.ndarray] = []
+    levels: List[pd.Index] = []
+    for dimension in dimensions:
+        dimension_codes, uniques = pd.factorize(df[dimension], sort=True)
+        index = pd.Index(uniques, name=dimension)
+        if isinstance(index, pd.CategoricalIndex):
+            index = index.astype(index.categories.dtype)
+        codes.append(dimension_codes)
+        levels.append(index)
+    weights = (
+        df[WEIGHT_COLUMN].to_numpy(dtype=np.float64)
+        if WEIGHT_COLUMN in df.columns
+        else None
+    )
+    counts = count_combinations(codes, [len(level) for level in levels], weights)
+    return Crosstab(tuple(dimensions), tuple(levels), counts)
+
+
+def dimension_labels(dimensions: Sequence[str]) -> Dict[str, str]:
+    """Return the display names of crosstab dimensions."""
+    return {
+        dimension: CROSSTAB_DIMENSIONS.get(dimension, dimension)
+        for dimension in dimensions
+    }
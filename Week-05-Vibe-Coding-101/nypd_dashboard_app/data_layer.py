@@ -0,0 +1,677 @@
+# Import libraries.
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from aggregate_store import AggregateStore, code_generation
+from approximate import CONFIDENCE_LEVEL, estimate_count_intervals
+from bitmap_index import BitmapIndex, build_bitmap_index
+from count_cube import CountCube, build_count_cube, update_count_cube
+from crosstab import CROSSTAB_DIMENSIONS, Crosstab, frame_crosstab
+from loader_stages import CHECKPOINT_DIR
+from memory_profile import profile_memory
+from offense_hierarchy import OffenseHierarchy
+from quality_profile import build_quality_report
+from selection import (
+    WEIGHT_COLUMN,
+    DataView,
+    build_date_index,
+    build_sample_keys,
+    build_strata_codes,
+)
+from shard_aggregation import ShardExecutor, SharedCodeMatrix, sharded_crosstab
+
+
+# Number of built chart figures kept across sessions; a map can hold up to 50,000
+# points, so the bound is on memory as much as on reuse.
+FIGURE_CACHE_ENTRIES = 32
+
+# Dataset file of the dashboard, as written by ``download_dataset.py``.
+DATASET_FILE = "nypd_arrests_dataset.csv"
+
+# File name of the on-disk store of aggregates that survives restarts.
+AGGREGATE_STORE_FILE = "aggregates.sqlite"
+
+# File name and size budget of the on-disk store of count cubes. A cube is
+# larger than all other aggregates of a version together, so cubes get their
+# own store and never evict the per-query aggregates.
+CUBE_STORE_FILE = "count_cubes.sqlite"
+CUBE_STORE_BYTES = 1024 * 1024 * 1024
+
+
+def fingerprint_source(file_path: str) -> str:
+    """Build a cheap fingerprint for a dataset file on disk.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the source CSV file.
+
+    Returns
+    -------
+    str
+        A 16 character hex token derived from the file's absolute path, size and
+        modification time.
+
+    Purpose
+    -------
+    This function identifies a version of the source data without reading its
+    contents. Any re-download or edit of the file changes its size or mtime and
+    therefore its fingerprint, which invalidates every cache keyed on it.
+    """
+    stat = os.stat(file_path)
+    raw = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _normalize_param(value: Any) -> str:
+    """Render a filter parameter as a stable string for version hashing."""
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return "[" + ",".join(sorted(_normalize_param(v) for v in value)) + "]"
+    return repr(value)
+
+
+def derive_version(parent: str, **params: Any) -> str:
+    """Derive the version token of a dataset produced from another one.
+
+    Parameters
+    ----------
+    parent : str
+        Version token of the dataset the new one was derived from.
+    **params : Any
+        Parameters of the derivation, e.g. date range, sample size or the
+        selected boroughs and offenses.
+
+    Returns
+    -------
+    str
+        A 16 character hex token that is unique to the parent and parameters.
+
+    Purpose
+    -------
+    Filtered and sampled views of the data are deterministic functions of their
+    parent and the filter parameters, so hashing those few values identifies
+    the view exactly. Selections given as lists are order-insensitive.
+    """
+    parts = [parent] + [f"{k}={_normalize_param(v)}" for k, v in sorted(params.items())]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def dataset_version(source_version: str, optimize_memory: bool = False) -> str:
+    """Return the version token of the full dataset loaded from a source file.
+
+    The optimized dataset has other columns and types than the plain one, so it
+    gets a version of its own.
+    """
+    if optimize_memory:
+        return derive_version(source_version, optimize_memory=True)
+    return source_version
+
+
+def query_signature(name: str, **params: Any) -> str:
+    """Describe an aggregate query as a stable string.
+
+    Together with the version token of the data it is computed from, the
+    signature identifies a result in the aggregate store. Parameters are
+    rendered as in ``derive_version``, so list parameters are order-insensitive.
+    """
+    parts = [name] + [f"{k}={_normalize_param(v)}" for k, v in sorted(params.items())]
+    return "|".join(parts)
+
+
+def aggregate_store_path(
+    file_path: str = DATASET_FILE, store_file: str = AGGREGATE_STORE_FILE
+) -> str:
+    """Return the path of an aggregate store of a dataset file.
+
+    The store is kept with the loader checkpoints in ``CHECKPOINT_DIR`` next
+    to the dataset file, so a server started from another directory finds the
+    same store as long as it loads the same file.
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(file_path)),
+        CHECKPOINT_DIR,
+        store_file,
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def aggregate_store() -> AggregateStore:
+    """Return the on-disk aggregate store, opened once per server process.
+
+    Entries computed by a different version of the dashboard's modules are
+    discarded when it is opened, see ``aggregate_store.code_generation``.
+    """
+    generation = code_generation(os.path.dirname(os.path.abspath(__file__)))
+    return AggregateStore(aggregate_store_path(), generation)
+
+
+@st.cache_resource(show_spinner=False)
+def cube_store() -> AggregateStore:
+    """Return the on-disk store of count cubes, opened once per server process.
+
+    It is separate from ``aggregate_store``, with its own size budget of
+    ``CUBE_STORE_BYTES``, so storing a cube never evicts the small per-query
+    aggregates.
+    """
+    generation = code_generation(os.path.dirname(os.path.abspath(__file__)))
+    return AggregateStore(
+        aggregate_store_path(store_file=CUBE_STORE_FILE), generation, CUBE_STORE_BYTES
+    )
+
+
+# The cached functions below take the version token as their cache key. The
+# DataFrame argument is prefixed with an underscore so Streamlit does not hash
+# it; callers must pass the token that belongs to the frame. Functions whose
+# results are expensive to recompute also read and write them through the
+# aggregate store, so they are only computed once per version across restarts.
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def cached_row_count(version: str, _df: pd.DataFrame) -> int:
+    """Return the number of rows of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The dataset to count. Not hashed by Streamlit.
+
+    Returns
+    -------
+    int
+        Number of rows in the dataset.
+    """
+    return len(_df)
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def cached_value_counts(version: str, _df: pd.DataFrame, column: str) -> pd.Series:
+    """Return the value counts of one column of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The dataset to aggregate. Not hashed by Streamlit.
+    column : str
+        Column whose values are counted.
+
+    Returns
+    -------
+    pd.Series
+        Counts indexed by value, sorted by descending count. Missing values are
+        excluded, as with ``Series.value_counts``. Categorical columns are
+        returned with a plain index and without unobserved categories. For a
+        stratified sample, rows are weighted by ``WEIGHT_COLUMN`` so the counts
+        estimate the counts of the whole selection.
+    """
+    return aggregate_store().fetch(
+        version,
+        query_signature("value_counts", column=column),
+        lambda: _value_counts(_df, column),
+    )
+
+
+def _value_counts(df: pd.DataFrame, column: str) -> pd.Series:
+    """Count the values of one column, see ``cached_value_counts``."""
+    if WEIGHT_COLUMN in df.columns:
+        counts = (
+            df[[column, WEIGHT_COLUMN]]
+            .groupby(column, observed=True)[WEIGHT_COLUMN]
+            .sum()
+            .round()
+            .astype("int64")
+            .sort_values(ascending=False)
+        )
+    else:
+        counts = df[column].value_counts()
+    if isinstance(counts.index, pd.CategoricalIndex):
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(counts.index.categories.dtype)
+    return counts
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def cached_count_intervals(
+    version: str,
+    _df: DataView,
+    column: str,
+    confidence: float = CONFIDENCE_LEVEL,
+) -> Optional[pd.DataFrame]:
+    """Return confidence intervals on the counts of one column of a versioned view.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : DataView
+        The view to aggregate. Not hashed by Streamlit.
+    column : str
+        Column whose values are counted.
+    confidence : float
+        Confidence level of the intervals.
+
+    Returns
+    -------
+    Optional[pd.DataFrame]
+        Output of ``approximate.estimate_count_intervals``; None unless the
+        view is an approximate-query sample.
+    """
+    if not isinstance(_df, DataView) or _df.design is None:
+        return None
+    return aggregate_store().fetch(
+        version,
+        query_signature("count_intervals", column=column, confidence=confidence),
+        lambda: estimate_count_intervals(_df, column, confidence),
+    )
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def cached_crosstab(version: str, _df: pd.DataFrame, dimensions: tuple) -> Crosstab:
+    """Return the crosstab of some columns of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The dataset, or a ``DataView`` of it. Not hashed by Streamlit.
+    dimensions : tuple
+        Columns to cross-tabulate.
+
+    Returns
+    -------
+    Crosstab
+        Output of ``crosstab.frame_crosstab``.
+    """
+    return aggregate_store().fetch(
+        version,
+        query_signature("crosstab", dimensions=" x ".join(dimensions)),
+        lambda: frame_crosstab(_df, list(dimensions)),
+    )
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def cached_sharded_crosstab(
+    version: str,
+    _matrix: SharedCodeMatrix,
+    _rows: Any,
+    _weights: Optional[np.ndarray],
+    dimensions: tuple,
+) -> Crosstab:
+    """Return the crosstab of some columns of a versioned view, counted in shards.
+
+    Parameters
+    ----------
+    version : str
+        Version token of the view; used as the cache key.
+    _matrix : SharedCodeMatrix
+        Codes of the full dataset from ``cached_code_matrix``. Not hashed by
+        Streamlit.
+    _rows : Union[slice, np.ndarray]
+        Positions of the view's rows in the full dataset. Not hashed by
+        Streamlit.
+    _weights : Optional[np.ndarray]
+        Weights of the view's rows if it is a weighted sample. Not hashed by
+        Streamlit.
+    dimensions : tuple
+        Columns to cross-tabulate.
+
+    Returns
+    -------
+    Crosstab
+        Output of ``shard_aggregation.sharded_crosstab`` on the shared
+        ``shard_executor``.
+    """
+    return aggregate_store().fetch(
+        version,
+        query_signature("sharded_crosstab", dimensions=" x ".join(dimensions)),
+        lambda: sharded_crosstab(
+            shard_executor(), _matrix, list(dimensions), _rows, _weights
+        ),
+    )
+
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def cached_distinct_values(version: str, _df: pd.DataFrame, column: str) -> List[str]:
+    """Return the sorted distinct values of one column of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The dataset to inspect. Not hashed by Streamlit.
+    column : str
+        Column whose distinct values are listed.
+
+    Returns
+    -------
+    List[str]
+        Sorted distinct non-null values as strings, suitable for selectbox options.
+    """
+    return sorted(_df[column].dropna().astype(str).unique())
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_memory_profile(
+    version: str, _df: pd.DataFrame, full_rows: Optional[int] = None
+) -> pd.DataFrame:
+    """Return the per-column memory profile of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The dataset to profile. Not hashed by Streamlit.
+    full_rows : Optional[int]
+        Number of rows of the full dataset, used to project sizes.
+
+    Returns
+    -------
+    pd.DataFrame
+        Output of ``memory_profile.profile_memory``.
+    """
+    return aggregate_store().fetch(
+        version,
+        query_signature("memory_profile", full_rows=full_rows),
+        lambda: profile_memory(
+            _df.to_frame() if isinstance(_df, DataView) else _df, full_rows
+        ),
+    )
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_quality_report(version: str, _df: pd.DataFrame) -> Dict[str, Any]:
+    """Return the data quality report of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The dataset, or a ``DataView`` of it. Not hashed by Streamlit.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Output of ``quality_profile.build_quality_report``.
+    """
+    return aggregate_store().fetch(
+        version,
+        query_signature("quality_report"),
+        lambda: build_quality_report(_df),
+    )
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_date_index(version: str, _df: pd.DataFrame) -> Optional[np.ndarray]:
+    """Return the date index of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The full dataset, sorted by arrest date. Not hashed by Streamlit.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        Output of ``selection.build_date_index``. Cached as a resource so the
+        array is shared rather than copied on every call.
+    """
+    return build_date_index(_df)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_sample_keys(version: str, n_rows: int) -> np.ndarray:
+    """Return the per-row sampling priorities of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of the full dataset; used as the cache key.
+    n_rows : int
+        Number of rows of the full dataset.
+
+    Returns
+    -------
+    np.ndarray
+        Output of ``selection.build_sample_keys``, computed once per version.
+    """
+    return build_sample_keys(n_rows)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_strata_codes(version: str, _df: pd.DataFrame) -> Optional[np.ndarray]:
+    """Return the per-row stratum codes of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The full dataset. Not hashed by Streamlit.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        Output of ``selection.build_strata_codes``, computed once per version.
+    """
+    return build_strata_codes(_df)
+
+
+@st.cache_resource(max_entries=4, show_spinner="Building the count cube...")
+def cached_count_cube(version: str, _df: pd.DataFrame) -> Optional[CountCube]:
+    """Return the count cube of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The full dataset. Not hashed by Streamlit.
+
+    Returns
+    -------
+    Optional[CountCube]
+        Output of ``count_cube.build_count_cube``, built once per version and
+        shared by all sessions. It persists in ``cube_store``, not in the
+        aggregate store.
+    """
+    return cube_store().fetch(
+        version, query_signature("count_cube"), lambda: build_count_cube(_df)
+    )
+
+
+def carry_count_cube(
+    previous_version: str, version: str, rows: pd.DataFrame, n_rows: int
+) -> bool:
+    """Store the count cube of a dataset version with rows appended to another.
+
+    Parameters
+    ----------
+    previous_version : str
+        Version token of the earlier full dataset.
+    version : str
+        Version token of the full dataset with ``rows`` appended.
+    rows : pd.DataFrame
+        The appended rows, e.g. from ``loader_stages.append_loader_stages``.
+    n_rows : int
+        Number of rows of the new full dataset.
+
+    Returns
+    -------
+    bool
+        True if the cube of ``version`` was stored; False if the earlier cube is
+        not in ``cube_store``, or the updated cube does not count ``n_rows``
+        rows. ``cached_count_cube`` then builds it from the full dataset.
+
+    Purpose
+    -------
+    The earlier cube is updated with ``count_cube.update_count_cube``, whose
+    cost depends on the appended rows and the number of cells, not on the size
+    of the dataset, and stored under the new version, where
+    ``cached_count_cube`` finds it instead of rebuilding the cube.
+    """
+    store = cube_store()
+    signature = query_signature("count_cube")
+    try:
+        cube = store.get(previous_version, signature)
+    except KeyError:
+        return False
+    if cube is None:
+        return False
+    try:
+        cube = update_count_cube(cube, rows)
+    except ValueError:
+        return False
+    if cube.total() != n_rows:
+        return False
+    store.put(version, signature, cube)
+    return True
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def cached_code_matrix(version: str, _df: pd.DataFrame) -> SharedCodeMatrix:
+    """Return the shared-memory codes of the crosstab columns of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The full dataset. Not hashed by Streamlit.
+
+    Returns
+    -------
+    SharedCodeMatrix
+        Codes of the ``CROSSTAB_DIMENSIONS`` columns, encoded once per version;
+        the shared memory is freed when the entry is evicted.
+    """
+    return SharedCodeMatrix(_df, list(CROSSTAB_DIMENSIONS))
+
+
+@st.cache_resource(show_spinner=False)
+def shard_executor() -> ShardExecutor:
+    """Return the process pool of sharded aggregations, started once per server."""
+    return ShardExecutor()
+
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def cached_offense_hierarchy(
+    version: str, _build: Callable[[], Optional[OffenseHierarchy]]
+) -> Optional[OffenseHierarchy]:
+    """Return the offense hierarchy of a versioned dataset or filter.
+
+    Parameters
+    ----------
+    version : str
+        Version token of the data the hierarchy is rolled up from.
+    _build : Callable[[], Optional[OffenseHierarchy]]
+        Builds the hierarchy. Not hashed by Streamlit; only called on a cache
+        miss.
+
+    Returns
+    -------
+    Optional[OffenseHierarchy]
+        The hierarchy, shared by all sessions together with the drill-downs
+        already rolled up in it.
+    """
+    return _build()
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def cached_count_tile(version: str, _build: Callable[[], Crosstab]) -> Crosstab:
+    """Return a dense count tile of a versioned cube and filter.
+
+    Parameters
+    ----------
+    version : str
+        Version token of the cube's data and the filter the tile is counted
+        under.
+    _build : Callable[[], Crosstab]
+        Counts the tile, e.g. with ``crosstab.cube_tile``. Not hashed by
+        Streamlit; only called on a cache miss.
+
+    Returns
+    -------
+    Crosstab
+        The tile, shared by all sessions, so selecting values in the charts
+        slices it instead of scanning the cube.
+    """
+    return _build()
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cached_bitmap_index(version: str, _df: pd.DataFrame) -> BitmapIndex:
+    """Return the bitmap index of a versioned dataset.
+
+    Parameters
+    ----------
+    version : str
+        Version token of ``_df``; used as the cache key.
+    _df : pd.DataFrame
+        The full dataset. Not hashed by Streamlit.
+
+    Returns
+    -------
+    BitmapIndex
+        Output of ``bitmap_index.build_bitmap_index``, built once per version
+        and shared by all sessions.
+    """
+    return build_bitmap_index(_df)
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def cached_figure(
+    version: str,
+    chart_id: str,
+    selections: str,
+    _build: Callable[[], Optional[go.Figure]],
+) -> Optional[go.Figure]:
+    """Return a chart figure, building it only for a new key.
+
+    Parameters
+    ----------
+    version : str
+        Version token of the data the chart is drawn from.
+    chart_id : str
+        Name of the chart, unique within the dashboard.
+    selections : str
+        Token of the widget selections that change the chart but not the data
+        version, e.g. from ``derive_version``; empty if there are none.
+    _build : Callable[[], Optional[go.Figure]]
+        Computes the chart's aggregates and builds the figure. Not hashed by
+        Streamlit; only called on a cache miss.
+
+    Returns
+    -------
+    Optional[go.Figure]
+        The figure, or None if ``_build`` found nothing to plot. The figure is
+        shared by all sessions and must not be modified.
+
+    Purpose
+    -------
+    Every rerun redraws the whole dashboard, including after a change to an
+    unrelated widget. Keyed by data version, chart and selections, unchanged
+    charts are served as already built figures and Streamlit only serializes
+    them, skipping both the aggregation and the figure construction. Figures
+    are only kept in memory: after a restart they are rebuilt from the
+    aggregates in the aggregate store, which are a fraction of their size.
+    """
+    return _build()
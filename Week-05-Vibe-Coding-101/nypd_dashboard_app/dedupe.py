@@ -0,0 +1,222 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+
+# Column subsets whose duplicates are reported in the data quality report. None
+# stands for all columns.
+DUPLICATE_SUBSETS: Dict[str, Optional[List[str]]] = {
+    "All columns": None,
+    "Arrest key": ["arrest_key"],
+    "Date, location and offense": [
+        "ARREST_DATE",
+        "latitude",
+        "longitude",
+        "OFNS_DESC",
+    ],
+    "Date, location, offense and person": [
+        "ARREST_DATE",
+        "latitude",
+        "longitude",
+        "OFNS_DESC",
+        "AGE_GROUP",
+        "PERP_SEX",
+        "PERP_RACE",
+    ],
+}
+
+# Multiplier and offset of the FNV-1a hash, used to combine column hashes into
+# row hashes.
+_FNV_PRIME = np.uint64(0x100000001B3)
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Scramble 64-bit integers with the splitmix64 finalizer."""
+    values = values ^ (values >> np.uint64(30))
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+
+def _hash_column(values: pd.Series) -> np.ndarray:
+    """Hash the values of one column to 64-bit integers.
+
+    Numbers, dates and booleans are hashed directly. Text and categorical
+    columns are factorized first, which is several times faster than hashing
+    every string, and their codes are scrambled; such hashes are only
+    comparable within the same column.
+    """
+    dtype = values.dtype
+    if (
+        pd.api.types.is_numeric_dtype(dtype)
+        or pd.api.types.is_datetime64_any_dtype(dtype)
+    ) and not isinstance(dtype, pd.CategoricalDtype):
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+    codes, _ = pd.factorize(values)
+    return _mix(codes.astype(np.int64).view(np.uint64))
+
+
+def hash_columns(
+    df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """Hash every value of the given columns to a 64-bit fingerprint.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataset, or a ``DataView`` of it. Columns are materialized one at a
+        time.
+    columns : Optional[Sequence[str]]
+        Columns to hash. Defaults to all columns.
+    workers : Optional[int]
+        Number of threads hashing columns in parallel; defaults to the
+        executor's default.
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        Per column, the uint64 hash of each row's value. Equal values, including
+        missing values, get equal hashes within a column.
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        tasks = {column: pool.submit(_hash_column, df[column]) for column in columns}
+        return {column: task.result() for column, task in tasks.items()}
+
+
+def combine_hashes(column_hashes: Sequence[np.ndarray], n_rows: int) -> np.ndarray:
+    """Combine per-column hashes into one 64-bit fingerprint per row.
+
+    The columns are folded in order with the FNV-1a step, so rows get equal
+    fingerprints when all their column hashes are equal, and different rows
+    collide with a probability of about 2**-64 per pair.
+    """
+    result = np.full(n_rows, _FNV_OFFSET, dtype=np.uint64)
+    for hashes in column_hashes:
+        result ^= hashes
+        result *= _FNV_PRIME
+    return result
+
+
+def hash_rows(
+    df: pd.DataFrame,
+    columns: Optional[Sequence[str]] = None,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """Return a 64-bit fingerprint of every row over the given columns."""
+    hashes = hash_columns(df, columns, workers=workers)
+    return combine_hashes(list(hashes.values()), len(df))
+
+
+def duplicate_mask(fingerprints: np.ndarray) -> np.ndarray:
+    """Mark the rows whose fingerprint already occurred in an earlier row.
+
+    Parameters
+    ----------
+    fingerprints : np.ndarray
+        Row fingerprints from ``hash_rows``.
+
+    Returns
+    -------
+    np.ndarray
+        Boolean mask, True for every repeated row; the first occurrence of each
+        fingerprint is kept.
+
+    Purpose
+    -------
+    A stable sort groups equal fingerprints with their positions in increasing
+    order, so duplicates are found in O(n log n) on one integer array, without
+    comparing rows to each other.
+    """
+    order = np.argsort(fingerprints, kind="stable")
+    ordered = fingerprints[order]
+    repeated = np.zeros(len(fingerprints), dtype=bool)
+    repeated[order[1:][ordered[1:] == ordered[:-1]]] = True
+    return repeated
+
+
+def count_duplicates(fingerprints: np.ndarray) -> int:
+    """Return the number of rows repeating an earlier row's fingerprint."""
+    return int(len(fingerprints) - len(np.unique(fingerprints)))
+
+
+def duplicate_counts(
+    df: pd.DataFrame,
+    subsets: Optional[Dict[str, Optional[List[str]]]] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, int]:
+    """Count duplicated rows over several column subsets.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataset, or a ``DataView`` of it.
+    subsets : Optional[Dict[str, Optional[List[str]]]]
+        Named column subsets; None means all columns. Defaults to
+        ``DUPLICATE_SUBSETS``. Subsets with a column missing from ``df`` are
+        skipped.
+    workers : Optional[int]
+        Number of hashing threads.
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of rows repeating an earlier row on each subset's columns.
+
+    Purpose
+    -------
+    Every column is hashed once, and each subset only combines the hashes of
+    its columns, so adding a subset costs one pass over integer arrays.
+    """
+    subsets = subsets if subsets is not None else DUPLICATE_SUBSETS
+    resolved = {
+        name: list(df.columns) if columns is None else columns
+        for name, columns in subsets.items()
+    }
+    resolved = {
+        name: columns
+        for name, columns in resolved.items()
+        if all(column in df.columns for column in columns)
+    }
+    needed = list(dict.fromkeys(c for columns in resolved.values() for c in columns))
+    hashes = hash_columns(df, needed, workers=workers)
+    return {
+        name: count_duplicates(
+            combine_hashes([hashes[column] for column in columns], len(df))
+        )
+        for name, columns in resolved.items()
+    }
+
+
+def drop_duplicates(
+    df: pd.DataFrame, key: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """Remove repeated rows, keeping the first occurrence.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataset.
+    key : Optional[Sequence[str]]
+        Columns identifying a record, e.g. ``["arrest_key"]``; rows repeating an
+        earlier key are dropped even if other columns differ. Defaults to exact
+        duplicates over all columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``df`` itself if there are no duplicates, otherwise the remaining rows
+        with their original index.
+    """
+    repeated = duplicate_mask(hash_rows(df, key))
+    if not repeated.any():
+        return df
+    return df[~repeated]
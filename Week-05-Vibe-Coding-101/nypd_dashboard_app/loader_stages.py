@@ -0,0 +1,563 @@
+# Import libraries.
+import glob
+import hashlib
+import inspect
+import io
+import os
+
+import dedupe
+import memory_profile
+import pandas as pd
+import streamlit as st
+
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from memory_profile import downcast_frame
+from selection import sort_by_date
+
+
+# Directory (relative to the dataset file) where stage checkpoints are stored.
+CHECKPOINT_DIR = ".loader_cache"
+
+# Source column identifying an arrest; re-published records repeat it.
+ARREST_KEY_COLUMN = "arrest_key"
+
+# Bytes read at a time when hashing the source file.
+HASH_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def validate_and_clean_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Validate and clean the dataset to prevent data type errors.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Raw dataset that needs validation and cleaning.
+
+    Returns
+    -------
+    pd.DataFrame
+        Cleaned dataset with validated data types and standardized formats.
+
+    Purpose
+    -------
+    This function ensures data quality by validating data types, handling missing values,
+    and standardizing categorical columns to prevent errors in downstream analysis.
+    """
+    try:
+        # Create a copy to avoid modifying the original
+        clean_df = df.copy()
+
+        # Ensure all categorical columns are strings
+        categorical_cols = [
+            "ARREST_BORO",
+            "PERP_SEX",
+            "LAW_CAT_CD",
+            "OFNS_DESC",
+            "PERP_RACE",
+            "AGE_GROUP",
+        ]
+        for col in categorical_cols:
+            if col in clean_df.columns:
+                clean_df[col] = clean_df[col].fillna("Unknown").astype(str)
+
+        # Handle coordinate columns
+        if "latitude" in clean_df.columns:
+            clean_df["latitude"] = pd.to_numeric(clean_df["latitude"], errors="coerce")
+        if "longitude" in clean_df.columns:
+            clean_df["longitude"] = pd.to_numeric(
+                clean_df["longitude"], errors="coerce"
+            )
+
+        return clean_df
+
+    except Exception as e:
+        st.warning(f"Data validation warning: {str(e)}")
+        return df
+
+
+def parse_stage(file_path: str) -> pd.DataFrame:
+    """Parse the raw CSV file."""
+    return pd.read_csv(file_path)
+
+
+def dedupe_stage(raw: pd.DataFrame) -> pd.DataFrame:
+    """Drop re-published arrests, keeping the first record of each arrest key.
+
+    Without an arrest key column, exact duplicate rows are dropped instead.
+    """
+    key = [ARREST_KEY_COLUMN] if ARREST_KEY_COLUMN in raw.columns else None
+    return dedupe.drop_duplicates(raw, key)
+
+
+def rename_stage(raw: pd.DataFrame) -> pd.DataFrame:
+    """Copy source columns to the upper-case names used by the dashboard."""
+    # Map actual column names to expected names for consistency
+    column_mapping = {
+        "arrest_date": "ARREST_DATE",
+        "arrest_boro": "ARREST_BORO",
+        "age_group": "AGE_GROUP",
+        "perp_sex": "PERP_SEX",
+        "perp_race": "PERP_RACE",
+        "ofns_desc": "OFNS_DESC",
+        "pd_desc": "PD_DESC",
+        "law_cat_cd": "LAW_CAT_CD",
+        "jurisdiction_code": "JURISDICTION_CODE",
+        "latitude": "latitude",
+        "longitude": "longitude",
+    }
+
+    renamed = pd.DataFrame(index=raw.index)
+    for old_name, new_name in column_mapping.items():
+        if old_name in raw.columns and old_name != new_name:
+            renamed[new_name] = raw[old_name]
+    return renamed
+
+
+def dates_stage(renamed: pd.DataFrame) -> pd.DataFrame:
+    """Convert the arrest date column to datetime."""
+    dates = pd.DataFrame(index=renamed.index)
+    if "ARREST_DATE" in renamed.columns:
+        try:
+            # Convert date column to datetime with error handling
+            dates["ARREST_DATE"] = pd.to_datetime(
+                renamed["ARREST_DATE"], errors="coerce"
+            )
+        except Exception as e:
+            st.warning(f"Date processing warning: {str(e)}")
+    return dates
+
+
+def temporal_stage(dates: pd.DataFrame) -> pd.DataFrame:
+    """Derive year, month, day-of-week and quarter features from the arrest date."""
+    temporal = pd.DataFrame(index=dates.index)
+    if "ARREST_DATE" in dates.columns and dates["ARREST_DATE"].notna().any():
+        # Extract additional temporal features only for valid dates
+        arrest_date = dates["ARREST_DATE"]
+        temporal["YEAR"] = arrest_date.dt.year.fillna(2024)
+        temporal["MONTH"] = arrest_date.dt.month.fillna(1)
+        temporal["DAY_OF_WEEK"] = arrest_date.dt.day_name().fillna("Unknown")
+        temporal["QUARTER"] = arrest_date.dt.quarter.fillna(1)
+    else:
+        # Create dummy temporal features if there are no valid dates
+        temporal["YEAR"] = 2024
+        temporal["MONTH"] = 1
+        temporal["DAY_OF_WEEK"] = "Unknown"
+        temporal["QUARTER"] = 1
+    return temporal
+
+
+def categoricals_stage(renamed: pd.DataFrame) -> pd.DataFrame:
+    """Clean and standardize the categorical columns."""
+    categoricals = pd.DataFrame(index=renamed.index)
+    try:
+        for col in ["ARREST_BORO", "PERP_SEX", "LAW_CAT_CD"]:
+            if col in renamed.columns:
+                categoricals[col] = (
+                    renamed[col].fillna("Unknown").astype(str).str.upper()
+                )
+        for col in ["OFNS_DESC", "PD_DESC"]:
+            if col in renamed.columns:
+                categoricals[col] = renamed[col].fillna("Unknown").astype(str)
+    except Exception as e:
+        st.warning(f"Some categorical columns could not be standardized: {e}")
+    return categoricals
+
+
+def age_groups_stage(renamed: pd.DataFrame) -> pd.DataFrame:
+    """Map raw age groups to the cleaned set used for analysis."""
+    age_groups = pd.DataFrame(index=renamed.index)
+    try:
+        if "AGE_GROUP" in renamed.columns:
+            age_mapping = {
+                "18-24": "18-24",
+                "25-44": "25-44",
+                "45-64": "45-64",
+                "65+": "65+",
+                "<18": "<18",
+            }
+            age_groups["AGE_GROUP_CLEAN"] = (
+                renamed["AGE_GROUP"].astype(str).map(age_mapping).fillna("Unknown")
+            )
+        else:
+            age_groups["AGE_GROUP_CLEAN"] = "Unknown"
+    except Exception as e:
+        st.warning(f"Age group mapping failed: {e}")
+        age_groups["AGE_GROUP_CLEAN"] = "Unknown"
+    return age_groups
+
+
+def validate_stage(*parts: pd.DataFrame) -> pd.DataFrame:
+    """Assemble the column groups of the earlier stages, validate and sort by date."""
+    df = parts[0].copy()
+    for part in parts[1:]:
+        for col in part.columns:
+            df[col] = part[col]
+    return sort_by_date(validate_and_clean_data(df))
+
+
+def downcast_stage(validated: pd.DataFrame) -> pd.DataFrame:
+    """Apply the memory advisor's recommended downcasts to the validated data."""
+    return downcast_frame(validated)
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A named step of the loader DAG.
+
+    Attributes
+    ----------
+    name : str
+        Unique stage name, also used in checkpoint file names.
+    func : Callable[..., pd.DataFrame]
+        Function computing the stage output. A stage without inputs receives the
+        source file path; any other stage receives the outputs of its inputs in order.
+    inputs : Tuple[str, ...]
+        Names of the upstream stages.
+    helpers : Tuple[Union[Callable, ModuleType], ...]
+        Other functions or modules used by ``func`` whose code is part of the
+        fingerprint.
+    """
+
+    name: str
+    func: Callable[..., pd.DataFrame]
+    inputs: Tuple[str, ...] = ()
+    helpers: Tuple[Union[Callable, ModuleType], ...] = ()
+
+
+# Stages in topological order. Each derived stage returns only the columns it
+# produces, so a change to one stage re-executes that stage and the final
+# assembly but none of its siblings. The optional "downcast" stage is only run
+# when it is requested as the target.
+LOADER_STAGES: List[Stage] = [
+    Stage("parse", parse_stage),
+    Stage("dedupe", dedupe_stage, ("parse",), (dedupe,)),
+    Stage("rename", rename_stage, ("dedupe",)),
+    Stage("dates", dates_stage, ("rename",)),
+    Stage("temporal", temporal_stage, ("dates",)),
+    Stage("categoricals", categoricals_stage, ("rename",)),
+    Stage("age_groups", age_groups_stage, ("rename",)),
+    Stage(
+        "validate",
+        validate_stage,
+        ("dedupe", "rename", "dates", "temporal", "categoricals", "age_groups"),
+        (validate_and_clean_data, sort_by_date),
+    ),
+    Stage(
+        "downcast",
+        downcast_stage,
+        ("validate",),
+        (memory_profile,),
+    ),
+]
+
+
+def source_signature(file_path: str, size: Optional[int] = None) -> Dict[str, Any]:
+    """Hash the contents of the source file, or of its first ``size`` bytes.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the source CSV file.
+    size : Optional[int]
+        Number of leading bytes to hash. Defaults to the whole file.
+
+    Returns
+    -------
+    Dict[str, Any]
+        JSON-serializable ``size`` and ``sha1`` of the hashed bytes. Stored in
+        the metadata catalog, so that a later version of the file can be
+        recognized as this version with rows appended, see ``appended_offset``.
+    """
+    size = os.path.getsize(file_path) if size is None else size
+    digest = hashlib.sha1()
+    remaining = size
+    with open(file_path, "rb") as f:
+        while remaining > 0:
+            chunk = f.read(min(HASH_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return {"size": size, "sha1": digest.hexdigest()}
+
+
+def appended_offset(
+    file_path: str, previous: Optional[Dict[str, Any]]
+) -> Optional[int]:
+    """Return where the rows appended to an earlier version of the source start.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the source CSV file.
+    previous : Optional[Dict[str, Any]]
+        ``source_signature`` of the earlier version, e.g. from its catalog.
+
+    Returns
+    -------
+    Optional[int]
+        The size of the earlier version if the file starts with exactly its
+        bytes, ending on a complete line, and continues with more rows; None
+        if the file was changed in any other way or ``previous`` is unknown.
+    """
+    if not previous:
+        return None
+    offset = previous["size"]
+    if os.path.getsize(file_path) <= offset or offset == 0:
+        return None
+    with open(file_path, "rb") as f:
+        f.seek(offset - 1)
+        if f.read(1) != b"\n":
+            return None
+    if source_signature(file_path, offset)["sha1"] != previous["sha1"]:
+        return None
+    return offset
+
+
+def parse_appended(file_path: str, offset: int) -> pd.DataFrame:
+    """Parse the rows of the source CSV file after ``offset`` bytes, with its header."""
+    with open(file_path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        rows = f.read()
+    return pd.read_csv(io.BytesIO(header + rows))
+
+
+def _code_fingerprint(stage: Stage) -> str:
+    """Hash the source code of a stage function and its helpers."""
+    sources = []
+    for obj in (stage.func,) + stage.helpers:
+        try:
+            sources.append(inspect.getsource(obj))
+        except (OSError, TypeError):
+            sources.append(obj.__name__)
+    return hashlib.sha1("\n".join(sources).encode("utf-8")).hexdigest()
+
+
+def stage_fingerprints(stages: List[Stage], source_version: str) -> Dict[str, str]:
+    """Compute the fingerprint of every stage without executing any of them.
+
+    Parameters
+    ----------
+    stages : List[Stage]
+        Stages in topological order.
+    source_version : str
+        Fingerprint of the source file, the input of stages without inputs.
+
+    Returns
+    -------
+    Dict[str, str]
+        Mapping of stage name to a 16 character fingerprint.
+
+    Purpose
+    -------
+    A stage's fingerprint covers its name, its code and the fingerprints of its
+    inputs, so editing a stage changes its own fingerprint and those of all its
+    descendants but leaves every other stage untouched.
+    """
+    fingerprints: Dict[str, str] = {}
+    for stage in stages:
+        upstream = [fingerprints[name] for name in stage.inputs] or [source_version]
+        raw = "|".join([stage.name, _code_fingerprint(stage)] + upstream)
+        fingerprints[stage.name] = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+    return fingerprints
+
+
+def _checkpoint_path(cache_dir: str, name: str, fingerprint: str) -> str:
+    """Return the checkpoint file path of a stage output."""
+    return os.path.join(cache_dir, f"{name}-{fingerprint}.pkl")
+
+
+def _write_checkpoint(
+    cache_dir: str, name: str, fingerprint: str, df: pd.DataFrame
+) -> None:
+    """Persist a stage output and remove checkpoints of older versions of the stage."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _checkpoint_path(cache_dir, name, fingerprint)
+    tmp_path = f"{path}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    for stale in glob.glob(os.path.join(cache_dir, f"{name}-*.pkl")):
+        if stale != path:
+            os.remove(stale)
+
+
+def _default_cache_dir(file_path: str) -> str:
+    """Return the checkpoint directory next to the source file."""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), CHECKPOINT_DIR)
+
+
+def run_loader_stages(
+    file_path: str,
+    source_version: str,
+    stages: Optional[List[Stage]] = None,
+    target: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    outputs: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """Run the loader DAG, re-executing only stages without a valid checkpoint.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the source CSV file.
+    source_version : str
+        Fingerprint of the source file from ``fingerprint_source``.
+    stages : Optional[List[Stage]]
+        Stages in topological order. Defaults to ``LOADER_STAGES``.
+    target : Optional[str]
+        Stage whose output is returned. Defaults to ``"validate"``.
+    cache_dir : Optional[str]
+        Checkpoint directory. Defaults to ``CHECKPOINT_DIR`` next to the source file.
+    outputs : Optional[Dict[str, pd.DataFrame]]
+        Stage outputs of this version that are already computed, e.g. the
+        ``validate`` output of ``append_loader_stages``; used instead of their
+        checkpoints.
+
+    Returns
+    -------
+    Tuple[pd.DataFrame, List[str]]
+        The target stage output and the names of the stages that were executed.
+
+    Purpose
+    -------
+    This function resolves the target stage from the top down: a stage whose
+    fingerprinted checkpoint exists is read from disk and its inputs are never
+    touched, otherwise its inputs are resolved first and the stage is executed
+    and checkpointed.
+    """
+    stages = stages if stages is not None else LOADER_STAGES
+    target = target if target is not None else "validate"
+    if cache_dir is None:
+        cache_dir = _default_cache_dir(file_path)
+
+    by_name = {stage.name: stage for stage in stages}
+    fingerprints = stage_fingerprints(stages, source_version)
+    outputs = dict(outputs) if outputs is not None else {}
+    executed: List[str] = []
+
+    def resolve(name: str) -> pd.DataFrame:
+        if name in outputs:
+            return outputs[name]
+        stage = by_name[name]
+        path = _checkpoint_path(cache_dir, name, fingerprints[name])
+        if os.path.exists(path):
+            outputs[name] = pd.read_pickle(path)
+            return outputs[name]
+        if stage.inputs:
+            result = stage.func(*[resolve(upstream) for upstream in stage.inputs])
+        else:
+            result = stage.func(file_path)
+        try:
+            _write_checkpoint(cache_dir, name, fingerprints[name], result)
+        except OSError:
+            # A read-only or full disk only costs the incremental rebuild.
+            pass
+        executed.append(name)
+        outputs[name] = result
+        return result
+
+    return resolve(target), executed
+
+
+def append_loader_stages(
+    file_path: str,
+    source_version: str,
+    previous_version: str,
+    offset: int,
+    stages: Optional[List[Stage]] = None,
+    cache_dir: Optional[str] = None,
+) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Extend the validated dataset of an earlier version with appended rows.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the source CSV file.
+    source_version : str
+        Fingerprint of the source file from ``fingerprint_source``.
+    previous_version : str
+        Fingerprint of the earlier version of the file.
+    offset : int
+        Where the appended rows start, from ``appended_offset``.
+    stages : Optional[List[Stage]]
+        Stages in topological order. Defaults to ``LOADER_STAGES``.
+    cache_dir : Optional[str]
+        Checkpoint directory. Defaults to ``CHECKPOINT_DIR`` next to the source file.
+
+    Returns
+    -------
+    Optional[Tuple[pd.DataFrame, pd.DataFrame]]
+        The ``validate`` output of ``source_version`` and the validated rows
+        that were added to the earlier version's, or None if the earlier
+        version's ``validate`` checkpoint is missing, e.g. after a code change.
+
+    Purpose
+    -------
+    The stages up to ``validate`` work row by row, so only the appended rows
+    are parsed and run through them, and the result is merged into the
+    checkpoint of the earlier version. Appended rows repeating an arrest of the
+    earlier version, or of an earlier appended row, are dropped as
+    ``dedupe_stage`` would drop them. The merged dataset is checkpointed as the
+    ``validate`` output of ``source_version`` and equals a full rebuild, since
+    both are stably sorted by date with the earlier rows first.
+    """
+    stages = stages if stages is not None else LOADER_STAGES
+    if cache_dir is None:
+        cache_dir = _default_cache_dir(file_path)
+    previous_path = _checkpoint_path(
+        cache_dir,
+        "validate",
+        stage_fingerprints(stages, previous_version)["validate"],
+    )
+    if not os.path.exists(previous_path):
+        return None
+    previous = pd.read_pickle(previous_path)
+
+    raw = parse_appended(file_path, offset)
+    if any(column not in previous.columns for column in raw.columns):
+        return None
+    # Parse the appended rows with the types inferred for the earlier version
+    for column in raw.columns:
+        try:
+            raw[column] = raw[column].astype(previous[column].dtype)
+        except (TypeError, ValueError):
+            pass
+
+    # Drop repeated arrests against the earlier rows, hashed together with them
+    key = [ARREST_KEY_COLUMN] if ARREST_KEY_COLUMN in raw.columns else list(raw.columns)
+    fingerprints = dedupe.hash_rows(pd.concat([previous[key], raw[key]]))
+    repeated = dedupe.duplicate_mask(fingerprints)[len(previous) :]
+
+    by_name = {stage.name: stage for stage in stages}
+    outputs: Dict[str, pd.DataFrame] = {"dedupe": raw[~repeated]}
+
+    def resolve(name: str) -> pd.DataFrame:
+        if name not in outputs:
+            stage = by_name[name]
+            outputs[name] = stage.func(
+                *[resolve(upstream) for upstream in stage.inputs]
+            )
+        return outputs[name]
+
+    rows = resolve("validate")
+    for column in rows.columns:
+        if column in previous.columns and rows[column].dtype != previous[column].dtype:
+            try:
+                rows[column] = rows[column].astype(previous[column].dtype)
+            except (TypeError, ValueError):
+                pass
+    validated = sort_by_date(pd.concat([previous, rows], ignore_index=True))
+    try:
+        _write_checkpoint(
+            cache_dir,
+            "validate",
+            stage_fingerprints(stages, source_version)["validate"],
+            validated,
+        )
+    except OSError:
+        pass
+    return validated, rows
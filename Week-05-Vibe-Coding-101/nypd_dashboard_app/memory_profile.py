@@ -0,0 +1,231 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from typing import Dict, Optional, Tuple
+
+
+# Columns holding geographic coordinates, where float32 precision (about 1 meter)
+# is sufficient.
+COORDINATE_COLUMNS = ("latitude", "longitude")
+
+# String columns with at most this share of distinct values become categoricals.
+CATEGORY_MAX_DISTINCT_RATIO = 0.5
+
+# Integers below this magnitude are represented exactly by float32.
+FLOAT32_EXACT_LIMIT = 2**24
+
+
+def _smallest_int_dtype(min_value: float, max_value: float) -> Optional[str]:
+    """Return the smallest signed integer dtype that holds the given range."""
+    for dtype in ("int8", "int16", "int32", "int64"):
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return dtype
+    return None
+
+
+def recommend_downcast(
+    df: pd.DataFrame, column: str, distinct: int
+) -> Tuple[str, Optional[str]]:
+    """Recommend a cheaper representation for one column.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset containing the column.
+    column : str
+        Name of the column to inspect.
+    distinct : int
+        Number of distinct non-null values in the column.
+
+    Returns
+    -------
+    Tuple[str, Optional[str]]
+        The recommended action (``"keep"``, ``"downcast"``, ``"categorize"`` or
+        ``"drop"``) and the target dtype, or the column that makes this one
+        redundant when the action is ``"drop"``.
+
+    Purpose
+    -------
+    Raw source columns that were copied to an upper-case name during loading are
+    redundant. Integer columns are downcast to the smallest integer type holding
+    their range, coordinates and integral floats to float32, and low-cardinality
+    text columns to categoricals.
+    """
+    series = df[column]
+    renamed = column.upper()
+    if renamed != column and renamed in df.columns:
+        return "drop", renamed
+
+    if pd.api.types.is_bool_dtype(series) or isinstance(
+        series.dtype, pd.CategoricalDtype
+    ):
+        return "keep", None
+
+    if pd.api.types.is_integer_dtype(series):
+        if len(series) == 0:
+            return "keep", None
+        target = _smallest_int_dtype(series.min(), series.max())
+        if target is not None and np.dtype(target).itemsize < series.dtype.itemsize:
+            return "downcast", target
+        return "keep", None
+
+    if pd.api.types.is_float_dtype(series):
+        if series.dtype.itemsize <= 4:
+            return "keep", None
+        if column in COORDINATE_COLUMNS:
+            return "downcast", "float32"
+        values = series.dropna()
+        if len(values) == 0 or not np.all(np.mod(values, 1) == 0):
+            return "keep", None
+        if len(values) == len(series):
+            target = _smallest_int_dtype(values.min(), values.max())
+            if target is not None and target != "int64":
+                return "downcast", target
+        if values.abs().max() < FLOAT32_EXACT_LIMIT:
+            return "downcast", "float32"
+        return "keep", None
+
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        if len(series) > 0 and distinct <= CATEGORY_MAX_DISTINCT_RATIO * len(series):
+            return "categorize", "category"
+
+    return "keep", None
+
+
+def _projected_bytes(
+    series: pd.Series, action: str, target: Optional[str], distinct: int
+) -> Tuple[int, int]:
+    """Estimate the bytes of a column after applying a recommendation.
+
+    Returns the part that scales with the number of rows and the fixed part.
+    """
+    if action == "drop":
+        return 0, 0
+    if action == "downcast":
+        return len(series) * np.dtype(target).itemsize, 0
+    if action == "categorize":
+        codes_dtype = _smallest_int_dtype(-1, distinct)
+        values = series.dropna().drop_duplicates()
+        categories_bytes = int(values.memory_usage(deep=True, index=False))
+        return len(series) * np.dtype(codes_dtype).itemsize, categories_bytes
+    return int(series.memory_usage(deep=True, index=False)), 0
+
+
+def profile_memory(df: pd.DataFrame, full_rows: Optional[int] = None) -> pd.DataFrame:
+    """Report memory usage, cardinality and a downcast recommendation per column.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset (usually the loaded sample) to profile.
+    full_rows : Optional[int]
+        Number of rows of the full dataset. When given, sizes are also projected
+        from the sample to the full dataset.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per column with its data type, bytes, distinct values, the
+        recommended action and target, and current and projected bytes for the
+        full dataset.
+
+    Purpose
+    -------
+    This function is the memory advisor of the data layer. Per-row costs are
+    scaled linearly to the full dataset; the dictionary of a categorical column
+    is counted once since it does not grow with the number of rows.
+    """
+    rows = len(df)
+    scale = full_rows / rows if full_rows and rows else 1.0
+    current_bytes = df.memory_usage(deep=True, index=False)
+
+    records = []
+    for column in df.columns:
+        series = df[column]
+        distinct = int(series.nunique(dropna=True))
+        action, target = recommend_downcast(df, column, distinct)
+        scaled, fixed = _projected_bytes(series, action, target, distinct)
+        records.append(
+            {
+                "Column": column,
+                "Data Type": str(series.dtype),
+                "Distinct Values": distinct,
+                "Action": action,
+                "Target": target,
+                "Bytes": int(current_bytes[column]),
+                "Projected Bytes": scaled + fixed,
+                "Full Bytes": int(current_bytes[column] * scale),
+                "Full Projected Bytes": int(scaled * scale) + fixed,
+            }
+        )
+    return pd.DataFrame.from_records(records)
+
+
+def summarize_savings(profile: pd.DataFrame) -> Dict[str, int]:
+    """Sum the current and projected bytes of a memory profile.
+
+    Parameters
+    ----------
+    profile : pd.DataFrame
+        Output of ``profile_memory``.
+
+    Returns
+    -------
+    Dict[str, int]
+        Totals for the sample and the full dataset, before and after the
+        recommended downcasts.
+    """
+    return {
+        "sample_bytes": int(profile["Bytes"].sum()),
+        "sample_projected_bytes": int(profile["Projected Bytes"].sum()),
+        "full_bytes": int(profile["Full Bytes"].sum()),
+        "full_projected_bytes": int(profile["Full Projected Bytes"].sum()),
+    }
+
+
+def apply_downcasts(df: pd.DataFrame, profile: pd.DataFrame) -> pd.DataFrame:
+    """Apply the recommendations of a memory profile to a dataset.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset to downcast. It is not modified.
+    profile : pd.DataFrame
+        Output of ``profile_memory`` for ``df``. A profile of a sample must not be
+        used, since integer ranges seen in a sample may not cover the full data.
+
+    Returns
+    -------
+    pd.DataFrame
+        A new dataset with redundant columns dropped and the remaining columns
+        converted to their recommended types.
+    """
+    actions = profile.set_index("Column")
+    drop_columns = [
+        col for col in actions.index[actions["Action"] == "drop"] if col in df.columns
+    ]
+    optimized = df.drop(columns=drop_columns)
+    conversions = {
+        col: actions.at[col, "Target"]
+        for col in actions.index[actions["Action"].isin(["downcast", "categorize"])]
+        if col in optimized.columns
+    }
+    return optimized.astype(conversions)
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Profile a dataset and apply all recommended downcasts to it.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset to optimize.
+
+    Returns
+    -------
+    pd.DataFrame
+        The optimized dataset, see ``apply_downcasts``.
+    """
+    return apply_downcasts(df, profile_memory(df))
@@ -10,61 +10,88 @@ from datetime import datetime, timedelta
 from plotly.subplots import make_subplots
 from typing import Dict, List, Tuple, Optional, Any, Union
 
+from approximate import CONFIDENCE_LEVEL, ERROR_TARGETS, required_sample_size
+from catalog import (
+    build_catalog,
+    catalog_path,
+    read_catalog,
+    update_catalog,
+    write_catalog,
+)
+from chart_stream import ChartStream
+from charts import (
+    MONTH_NAMES,
+    age_bar_chart,
+    day_of_week_bar_chart,
+    monthly_bar_chart,
+    race_bar_chart,
+)
+from cross_filter import (
+    LATENCY_BUDGET_MS,
+    LATENCY_WINDOW,
+    active_cross_filters,
+    chart_options,
+    clear_cross_filters,
+    describe_cross_filters,
+    finish_interaction,
+    latency_monitor,
+    table_selection_callback,
+)
+from crosstab import (
+    CROSSTAB_DIMENSIONS,
+    MAX_CROSSTAB_DIMENSIONS,
+    dimension_labels,
+)
+from data_layer import (
+    DATASET_FILE,
+    aggregate_store,
+    cached_bitmap_index,
+    cached_count_cube,
+    cached_date_index,
+    cached_memory_profile,
+    cached_quality_report,
+    cached_sample_keys,
+    cached_strata_codes,
+    carry_count_cube,
+    dataset_version,
+    derive_version,
+    fingerprint_source,
+)
+from loader_stages import (
+    append_loader_stages,
+    appended_offset,
+    run_loader_stages,
+    source_signature,
+)
+from memory_profile import summarize_savings
+from offense_hierarchy import LAW_CATEGORY_NAMES, OFFENSE_LEVEL_NAMES
+from quality_profile import duplicates_frame, quality_frame, summarize_quality
+from query_planner import FilteredData, QueryPlanner
+from significance import (
+    CORRECTIONS,
+    SIGNIFICANCE_LEVEL,
+    compare_distributions,
+    compare_proportions,
+)
+from selection import (
+    MIN_PER_STRATUM,
+    SAMPLE_SEED,
+    WEIGHT_COLUMN,
+    DataView,
+    RowSelection,
+    SampleDesign,
+    SelectionCache,
+    build_sample_keys,
+    date_range_slice,
+    sample_positions,
+    stratified_sample,
+)
+
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
 
 
-def validate_and_clean_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Validate and clean the dataset to prevent data type errors.
-
-    Parameters
-    ----------
-    df : pd.DataFrame
-        Raw dataset that needs validation and cleaning.
-
-    Returns
-    -------
-    pd.DataFrame
-        Cleaned dataset with validated data types and standardized formats.
-
-    Purpose
-    -------
-    This function ensures data quality by validating data types, handling missing values,
-    and standardizing categorical columns to prevent errors in downstream analysis.
-    """
-    try:
-        # Create a copy to avoid modifying the original
-        clean_df = df.copy()
-
-        # Ensure all categorical columns are strings
-        categorical_cols = [
-            "ARREST_BORO",
-            "PERP_SEX",
-            "LAW_CAT_CD",
-            "OFNS_DESC",
-            "PERP_RACE",
-            "AGE_GROUP",
-        ]
-        for col in categorical_cols:
-            if col in clean_df.columns:
-                clean_df[col] = clean_df[col].fillna("Unknown").astype(str)
-
-        # Handle coordinate columns
-        if "latitude" in clean_df.columns:
-            clean_df["latitude"] = pd.to_numeric(clean_df["latitude"], errors="coerce")
-        if "longitude" in clean_df.columns:
-            clean_df["longitude"] = pd.to_numeric(
-                clean_df["longitude"], errors="coerce"
-            )
-
-        return clean_df
-
-    except Exception as e:
-        st.warning(f"Data validation warning: {str(e)}")
-        return df
-
-
 # Page configuration
 st.set_page_config(
     page_title="NYPD Arrests Dashboard",
@@ -102,14 +129,22 @@ st.markdown(
 )
 
 
-@st.cache_data
-def load_full_nypd_data(file_path: str) -> pd.DataFrame:
+@st.cache_resource(max_entries=2)
+def load_full_nypd_data(
+    file_path: str, source_version: str, optimize_memory: bool = False
+) -> pd.DataFrame:
     """Load the full NYPD arrests dataset from CSV file with caching.
 
     Parameters
     ----------
     file_path : str
         Path to the CSV file containing the NYPD arrests dataset.
+    source_version : str
+        Fingerprint of the CSV file from ``fingerprint_source``. It is part of the
+        cache key so a re-downloaded file is not served from a stale cache.
+    optimize_memory : bool
+        If True, also run the ``downcast`` stage, which applies the memory
+        advisor's recommended downcasts to the loaded data.
 
     Returns
     -------
@@ -119,110 +154,62 @@ def load_full_nypd_data(file_path: str) -> pd.DataFrame:
     Purpose
     -------
     This function loads the entire NYPD arrests dataset once and caches it for performance.
+    The cached frame is shared by all sessions, which only hold row views into it, so it
+    must never be modified in place.
     It processes column names, converts dates, creates temporal features, and standardizes
     categorical data. The cached result prevents reloading the same data multiple times.
+    Each processing step is a checkpointed stage of ``loader_stages.LOADER_STAGES``, so
+    after a code change only the affected stages are re-executed. A small metadata
+    catalog (see ``catalog.build_catalog``) is written next to the file, from which the
+    dashboard reads its header metrics and widget options.
+    If the file is the previously loaded version with rows appended, only the new rows
+    are processed (see ``loader_stages.append_loader_stages``), and the previous
+    version's count cube and catalog are updated with them instead of being rebuilt.
     """
     try:
-        # Load the full dataset
-        df = pd.read_csv(file_path)
-        st.info(f"Loaded full dataset: {len(df):,} rows")
-
-        # Map actual column names to expected names for consistency
-        column_mapping = {
-            "arrest_date": "ARREST_DATE",
-            "arrest_boro": "ARREST_BORO",
-            "age_group": "AGE_GROUP",
-            "perp_sex": "PERP_SEX",
-            "perp_race": "PERP_RACE",
-            "ofns_desc": "OFNS_DESC",
-            "law_cat_cd": "LAW_CAT_CD",
-            "jurisdiction_code": "JURISDICTION_CODE",
-            "latitude": "latitude",
-            "longitude": "longitude",
-        }
-
-        # Rename columns to match expected names
-        for old_name, new_name in column_mapping.items():
-            if old_name in df.columns:
-                df[new_name] = df[old_name]
-
-        # Process arrest date
-        if "ARREST_DATE" in df.columns:
-            try:
-                # Convert date column to datetime with error handling
-                df["ARREST_DATE"] = pd.to_datetime(df["ARREST_DATE"], errors="coerce")
-
-                # Only create temporal features for valid dates
-                valid_dates = df["ARREST_DATE"].dropna()
-                if len(valid_dates) > 0:
-                    # Extract additional temporal features only for valid dates
-                    df["YEAR"] = df["ARREST_DATE"].dt.year.fillna(2024)
-                    df["MONTH"] = df["ARREST_DATE"].dt.month.fillna(1)
-                    df["DAY_OF_WEEK"] = (
-                        df["ARREST_DATE"].dt.day_name().fillna("Unknown")
-                    )
-                    df["QUARTER"] = df["ARREST_DATE"].dt.quarter.fillna(1)
-                else:
-                    # Create dummy temporal features if no valid dates
-                    df["YEAR"] = 2024
-                    df["MONTH"] = 1
-                    df["DAY_OF_WEEK"] = "Unknown"
-                    df["QUARTER"] = 1
-            except Exception as e:
-                st.warning(f"Date processing warning: {str(e)}")
-                # Create dummy temporal features if date parsing fails
-                df["YEAR"] = 2024
-                df["MONTH"] = 1
-                df["DAY_OF_WEEK"] = "Unknown"
-                df["QUARTER"] = 1
-        else:
-            # Create dummy temporal features if no date column
-            df["YEAR"] = 2024
-            df["MONTH"] = 1
-            df["DAY_OF_WEEK"] = "Unknown"
-            df["QUARTER"] = 1
-
-        # Clean and standardize categorical columns
-        try:
-            if "ARREST_BORO" in df.columns:
-                df["ARREST_BORO"] = (
-                    df["ARREST_BORO"].fillna("Unknown").astype(str).str.upper()
+        # The catalog of the last loaded version tells whether rows were only appended
+        catalog_file = catalog_path(file_path)
+        previous = read_catalog(catalog_file, None, optimize_memory)
+        appended = None
+        if previous is not None and previous["source_version"] != source_version:
+            offset = appended_offset(file_path, previous["source"])
+            if offset is not None:
+                appended = append_loader_stages(
+                    file_path, source_version, previous["source_version"], offset
                 )
-            if "PERP_SEX" in df.columns:
-                df["PERP_SEX"] = (
-                    df["PERP_SEX"].fillna("Unknown").astype(str).str.upper()
-                )
-            if "LAW_CAT_CD" in df.columns:
-                df["LAW_CAT_CD"] = (
-                    df["LAW_CAT_CD"].fillna("Unknown").astype(str).str.upper()
-                )
-            if "OFNS_DESC" in df.columns:
-                df["OFNS_DESC"] = df["OFNS_DESC"].fillna("Unknown").astype(str)
 
-        except Exception as e:
-            st.warning(f"Some categorical columns could not be standardized: {e}")
+        # Run the loader stages, reusing every checkpoint that is still valid
+        clean_df, executed_stages = run_loader_stages(
+            file_path,
+            source_version,
+            target="downcast" if optimize_memory else "validate",
+            outputs=None if appended is None else {"validate": appended[0]},
+        )
+        st.info(f"Loaded full dataset: {len(clean_df):,} rows")
+        if executed_stages:
+            st.info(f"Rebuilt loader stages: {', '.join(executed_stages)}")
+        if appended is not None:
+            st.info(f"Appended {len(appended[1]):,} new rows to the previous version")
+            # Update the count cube of the previous version with the new rows
+            carry_count_cube(
+                dataset_version(previous["source_version"], optimize_memory),
+                dataset_version(source_version, optimize_memory),
+                appended[1],
+                len(clean_df),
+            )
 
-        # Create age group mapping for better analysis
-        try:
-            if "AGE_GROUP" in df.columns:
-                age_mapping = {
-                    "18-24": "18-24",
-                    "25-44": "25-44",
-                    "45-64": "45-64",
-                    "65+": "65+",
-                    "<18": "<18",
-                }
-                df["AGE_GROUP_CLEAN"] = (
-                    df["AGE_GROUP"].astype(str).map(age_mapping).fillna("Unknown")
+        # Write the metadata catalog next to the dataset, once per version
+        if read_catalog(catalog_file, source_version, optimize_memory) is None:
+            source = source_signature(file_path)
+            if appended is None:
+                catalog = build_catalog(
+                    clean_df, source_version, optimize_memory, source
                 )
             else:
-                df["AGE_GROUP_CLEAN"] = "Unknown"
-        except Exception as e:
-            st.warning(f"Age group mapping failed: {e}")
-            df["AGE_GROUP_CLEAN"] = "Unknown"
-
-        # Validate and clean the data before returning
-        clean_df = validate_and_clean_data(df)
+                catalog = update_catalog(
+                    previous, appended[1], clean_df, source_version, source
+                )
+            write_catalog(catalog_file, catalog)
         return clean_df
 
     except FileNotFoundError:
@@ -238,7 +225,13 @@ def filter_and_sample_data(
     sample_size: int,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-) -> pd.DataFrame:
+    date_index: Optional[np.ndarray] = None,
+    sample_keys: Optional[np.ndarray] = None,
+    strata_codes: Optional[np.ndarray] = None,
+    selection_cache: Optional[SelectionCache] = None,
+    cache_key: Optional[str] = None,
+    error_target: Optional[float] = None,
+) -> DataView:
     """Filter and sample data from a pre-loaded dataset.
 
     Parameters
@@ -251,58 +244,394 @@ def filter_and_sample_data(
         Start date for filtering (inclusive). If None, no start date filtering is applied.
     end_date : Optional[datetime]
         End date for filtering (inclusive). If None, no end date filtering is applied.
+    date_index : Optional[np.ndarray]
+        Sorted arrest dates of ``df`` from ``cached_date_index``. When given, the
+        date range is found by binary search and returned as a zero-copy row slice
+        instead of scanning the whole dataset with boolean masks.
+    sample_keys : Optional[np.ndarray]
+        Per-row sampling priorities of ``df`` from ``cached_sample_keys``. The
+        sample is the ``sample_size`` lowest-priority rows of the date range,
+        which is reproducible and nested across sample sizes. Computed on the
+        fly if not given.
+    strata_codes : Optional[np.ndarray]
+        Per-row stratum codes of ``df`` from ``cached_strata_codes``. When given,
+        a stratified sample is drawn that keeps at least ``MIN_PER_STRATUM`` rows
+        of every borough and offense combination, and each sampled row gets its
+        weight in ``WEIGHT_COLUMN``.
+    selection_cache : Optional[SelectionCache]
+        The session's cache of recent selections.
+    cache_key : Optional[str]
+        Version token of the requested selection, used as the cache key.
+    error_target : Optional[float]
+        Margin of error on shares, in percentage points, for approximate query
+        mode. When given, ``sample_size`` is ignored and the smallest sample that
+        meets the target is drawn; its counts are scaled to the whole date range
+        and get confidence intervals.
 
     Returns
     -------
-    pd.DataFrame
-        Filtered and sampled dataset based on the specified parameters.
+    DataView
+        Filtered and sampled dataset based on the specified parameters, as a view of
+        row positions into ``df`` that materializes columns on demand.
 
     Purpose
     -------
     This function applies date filtering and sampling to a pre-loaded dataset without
     reloading the source data. It first filters by date range if specified, then
     samples the filtered data to the requested size for performance optimization.
+    Selections are cached as row positions, so revisiting a recent date range and
+    sample size skips the filtering and sampling entirely.
     """
     try:
-        # Create a copy to avoid modifying the original
-        filtered_df = df.copy()
-
-        # Apply date filtering if dates are provided
-        if start_date is not None and end_date is not None:
-            # Filter data to the specified date range
-            filtered_df = filtered_df[
-                (filtered_df["ARREST_DATE"] >= start_date)
-                & (filtered_df["ARREST_DATE"] <= end_date)
-            ]
-            st.info(
-                f"Filtered to date range: {start_date.strftime('%m/%d/%Y')} to {end_date.strftime('%m/%d/%Y')} - {len(filtered_df)} rows remaining"
+        use_cache = selection_cache is not None and cache_key is not None
+        selection = selection_cache.get(cache_key) if use_cache else None
+        if selection is not None:
+            st.info("Reusing a recently loaded selection with the same settings")
+        else:
+            selection = select_rows(
+                df,
+                sample_size,
+                start_date,
+                end_date,
+                date_index,
+                sample_keys,
+                strata_codes,
+                error_target,
             )
+            if use_cache:
+                selection_cache.put(cache_key, selection)
 
-        # Apply sampling AFTER date filtering
-        if sample_size > 0 and len(filtered_df) > sample_size:
-            filtered_df = filtered_df.sample(
-                n=sample_size, random_state=42
-            )  # Use fixed random state for reproducibility
-            st.info(f"Sampled {sample_size:,} rows from the date-filtered data")
-        elif sample_size > 0:
+        return DataView.from_selection(df, selection)
+
+    except Exception as e:
+        st.error(f"Error filtering and sampling data: {str(e)}")
+        return DataView(df, slice(0, len(df)))
+
+
+def select_rows(
+    df: pd.DataFrame,
+    sample_size: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    date_index: Optional[np.ndarray] = None,
+    sample_keys: Optional[np.ndarray] = None,
+    strata_codes: Optional[np.ndarray] = None,
+    error_target: Optional[float] = None,
+) -> RowSelection:
+    """Select the rows of a date range and sample of the full dataset.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Pre-loaded full dataset to be filtered and sampled.
+    sample_size : int
+        Number of rows to sample from the filtered data.
+    start_date : Optional[datetime]
+        Start date for filtering (inclusive).
+    end_date : Optional[datetime]
+        End date for filtering (inclusive).
+    date_index : Optional[np.ndarray]
+        Sorted arrest dates of ``df``, see ``filter_and_sample_data``.
+    sample_keys : Optional[np.ndarray]
+        Per-row sampling priorities of ``df``, see ``filter_and_sample_data``.
+    strata_codes : Optional[np.ndarray]
+        Per-row stratum codes of ``df``, see ``filter_and_sample_data``.
+    error_target : Optional[float]
+        Margin of error for approximate query mode, see ``filter_and_sample_data``.
+
+    Returns
+    -------
+    RowSelection
+        Positions of the selected rows in ``df`` and, for stratified and
+        approximate-query samples, their weights and sample design.
+
+    Purpose
+    -------
+    This function does the filtering and sampling work of
+    ``filter_and_sample_data`` on row positions only, without copying any data.
+    """
+    selected_rows = slice(0, len(df))
+
+    # Apply date filtering if dates are provided
+    if start_date is not None and end_date is not None:
+        # Filter data to the specified date range
+        if date_index is not None:
+            selected_rows = date_range_slice(date_index, start_date, end_date)
+        else:
+            selected_rows = np.flatnonzero(
+                (df["ARREST_DATE"] >= start_date) & (df["ARREST_DATE"] <= end_date)
+            ).astype(np.int32)
+    selected_count = (
+        len(range(*selected_rows.indices(len(df))))
+        if isinstance(selected_rows, slice)
+        else len(selected_rows)
+    )
+    if start_date is not None and end_date is not None:
+        st.info(
+            f"Filtered to date range: {start_date.strftime('%m/%d/%Y')} to {end_date.strftime('%m/%d/%Y')} - {selected_count} rows remaining"
+        )
+
+    # Size the sample from the error target in approximate query mode
+    if error_target is not None:
+        stratum_sizes = (
+            np.bincount(strata_codes[selected_rows])
+            if strata_codes is not None
+            else np.array([selected_count])
+        )
+        sample_size = required_sample_size(
+            stratum_sizes,
+            error_target / 100,
+            CONFIDENCE_LEVEL,
+            MIN_PER_STRATUM if strata_codes is not None else 0,
+        )
+        st.info(
+            f"Error target of ±{error_target}% at {CONFIDENCE_LEVEL:.0%} confidence needs {sample_size:,} of {selected_count:,} rows"
+        )
+
+    # Apply sampling AFTER date filtering
+    if sample_size > 0 and selected_count > sample_size:
+        if sample_keys is None:
+            sample_keys = build_sample_keys(len(df))
+        if strata_codes is not None:
+            positions, weights = stratified_sample(
+                strata_codes, sample_keys, selected_rows, sample_size
+            )
+        else:
+            positions = sample_positions(sample_keys, selected_rows, sample_size)
+            weights = None
+        if len(positions) > sample_size:
             st.info(
-                f"Date-filtered data contains {len(filtered_df):,} rows (less than requested sample size)"
+                f"Sampled {len(positions):,} rows from the date-filtered data, more than the requested {sample_size:,}, so that every borough and offense combination has a row"
             )
+        else:
+            st.info(f"Sampled {sample_size:,} rows from the date-filtered data")
+        if error_target is None:
+            return RowSelection(positions.astype(np.int32), weights)
+
+        # Approximate-query samples estimate counts of the whole date range
+        if weights is None:
+            weights = np.full(len(positions), selected_count / len(positions))
+        if strata_codes is not None:
+            stratum_population = np.bincount(strata_codes[selected_rows])
+            design = SampleDesign(
+                selected_count,
+                len(positions),
+                True,
+                strata_codes,
+                np.bincount(strata_codes[positions], minlength=len(stratum_population)),
+                stratum_population,
+            )
+        else:
+            design = SampleDesign(selected_count, len(positions))
+        return RowSelection(positions.astype(np.int32), weights, design)
+    elif sample_size > 0:
+        st.info(
+            f"Date-filtered data contains {selected_count:,} rows (less than requested sample size)"
+        )
+    return RowSelection(selected_rows)
 
-        return filtered_df
 
-    except Exception as e:
-        st.error(f"Error filtering and sampling data: {str(e)}")
-        return df
+def describe_arrest_count(planner: QueryPlanner, data: FilteredData) -> str:
+    """Describe the arrests matching a filter, e.g. for a tab's filter summary.
+
+    Parameters
+    ----------
+    planner : QueryPlanner
+        Query layer of the rerun.
+    data : FilteredData
+        The filtered data.
 
+    Returns
+    -------
+    str
+        The exact count, e.g. "1,650 arrests", or in approximate query mode
+        the estimate for the whole date range with the sampled rows it rests
+        on, e.g. "an estimated 9,051 arrests (196 sampled rows)". A filter
+        without sampled rows, e.g. a rare PD description, has no estimate
+        rather than an estimate of zero.
+    """
+    rows = planner.row_count(data)
+    estimate = planner.estimated_count(data)
+    if estimate is None:
+        return f"{rows:,} arrests"
+    if rows == 0:
+        return "no sampled arrests (too rare in the sample to estimate; turn off approximate query mode for exact counts)"
+    return f"an estimated {estimate:,.0f} arrests ({rows:,} sampled row{'s' if rows != 1 else ''})"
 
-def display_dataset_overview(df: pd.DataFrame) -> None:
+
+def count_error_bars(
+    intervals: Optional[pd.DataFrame], labels: List[Any]
+) -> Optional[Dict[str, Any]]:
+    """Build Plotly error bars from the confidence intervals of chart counts.
+
+    Parameters
+    ----------
+    intervals : Optional[pd.DataFrame]
+        Output of ``QueryPlanner.count_intervals``; None for exact counts.
+    labels : List[Any]
+        Values on the chart axis, in plotting order.
+
+    Returns
+    -------
+    Optional[Dict[str, Any]]
+        An ``error_y`` specification for ``go.Bar``, or None if there are no
+        intervals.
+    """
+    if intervals is None:
+        return None
+    aligned = intervals.reindex(labels)
+    return dict(
+        type="data",
+        symmetric=False,
+        array=(aligned["Upper"] - aligned["Estimate"]).to_numpy(),
+        arrayminus=(aligned["Estimate"] - aligned["Lower"]).to_numpy(),
+        visible=True,
+    )
+
+
+def select_offense_path(
+    planner: QueryPlanner, prefix: str
+) -> Tuple[Dict[str, List[str]], Dict[str, str]]:
+    """Show drill-down selectboxes for the levels of the offense hierarchy.
+
+    Parameters
+    ----------
+    planner : QueryPlanner
+        Query layer of the rerun. Each level offers the values of its
+        ``offense_hierarchy`` under the values selected above it.
+    prefix : str
+        Prefix of the widget keys, e.g. "temporal".
+
+    Returns
+    -------
+    Tuple[Dict[str, List[str]], Dict[str, str]]
+        The selected values per level for ``QueryPlanner.filter``, with every
+        value of a level left at "All", and the selected value of each level
+        that is not, from the top of the hierarchy down.
+    """
+    hierarchy = planner.offense_hierarchy()
+    if hierarchy is None:
+        # Without every level in the data, offenses are a flat list
+        offense_options = planner.options("OFNS_DESC")
+        selected_offense_display = st.selectbox(
+            "Select Offense Type:",
+            options=["All Incidents"] + offense_options,
+            index=0,
+            key=f"{prefix}_offense_select",
+            help="Choose which offense type to analyze, or select 'All Incidents' for all offense types",
+        )
+        if selected_offense_display == "All Incidents":
+            return {"OFNS_DESC": offense_options}, {}
+        return {"OFNS_DESC": [selected_offense_display]}, {
+            "OFNS_DESC": selected_offense_display
+        }
+
+    level_widgets = {
+        "LAW_CAT_CD": ("All Categories", f"{prefix}_law_category_select"),
+        "OFNS_DESC": ("All Incidents", f"{prefix}_offense_select"),
+        "PD_DESC": ("All Descriptions", f"{prefix}_pd_desc_select"),
+    }
+    selections: Dict[str, List[str]] = {}
+    path: Dict[str, str] = {}
+    # Without PD descriptions the drill-down stops at the offense
+    for level in hierarchy.levels:
+        all_label, key = level_widgets[level]
+        ancestors = {ancestor: [value] for ancestor, value in path.items()}
+        selected = st.selectbox(
+            f"Select {OFFENSE_LEVEL_NAMES[level]}:",
+            options=[all_label] + hierarchy.children(level, **ancestors),
+            index=0,
+            key=key,
+            format_func=(
+                (lambda value: LAW_CATEGORY_NAMES.get(value, value))
+                if level == "LAW_CAT_CD"
+                else str
+            ),
+            help=f"Narrow the selection above to one {OFFENSE_LEVEL_NAMES[level].lower()}, or select '{all_label}' to include all of them",
+        )
+        if selected == all_label:
+            selections[level] = planner.options(level)
+        else:
+            selections[level] = [selected]
+            path[level] = selected
+    return selections, path
+
+
+def show_offense_breakdown(
+    planner: QueryPlanner, data: FilteredData, path: Dict[str, str]
+) -> None:
+    """Show the arrests of the selected offenses one level down the hierarchy.
+
+    Parameters
+    ----------
+    planner : QueryPlanner
+        Query layer of the rerun.
+    data : FilteredData
+        The data before the offense selections, e.g. narrowed to a borough.
+        Its ``offense_hierarchy`` is computed once, and every drill-down or
+        roll-up of the selections is answered from it.
+    path : Dict[str, str]
+        Selected value per level, from ``select_offense_path``.
+    """
+    hierarchy = planner.offense_hierarchy(data)
+    if hierarchy is None:
+        return
+    depth = max((hierarchy.levels.index(level) + 1 for level in path), default=0)
+    if depth == len(hierarchy.levels):
+        return
+    child = hierarchy.levels[depth]
+    counts = hierarchy.rollup(
+        child, **{level: [value] for level, value in path.items()}
+    )
+    child_name = OFFENSE_LEVEL_NAMES[child]
+    estimated = planner.estimated_count(data) is not None
+    with st.expander(f"Arrests by {child_name.lower()}"):
+        if counts.empty:
+            st.info(
+                "No sampled arrests under this selection, so no estimate is available; turn off approximate query mode for exact counts."
+            )
+            return
+        if estimated:
+            st.caption(
+                "Estimated arrests of the whole date range; paths without sampled arrests are not listed."
+            )
+        breakdown = counts.rename_axis(child_name).reset_index(name="Arrests")
+        if child == "LAW_CAT_CD":
+            breakdown[child_name] = breakdown[child_name].map(
+                lambda value: LAW_CATEGORY_NAMES.get(value, value)
+            )
+        breakdown["Share"] = 100 * breakdown["Arrests"] / max(int(counts.sum()), 1)
+        st.dataframe(
+            breakdown,
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "Arrests": st.column_config.NumberColumn(format="localized"),
+                "Share": st.column_config.NumberColumn(format="%.1f%%"),
+            },
+        )
+
+
+def display_dataset_overview(
+    df: DataView,
+    data_version: str,
+    full_rows: Optional[int] = None,
+    planner: Optional[QueryPlanner] = None,
+) -> None:
     """Display comprehensive overview of the dataset including basic statistics.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The NYPD arrests dataset to be displayed and analyzed.
+    df : DataView
+        The session's loaded rows of the NYPD arrests dataset, to be displayed and
+        analyzed. A view of the shared full dataset, not a copy of it.
+    data_version : str
+        Version token of ``df``, used as the key of all cached aggregates.
+    full_rows : Optional[int]
+        Number of rows of the full dataset, used to project memory usage.
+    planner : Optional[QueryPlanner]
+        Query layer of this rerun, shared by the analysis tabs. Created from
+        ``df`` and ``data_version`` if not given.
 
     Returns
     -------
@@ -315,6 +644,9 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
     borough information, date ranges, and creates tabs for different types of
     analysis (geographic, temporal, demographics, and dataset information).
     """
+    if planner is None:
+        planner = QueryPlanner(df, data_version)
+
     st.markdown(
         '<h1 class="main-header">NYPD Arrests Dashboard</h1>', unsafe_allow_html=True
     )
@@ -334,7 +666,7 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
     with col2:
         # Check if ARREST_BORO exists
         if "ARREST_BORO" in df.columns:
-            borough_count = df["ARREST_BORO"].nunique()
+            borough_count = len(planner.options("ARREST_BORO"))
         else:
             borough_count = "N/A"
 
@@ -350,8 +682,7 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
     if "ARREST_BORO" in df.columns:
         try:
             # Clean borough data and ensure it's string type
-            boroughs_raw = df["ARREST_BORO"].dropna().astype(str)
-            boroughs = sorted(boroughs_raw.unique())
+            boroughs = planner.options("ARREST_BORO")
             borough_names = {
                 "B": "Bronx",
                 "K": "Brooklyn",
@@ -375,23 +706,29 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
     # Date range below the metrics
     if "ARREST_DATE" in df.columns:
         try:
-            # Ensure ARREST_DATE is datetime type
-            if df["ARREST_DATE"].dtype == "object":
-                # Convert string dates to datetime, handling errors
-                df["ARREST_DATE"] = pd.to_datetime(df["ARREST_DATE"], errors="coerce")
-
-            # Check if we have valid dates after conversion
-            valid_dates = df["ARREST_DATE"].dropna()
-            if len(valid_dates) > 0:
-                min_date = valid_dates.min()
-                max_date = valid_dates.max()
-                if pd.notna(min_date) and pd.notna(max_date):
-                    date_range = f"{min_date.strftime('%m/%d/%Y')} to {max_date.strftime('%m/%d/%Y')}"
-                    days_diff = (max_date - min_date).days
-                    date_range_with_days = f"{date_range} <span style='color: white;'>({days_diff} days)</span>"
+            # First and last date of the loaded rows, read from the sorted date index
+            date_bounds = planner.date_bounds()
+            if date_bounds is None:
+                # Ensure ARREST_DATE is datetime type
+                arrest_dates = df["ARREST_DATE"]
+                if arrest_dates.dtype == "object":
+                    # Convert string dates to datetime, handling errors
+                    arrest_dates = pd.to_datetime(arrest_dates, errors="coerce")
+
+                # Check if we have valid dates after conversion
+                valid_dates = arrest_dates.dropna()
+                date_bounds = (
+                    (valid_dates.min(), valid_dates.max())
+                    if len(valid_dates) > 0
+                    else (None, None)
+                )
+
+            min_date, max_date = date_bounds
+            if pd.notna(min_date) and pd.notna(max_date):
+                date_range = f"{min_date.strftime('%m/%d/%Y')} to {max_date.strftime('%m/%d/%Y')}"
+                days_diff = (max_date - min_date).days
+                date_range_with_days = f"{date_range} <span style='color: white;'>({days_diff} days)</span>"
 
-                else:
-                    date_range_with_days = "N/A"
             else:
                 date_range_with_days = "N/A"
         except Exception as e:
@@ -405,6 +742,23 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
         unsafe_allow_html=True,
     )
 
+    # Weighted samples report estimated counts
+    if getattr(df, "design", None) is not None:
+        st.info(
+            f"Approximate query mode: chart counts are estimates for the whole selected date range from a sample of {df.design.sample_rows:,} of {df.design.population:,} rows; error bars show {CONFIDENCE_LEVEL:.0%} confidence intervals"
+        )
+    elif planner.cube is not None:
+        st.info(
+            f"Chart counts are exact counts of all {planner.cube.total():,} arrests in the selected date range, answered from the pre-aggregated count cube"
+        )
+    elif WEIGHT_COLUMN in df.columns:
+        st.info(
+            "Stratified sample: chart counts are weighted estimates for the whole selected date range"
+        )
+
+    # Cross-filter summary, above the tabs; filled by the analysis fragment
+    analysis = st.container()
+
     # Create tabs for different analyses
     tab1, tab2, tab3, tab4 = st.tabs(
         [
@@ -415,15 +769,6 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
         ]
     )
 
-    with tab1:
-        create_geographic_analysis(df)
-
-    with tab2:
-        create_temporal_analysis(df)
-
-    with tab3:
-        create_demographic_analysis(df)
-
     with tab4:
         # Dataset information
         st.markdown(
@@ -442,49 +787,260 @@ def display_dataset_overview(df: pd.DataFrame) -> None:
         """
         )
 
+        # Quality metrics of the sample, or of the full dataset from the catalog
+        quality_scopes = ["Current sample"]
+        if planner.catalog is not None:
+            quality_scopes.append("Full dataset")
+        quality_scope = st.radio(
+            "Compute data quality metrics over",
+            quality_scopes,
+            horizontal=True,
+            key="quality_scope_radio",
+            help="Full dataset metrics are computed once when the data is loaded and stored in its metadata catalog",
+        )
+        if quality_scope == "Full dataset":
+            quality_report = planner.catalog
+        else:
+            quality_report = cached_quality_report(data_version, df)
+        quality = summarize_quality(quality_report)
+
         # Data preview
         st.markdown("### Data Preview")
         col1, col2 = st.columns(2)
 
         with col1:
             st.markdown("**First 5 rows:**")
-            st.dataframe(df.head(), use_container_width=True)
+            st.dataframe(df.head(), width="stretch")
 
         with col2:
             st.markdown("**Data types:**")
-            dtype_info = pd.DataFrame(
-                {
-                    "Column": df.columns,
-                    "Data Type": df.dtypes.astype(str),
-                    "Non-Null Count": df.count(),
-                }
-            )
-            st.dataframe(dtype_info, use_container_width=True)
+            dtype_info = quality_frame(quality_report)
+            st.dataframe(dtype_info, width="stretch", hide_index=True)
 
         # Data quality metrics
-        st.markdown("### Data Quality Metrics For The Current Sample Size")
+        if quality_scope == "Full dataset":
+            st.markdown(
+                f"### Data Quality Metrics For The Full Dataset ({quality_report['rows']:,} Rows)"
+            )
+        else:
+            st.markdown("### Data Quality Metrics For The Current Sample Size")
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            missing_data = df.isnull().sum().sum()
-            st.metric("Missing Values", f"{missing_data:,}")
+            st.metric("Missing Values", f"{quality['missing_values']:,}")
 
         with col2:
-            memory_usage = df.memory_usage(deep=True).sum() / 1024 / 1024
-            st.metric("Memory Usage", f"{memory_usage:.1f} MB")
+            st.metric("Memory Usage", f"{quality['memory_bytes'] / 1024 / 1024:.1f} MB")
 
         with col3:
-            duplicate_rows = df.duplicated().sum()
-            st.metric("Duplicate Rows", f"{duplicate_rows:,}")
+            st.metric("Duplicate Rows", f"{quality['duplicate_rows']:,}")
+
+        # Duplicates found by comparing 64-bit row hashes over column subsets
+        with st.expander("Duplicate rows by compared columns"):
+            st.dataframe(
+                duplicates_frame(quality_report),
+                width="stretch",
+                hide_index=True,
+            )
+            st.caption(
+                "Arrests re-published with the same arrest key are removed when the data is loaded"
+            )
+
+        # Per-column memory profile, computed once per data version
+        memory_profile = cached_memory_profile(data_version, df, full_rows)
+        savings = summarize_savings(memory_profile)
+
+        # Memory breakdown and downcast recommendations
+        st.markdown("### Memory Usage By Column")
+        col1, col2, col3 = st.columns(3)
 
+        with col1:
+            memory_usage = savings["sample_bytes"] / 1024 / 1024
+            projected_usage = savings["sample_projected_bytes"] / 1024 / 1024
+            st.metric(
+                "Sample After Recommended Downcasts",
+                f"{projected_usage:.1f} MB",
+                delta=f"{projected_usage - memory_usage:.1f} MB",
+                delta_color="inverse",
+            )
 
-def create_temporal_analysis(df: pd.DataFrame) -> None:
+        with col2:
+            full_usage = savings["full_bytes"] / 1024 / 1024
+            full_projected_usage = savings["full_projected_bytes"] / 1024 / 1024
+            st.metric(
+                "Projected Full Dataset",
+                f"{full_projected_usage:.1f} MB",
+                delta=f"{full_projected_usage - full_usage:.1f} MB from {full_usage:.1f} MB",
+                delta_color="inverse",
+            )
+
+        with col3:
+            st.metric(
+                "Session Memory (Row Index)",
+                f"{df.nbytes / 1024 / 1024:.1f} MB",
+                help="This session only stores the positions of its rows in the shared full dataset; the sample sizes above are what a materialized copy would take",
+            )
+
+        memory_display = memory_profile.copy()
+        memory_display["Memory (MB)"] = (memory_display["Bytes"] / 1024 / 1024).round(2)
+        memory_display["Projected (MB)"] = (
+            memory_display["Projected Bytes"] / 1024 / 1024
+        ).round(2)
+        st.dataframe(
+            memory_display[
+                [
+                    "Column",
+                    "Data Type",
+                    "Distinct Values",
+                    "Memory (MB)",
+                    "Action",
+                    "Target",
+                    "Projected (MB)",
+                ]
+            ].sort_values("Memory (MB)", ascending=False),
+            width="stretch",
+            hide_index=True,
+        )
+        st.caption(
+            "Enable 'Optimize memory usage' in the sidebar to apply these downcasts "
+            "to the full dataset when it is loaded."
+        )
+
+        # Aggregates and figures kept on disk across server restarts
+        store_stats = aggregate_store().stats()
+        if store_stats is not None:
+            st.caption(
+                f"Aggregate store: {store_stats['entries']:,} stored results "
+                f"({store_stats['bytes'] / 1024 / 1024:.1f} MB) are reused after "
+                "a restart of the dashboard."
+            )
+
+        # Time from a chart selection to the redrawn charts
+        latency = latency_monitor().summary()
+        if latency is not None:
+            st.caption(
+                f"Cross-filter updates: median {latency['p50_ms']:,.0f} ms and 95th "
+                f"percentile {latency['p95_ms']:,.0f} ms over the last "
+                f"{min(latency['interactions'], LATENCY_WINDOW):,} interactions; "
+                f"{latency['misses']:,} of {latency['interactions']:,} took longer "
+                f"than the {LATENCY_BUDGET_MS:.0f} ms budget."
+            )
+
+    # Charts narrowed by the cross-filters, rerun on their own on a selection
+    with analysis:
+        display_cross_filtered_analysis(df, data_version, planner, (tab1, tab2, tab3))
+
+
+@st.fragment
+def display_cross_filtered_analysis(
+    df: DataView,
+    data_version: str,
+    planner: QueryPlanner,
+    tabs: Tuple[Any, Any, Any],
+) -> None:
+    """Display the cross-filters and the charts of the analysis tabs.
+
+    Parameters
+    ----------
+    df : DataView
+        The session's loaded rows of the NYPD arrests dataset.
+    data_version : str
+        Version token of ``df``, used as the key of all cached aggregates.
+    planner : QueryPlanner
+        Query layer of the last full rerun.
+    tabs : Tuple[Any, Any, Any]
+        The geographic, temporal and demographic tabs, created by
+        ``display_dataset_overview``.
+
+    Returns
+    -------
+    None
+        This function displays information to the Streamlit interface.
+
+    Purpose
+    -------
+    The cross-filters narrow every chart of the three analysis tabs and nothing
+    else on the page. As a fragment, a chart selection, or any other widget of
+    these tabs, reruns only this function: the sidebar, the loading checks, the
+    header and the dataset information tab are left as drawn, and the latency
+    of a selection is the time to redraw the tabs.
+    """
+    planner = planner.with_cross_filters(active_cross_filters())
+
+    # Values selected in the charts filter every other chart
+    if planner.cross_filters:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            cross_filter_labels = {
+                "MONTH": MONTH_NAMES,
+                "ARREST_BORO": {
+                    "B": "Bronx",
+                    "K": "Brooklyn",
+                    "M": "Manhattan",
+                    "Q": "Queens",
+                    "S": "Staten Island",
+                },
+            }
+            st.info(
+                f"Cross-filters: {describe_cross_filters(planner.cross_filters, cross_filter_labels)}"
+            )
+        with col2:
+            st.button(
+                "Clear cross-filters",
+                key="clear_cross_filters_button",
+                on_click=clear_cross_filters,
+            )
+    latency_placeholder = st.empty()
+
+    # The charts of all analysis tabs are built together and drawn as they finish
+    charts = ChartStream()
+    geographic_tab, temporal_tab, demographic_tab = tabs
+
+    with geographic_tab:
+        create_geographic_analysis(df, data_version, planner, charts)
+
+    with temporal_tab:
+        create_temporal_analysis(df, data_version, planner, charts)
+
+    with demographic_tab:
+        create_demographic_analysis(df, data_version, planner, charts)
+
+    charts.render()
+
+    # Report cross-filter interactions that missed their latency budget
+    duration_ms = finish_interaction()
+    if duration_ms is not None:
+        if duration_ms > LATENCY_BUDGET_MS:
+            latency_placeholder.warning(
+                f"Updating the charts took {duration_ms:,.0f} ms, over the "
+                f"{LATENCY_BUDGET_MS:.0f} ms budget of a cross-filter selection"
+            )
+        else:
+            latency_placeholder.caption(f"Charts updated in {duration_ms:,.0f} ms")
+
+
+def create_temporal_analysis(
+    df: DataView,
+    data_version: str,
+    planner: Optional[QueryPlanner] = None,
+    charts: Optional[ChartStream] = None,
+) -> None:
     """Create temporal analysis visualizations showing arrest patterns over time.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The NYPD arrests dataset to analyze for temporal patterns.
+    df : DataView
+        The session's loaded rows of the NYPD arrests dataset, to analyze for
+        temporal patterns. Columns are materialized only when a chart reads them.
+    data_version : str
+        Version token of ``df``, used as the key of all cached aggregates.
+    planner : Optional[QueryPlanner]
+        Query layer shared by the tabs of this rerun, which answers the option
+        lists, filters and chart counts. Created from ``df`` and ``data_version``
+        if not given.
+    charts : Optional[ChartStream]
+        Stream the tab's charts are submitted to, drawn by the caller. The tab
+        draws its own charts at its end if not given.
 
     Returns
     -------
@@ -498,6 +1054,12 @@ def create_temporal_analysis(df: pd.DataFrame) -> None:
     and offense type selection, allowing users to analyze time patterns for
     specific subsets of the data.
     """
+    if planner is None:
+        planner = QueryPlanner(df, data_version)
+    owns_charts = charts is None
+    if owns_charts:
+        charts = ChartStream()
+
     # Add filters for borough and offense type
     st.markdown("### Filter Temporal Analysis")
     st.markdown("*Select specific boroughs and offense types to analyze time patterns*")
@@ -508,7 +1070,7 @@ def create_temporal_analysis(df: pd.DataFrame) -> None:
     with col1:
         try:
             # Create borough options with full names for display
-            borough_codes = sorted(df["ARREST_BORO"].dropna().astype(str).unique())
+            borough_codes = planner.options("ARREST_BORO")
             borough_names = {
                 "B": "Bronx",
                 "K": "Brooklyn",
@@ -547,237 +1109,147 @@ def create_temporal_analysis(df: pd.DataFrame) -> None:
 
     with col2:
         try:
-            # Create offense options with "All Incidents" option
-            offense_options = sorted(df["OFNS_DESC"].dropna().astype(str).unique())
-            offense_display_options = ["All Incidents"] + offense_options
-
-            selected_offense_display = st.selectbox(
-                "Select Offense Type:",
-                options=offense_display_options,
-                index=0,
-                key="temporal_offense_select",
-                help="Choose which offense type to analyze, or select 'All Incidents' for all offense types",
+            # Drill down from law category to offense type to PD description
+            selected_offenses_filter, offense_path = select_offense_path(
+                planner, "temporal"
             )
 
-            # Convert selection to list for filtering
-            if selected_offense_display == "All Incidents":
-                selected_offenses_filter = offense_options  # Include all offense types
-            else:
-                selected_offenses_filter = [selected_offense_display]
-
         except Exception as e:
             st.error(f"Error loading offense options: {str(e)}")
-            selected_offenses_filter = []
+            selected_offenses_filter, offense_path = {}, {}
 
     # Apply filters to the data
     if selected_boroughs_filter and selected_offenses_filter:
-        filtered_df = df[
-            (df["ARREST_BORO"].isin(selected_boroughs_filter))
-            & (df["OFNS_DESC"].isin(selected_offenses_filter))
-        ]
+        filtered = planner.filter(
+            ARREST_BORO=selected_boroughs_filter,
+            **selected_offenses_filter,
+        )
+        filtered_count = describe_arrest_count(planner, filtered)
+        offense_scope = (
+            " > ".join(
+                LAW_CATEGORY_NAMES.get(value, value) for value in offense_path.values()
+            )
+            if offense_path
+            else "all offense types"
+        )
 
         # Show filter summary
         st.success(
-            f"Showing temporal patterns for {len(filtered_df):,} arrests from {len(selected_boroughs_filter)} borough(s) and {len(selected_offenses_filter)} offense type(s)"
+            f"Showing temporal patterns for {filtered_count} from {len(selected_boroughs_filter)} borough(s) and {offense_scope}"
+        )
+        show_offense_breakdown(
+            planner, planner.filter(ARREST_BORO=selected_boroughs_filter), offense_path
         )
 
         # Use filtered data for all temporal visualizations
-        df_to_analyze = filtered_df
+        data_to_analyze = filtered
+        tab_selections = {
+            "ARREST_BORO": selected_boroughs_filter,
+            **selected_offenses_filter,
+        }
     else:
         st.info("Select filters above to customize the temporal analysis")
-        df_to_analyze = df
+        data_to_analyze = planner.filter()
+        tab_selections = {}
+
+    # Charts that select values are not narrowed by their own selection
+    month_data = planner.filter("MONTH", **tab_selections)
+    day_data = planner.filter("DAY_OF_WEEK", **tab_selections)
 
     # Yearly trends
     st.markdown("### Annual Arrest Trends")
-    try:
+
+    def build_yearly_chart() -> Optional[go.Figure]:
         # Filter out invalid years and create yearly data
-        valid_years = df_to_analyze[
-            df_to_analyze["YEAR"].notna()
-            & (df_to_analyze["YEAR"] >= 1900)
-            & (df_to_analyze["YEAR"] <= 2030)
-        ]
-        if len(valid_years) > 0:
-            yearly_arrests = (
-                valid_years.groupby("YEAR").size().reset_index(name="Arrests")
-            )
+        year_counts = planner.value_counts(data_to_analyze, "YEAR")
+        valid_years = year_counts[
+            (year_counts.index >= 1900) & (year_counts.index <= 2030)
+        ].sort_index()
+        if len(valid_years) == 0:
+            return None
+        yearly_arrests = valid_years.rename_axis("YEAR").reset_index(name="Arrests")
+
+        fig_yearly = px.line(
+            yearly_arrests,
+            x="YEAR",
+            y="Arrests",
+            title="Arrests by Year (2006-Present)",
+            labels={"YEAR": "Year", "Arrests": "Number of Arrests"},
+            markers=True,
+            color_discrete_sequence=["#FF6B6B"],
+        )
+        fig_yearly.update_layout(height=400)
+        return fig_yearly
 
-            fig_yearly = px.line(
-                yearly_arrests,
-                x="YEAR",
-                y="Arrests",
-                title="Arrests by Year (2006-Present)",
-                labels={"YEAR": "Year", "Arrests": "Number of Arrests"},
-                markers=True,
-                color_discrete_sequence=["#FF6B6B"],
-            )
-            fig_yearly.update_layout(height=400)
-            st.plotly_chart(fig_yearly, use_container_width=True)
-        else:
-            st.warning("No valid year data available for temporal analysis")
-    except Exception as e:
-        st.error(f"Error creating yearly trends: {str(e)}")
-        st.info("This may be due to date parsing issues in the dataset")
+    charts.submit(
+        lambda: planner.figure(data_to_analyze, "yearly", build_yearly_chart),
+        "No valid year data available for temporal analysis",
+        "Error creating yearly trends",
+    )
 
     # Monthly patterns
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("### Monthly Patterns")
-        try:
-            # Filter out invalid months
-            valid_months = df_to_analyze[
-                df_to_analyze["MONTH"].notna()
-                & (df_to_analyze["MONTH"] >= 1)
-                & (df_to_analyze["MONTH"] <= 12)
-            ]
-            if len(valid_months) > 0:
-                monthly_arrests = (
-                    valid_months.groupby("MONTH").size().reset_index(name="Arrests")
-                )
-                monthly_arrests["Month_Name"] = monthly_arrests["MONTH"].map(
-                    {
-                        1: "Jan",
-                        2: "Feb",
-                        3: "Mar",
-                        4: "Apr",
-                        5: "May",
-                        6: "Jun",
-                        7: "Jul",
-                        8: "Aug",
-                        9: "Sep",
-                        10: "Oct",
-                        11: "Nov",
-                        12: "Dec",
-                    }
-                )
-
-                # Define distinct colors for each month
-                month_colors = {
-                    "Jan": "#FF5733",
-                    "Feb": "#33FF57",
-                    "Mar": "#3357FF",
-                    "Apr": "#F1C40F",
-                    "May": "#8E44AD",
-                    "Jun": "#13EDDD",
-                    "Jul": "#ED13E9",
-                    "Aug": "#F7F005",
-                    "Sep": "#3498DB",
-                    "Oct": "#E67E22",
-                    "Nov": "#05F75E",
-                    "Dec": "#34495E",
-                }
-
-                # Create the bar chart with different colors for each month
-                fig_monthly = go.Figure()
-
-                for _, row in monthly_arrests.iterrows():
-                    month_name = row["Month_Name"]
-                    arrests = row["Arrests"]
-                    color = month_colors.get(
-                        month_name, "#808080"
-                    )  # Default gray if month not found
-
-                    fig_monthly.add_trace(
-                        go.Bar(
-                            x=[month_name],
-                            y=[arrests],
-                            name=month_name,
-                            marker_color=color,
-                            showlegend=False,
-                        )
-                    )
-
-                fig_monthly.update_layout(
-                    title="Number of Arrests Per Month",
-                    xaxis_title="Month",
-                    yaxis_title="Number of Arrests",
-                    height=400,
-                    showlegend=False,
-                )
-                st.plotly_chart(fig_monthly, use_container_width=True)
-            else:
-                st.warning("No valid month data available")
-        except Exception as e:
-            st.error(f"Error creating monthly patterns: {str(e)}")
+        selected_months = planner.cross_filters.get("MONTH")
+        charts.submit(
+            lambda: planner.figure(
+                month_data,
+                "monthly",
+                lambda: monthly_bar_chart(
+                    planner.value_counts(month_data, "MONTH"), selected_months
+                ),
+                selected=selected_months,
+            ),
+            "No valid month data available",
+            "Error creating monthly patterns",
+            **chart_options("monthly"),
+        )
 
     with col2:
         st.markdown("### Day of Week Patterns")
-        try:
-            # Filter out invalid day names
-            valid_days = df_to_analyze[
-                df_to_analyze["DAY_OF_WEEK"].notna()
-                & (df_to_analyze["DAY_OF_WEEK"] != "Unknown")
-            ]
-            if len(valid_days) > 0:
-                dow_arrests = (
-                    valid_days.groupby("DAY_OF_WEEK").size().reset_index(name="Arrests")
-                )
-                dow_order = [
-                    "Monday",
-                    "Tuesday",
-                    "Wednesday",
-                    "Thursday",
-                    "Friday",
-                    "Saturday",
-                    "Sunday",
-                ]
-                dow_arrests["DAY_OF_WEEK"] = pd.Categorical(
-                    dow_arrests["DAY_OF_WEEK"], categories=dow_order, ordered=True
-                )
-                dow_arrests = dow_arrests.sort_values("DAY_OF_WEEK")
-
-                # Define distinct colors for each day of the week
-                dow_colors = {
-                    "Monday": "#3498DB",
-                    "Tuesday": "#2ECC71",
-                    "Wednesday": "#F1C40F",
-                    "Thursday": "#E67E22",
-                    "Friday": "#9B59B6",
-                    "Saturday": "#E74C3C",
-                    "Sunday": "#34495E",
-                }
-
-                # Create the bar chart with different colors for each day
-                fig_dow = go.Figure()
-
-                for _, row in dow_arrests.iterrows():
-                    day_name = row["DAY_OF_WEEK"]
-                    arrests = row["Arrests"]
-                    color = dow_colors.get(
-                        day_name, "#808080"
-                    )  # Default gray if day not found
-
-                    fig_dow.add_trace(
-                        go.Bar(
-                            x=[day_name],
-                            y=[arrests],
-                            name=day_name,
-                            marker_color=color,
-                            showlegend=False,
-                        )
-                    )
+        selected_days = planner.cross_filters.get("DAY_OF_WEEK")
+        charts.submit(
+            lambda: planner.figure(
+                day_data,
+                "day_of_week",
+                lambda: day_of_week_bar_chart(
+                    planner.value_counts(day_data, "DAY_OF_WEEK"), selected_days
+                ),
+                selected=selected_days,
+            ),
+            "No valid day of week data available",
+            "Error creating day of week patterns",
+            **chart_options("day_of_week"),
+        )
 
-                fig_dow.update_layout(
-                    title="Number of Arrests Per Day",
-                    xaxis_title="Day of Week",
-                    yaxis_title="Number of Arrests",
-                    height=400,
-                    showlegend=False,
-                )
-                st.plotly_chart(fig_dow, use_container_width=True)
-            else:
-                st.warning("No valid day of week data available")
-        except Exception as e:
-            st.error(f"Error creating day of week patterns: {str(e)}")
+    if owns_charts:
+        charts.render()
 
 
-def create_geographic_analysis(df: pd.DataFrame) -> None:
+def create_geographic_analysis(
+    df: DataView,
+    data_version: str,
+    planner: Optional[QueryPlanner] = None,
+    charts: Optional[ChartStream] = None,
+) -> None:
     """Create geographic analysis visualizations showing arrest patterns by location.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The NYPD arrests dataset to analyze for geographic patterns.
+    df : DataView
+        The session's loaded rows of the NYPD arrests dataset, to analyze for
+        geographic patterns.
+    data_version : str
+        Version token of ``df``, used as the key of all cached aggregates.
+    planner : Optional[QueryPlanner]
+        Query layer shared by the tabs of this rerun, which answers the option
+        lists, filters and chart counts. Created from ``df`` and ``data_version``
+        if not given.
+    charts : Optional[ChartStream]
+        Stream the tab's charts are submitted to, drawn by the caller. The tab
+        draws its own charts at its end if not given.
 
     Returns
     -------
@@ -791,6 +1263,11 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
     filters for borough and offense type selection, and includes options to display
     all data or sampled data for performance optimization.
     """
+    if planner is None:
+        planner = QueryPlanner(df, data_version)
+    owns_charts = charts is None
+    if owns_charts:
+        charts = ChartStream()
 
     # Geographic coordinates visualization (if coordinates are available)
     if "latitude" in df.columns and "longitude" in df.columns:
@@ -805,7 +1282,7 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
         with col1:
             try:
                 # Create borough options with full names for display
-                borough_codes = sorted(df["ARREST_BORO"].dropna().astype(str).unique())
+                borough_codes = planner.options("ARREST_BORO")
                 borough_names = {
                     "B": "Bronx",
                     "K": "Brooklyn",
@@ -845,7 +1322,7 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
         with col2:
             try:
                 # Create offense options with "All Incidents" option
-                offense_options = sorted(df["OFNS_DESC"].dropna().astype(str).unique())
+                offense_options = planner.options("OFNS_DESC")
                 offense_display_options = ["All Incidents"] + offense_options
 
                 selected_offense_display = st.selectbox(
@@ -880,7 +1357,7 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
             filter_button = st.button(
                 "Filter Map",
                 type="primary",
-                use_container_width=True,
+                width="stretch",
                 key="filter_map_button",
             )
 
@@ -889,38 +1366,48 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
         # Filter the data based on selections only when button is clicked
         if filter_button and selected_boroughs_filter and selected_offenses_filter:
             with st.spinner("Filtering map data..."):
-                filtered_df = df[
-                    (df["ARREST_BORO"].isin(selected_boroughs_filter))
-                    & (df["OFNS_DESC"].isin(selected_offenses_filter))
-                ]
-
-                # Handle data sampling based on user preference
-                if show_all_data:
-                    # Show all data with coordinates
-                    filtered_sample_df = filtered_df.dropna(
-                        subset=["latitude", "longitude"]
-                    )
-                    if len(filtered_sample_df) > 100000:
-                        st.warning(
-                            "`Map View: Showing all data may be slow with large datasets. Consider unchecking 'Show all data' for better performance."
+                filtered = planner.filter(
+                    ARREST_BORO=selected_boroughs_filter,
+                    OFNS_DESC=selected_offenses_filter,
+                )
+                filtered_df = filtered.df
+
+                def build_map() -> Optional[go.Figure]:
+                    # Materialize only the columns the map needs
+                    map_columns = filtered_df[
+                        [
+                            "latitude",
+                            "longitude",
+                            "ARREST_BORO",
+                            "ARREST_DATE",
+                            "OFNS_DESC",
+                        ]
+                    ].dropna(subset=["latitude", "longitude"])
+
+                    # Handle data sampling based on user preference
+                    if show_all_data:
+                        # Show all data with coordinates
+                        filtered_sample_df = map_columns
+                    else:
+                        # Sample data for performance - show more data when fewer filters are applied
+                        max_points = (
+                            50000
+                            if (
+                                len(selected_boroughs_filter) == len(borough_codes)
+                                and len(selected_offenses_filter)
+                                == len(offense_options)
+                            )
+                            else 10000
                         )
-                else:
-                    # Sample data for performance - show more data when fewer filters are applied
-                    max_points = (
-                        50000
-                        if (
-                            len(selected_boroughs_filter) == len(borough_codes)
-                            and len(selected_offenses_filter) == len(offense_options)
+                        filtered_sample_df = map_columns.sample(
+                            n=min(max_points, len(map_columns))
                         )
-                        else 10000
-                    )
-                    filtered_sample_df = filtered_df.dropna(
-                        subset=["latitude", "longitude"]
-                    ).sample(n=min(max_points, len(filtered_df)))
 
-                if len(filtered_sample_df) > 0:
+                    if len(filtered_sample_df) == 0:
+                        return None
+
                     # Create filtered map with full borough names
-                    filtered_map_df = filtered_sample_df.copy()
+                    filtered_map_df = filtered_sample_df
                     filtered_map_df["Borough_Name"] = filtered_map_df[
                         "ARREST_BORO"
                     ].map(borough_names)
@@ -934,11 +1421,6 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
                         "Staten Island": "#FF69B4",
                     }
 
-                    # Show filter summary
-                    st.success(
-                        f"Map View: Showing {len(filtered_sample_df):,} arrests from {len(selected_boroughs_filter)} borough(s) and {len(selected_offenses_filter)} offense type(s)"
-                    )
-
                     # Create the filtered map
                     filtered_fig_map = px.scatter_mapbox(
                         filtered_map_df,
@@ -952,7 +1434,23 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
                         zoom=10,
                     )
                     filtered_fig_map.update_layout(height=800)
-                    st.plotly_chart(filtered_fig_map, use_container_width=True)
+                    return filtered_fig_map
+
+                filtered_fig_map = planner.figure(
+                    filtered, "map", build_map, show_all_data=show_all_data
+                )
+                if filtered_fig_map is not None:
+                    map_points = sum(len(trace.lat) for trace in filtered_fig_map.data)
+                    if show_all_data and map_points > 100000:
+                        st.warning(
+                            "`Map View: Showing all data may be slow with large datasets. Consider unchecking 'Show all data' for better performance."
+                        )
+
+                    # Show filter summary
+                    st.success(
+                        f"Map View: Showing {map_points:,} arrests from {len(selected_boroughs_filter)} borough(s) and {len(selected_offenses_filter)} offense type(s)"
+                    )
+                    st.plotly_chart(filtered_fig_map, width="stretch")
                 else:
                     st.warning(
                         "No data available for the selected filters. Please adjust your selection."
@@ -965,22 +1463,29 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
         else:
             pass
 
-    # Always use the complete dataset for borough distribution
-    pie_chart_data = df
+    # Use the complete dataset for borough distribution, narrowed only by the
+    # selections made in other charts
+    pie_chart_data = planner.filter("ARREST_BORO")
+    selected_boroughs = planner.cross_filters.get("ARREST_BORO")
 
     # Count actual boroughs and offense types in the data
-    borough_count = pie_chart_data["ARREST_BORO"].nunique()
-    offense_count = pie_chart_data["OFNS_DESC"].nunique()
+    borough_count = len(planner.options("ARREST_BORO"))
+    offense_count = len(planner.options("OFNS_DESC"))
 
     chart_title = (
         "Arrest Distribution by Borough - Per Capita Rates (per 100,000 residents)"
     )
     st.success(
-        f"Pie Chart: Showing {len(pie_chart_data):,} arrests from {borough_count} borough(s) and {offense_count} offense type(s)"
+        f"Pie Chart: Showing {describe_arrest_count(planner, pie_chart_data)} from {borough_count} borough(s) and {offense_count} offense type(s)"
     )
 
-    # Create borough distribution from the selected dataset
-    boro_arrests = pie_chart_data["ARREST_BORO"].value_counts().reset_index()
+    # Create borough distribution from the selected dataset, in a fixed order so
+    # that table rows keep their borough when the counts change
+    boro_arrests = (
+        planner.value_counts(pie_chart_data, "ARREST_BORO")
+        .reindex(planner.options("ARREST_BORO"), fill_value=0)
+        .reset_index()
+    )
     boro_arrests.columns = ["Borough", "Arrests"]
 
     # Map borough codes to full names
@@ -1012,6 +1517,16 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
     ) * 100000
     boro_arrests["Arrests_Per_100k"] = boro_arrests["Arrests_Per_100k"].round(1)
 
+    # Confidence intervals of the rates in approximate query mode
+    boro_intervals = planner.count_intervals(pie_chart_data, "ARREST_BORO")
+    if boro_intervals is not None:
+        aligned = boro_intervals.reindex(boro_arrests["Borough"]).to_numpy()
+        scale = (100000 / boro_arrests["Population"]).to_numpy()
+        boro_arrests["Rate_CI"] = [
+            f"{low:,.1f} – {high:,.1f}"
+            for low, high in zip(aligned[:, 1] * scale, aligned[:, 2] * scale)
+        ]
+
     # Define consistent borough colors for pie chart
     borough_colors = {
         "Bronx": "#FF0000",
@@ -1021,29 +1536,48 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
         "Staten Island": "#FF69B4",
     }
 
-    fig_boro = go.Figure(
-        data=[
-            go.Pie(
-                labels=boro_arrests["Borough_Name"],
-                values=boro_arrests["Arrests_Per_100k"],
-                marker_colors=[
-                    borough_colors.get(boro, "#808080")
-                    for boro in boro_arrests["Borough_Name"]
-                ],
-                hovertemplate="<b>%{label}</b><br>"
-                + "Arrests per 100k: %{value}<br>"
-                + "Total Arrests: %{customdata[0]:,}<br>"
-                + "Population: %{customdata[1]:,}<extra></extra>",
-                customdata=np.stack(
-                    [boro_arrests["Arrests"].values, boro_arrests["Population"].values],
-                    axis=-1,
-                ),
-            )
-        ]
-    )
+    def build_borough_chart() -> go.Figure:
+        fig_boro = go.Figure(
+            data=[
+                go.Pie(
+                    labels=boro_arrests["Borough_Name"],
+                    values=boro_arrests["Arrests_Per_100k"],
+                    marker_colors=[
+                        borough_colors.get(boro, "#808080")
+                        for boro in boro_arrests["Borough_Name"]
+                    ],
+                    hovertemplate="<b>%{label}</b><br>"
+                    + "Arrests per 100k: %{value}<br>"
+                    + "Total Arrests: %{customdata[0]:,}<br>"
+                    + "Population: %{customdata[1]:,}<extra></extra>",
+                    customdata=np.stack(
+                        [
+                            boro_arrests["Arrests"].values,
+                            boro_arrests["Population"].values,
+                        ],
+                        axis=-1,
+                    ),
+                    # Pull out the boroughs selected in the table below
+                    pull=[
+                        0.1 if selected_boroughs and boro in selected_boroughs else 0
+                        for boro in boro_arrests["Borough"]
+                    ],
+                )
+            ]
+        )
 
-    fig_boro.update_layout(title=chart_title, height=400)
-    st.plotly_chart(fig_boro, use_container_width=True)
+        fig_boro.update_layout(title=chart_title, height=400)
+        return fig_boro
+
+    charts.submit(
+        lambda: planner.figure(
+            pie_chart_data,
+            "borough_rates",
+            build_borough_chart,
+            selected=selected_boroughs,
+        ),
+        error_message="Error creating borough distribution",
+    )
 
     # Display the per capita data table
     st.markdown("### Per Capita Arrest Rates by Borough")
@@ -1056,16 +1590,45 @@ def create_geographic_analysis(df: pd.DataFrame) -> None:
         "Population",
         "Arrests per 100k Residents",
     ]
-    st.dataframe(display_df, use_container_width=True)
+    if boro_intervals is not None:
+        display_df[f"{CONFIDENCE_LEVEL:.0%} CI per 100k"] = boro_arrests["Rate_CI"]
+    st.caption("Select boroughs in the table to filter every other chart by them")
+    st.dataframe(
+        display_df,
+        width="stretch",
+        key="borough_rates_table",
+        on_select=table_selection_callback(
+            "borough_rates_table", "ARREST_BORO", list(boro_arrests["Borough"])
+        ),
+        selection_mode="multi-row",
+    )
+
+    if owns_charts:
+        charts.render()
 
 
-def create_demographic_analysis(df: pd.DataFrame) -> None:
+def create_demographic_analysis(
+    df: DataView,
+    data_version: str,
+    planner: Optional[QueryPlanner] = None,
+    charts: Optional[ChartStream] = None,
+) -> None:
     """Create demographic analysis visualizations showing arrest patterns by demographics.
 
     Parameters
     ----------
-    df : pd.DataFrame
-        The NYPD arrests dataset to analyze for demographic patterns.
+    df : DataView
+        The session's loaded rows of the NYPD arrests dataset, to analyze for
+        demographic patterns.
+    data_version : str
+        Version token of ``df``, used as the key of all cached aggregates.
+    planner : Optional[QueryPlanner]
+        Query layer shared by the tabs of this rerun, which answers the option
+        lists, filters and chart counts. Created from ``df`` and ``data_version``
+        if not given.
+    charts : Optional[ChartStream]
+        Stream the tab's charts are submitted to, drawn by the caller. The tab
+        draws its own charts at its end if not given.
 
     Returns
     -------
@@ -1079,6 +1642,12 @@ def create_demographic_analysis(df: pd.DataFrame) -> None:
     borough and offense type selection, allowing users to analyze demographic
     patterns for specific subsets of the data.
     """
+    if planner is None:
+        planner = QueryPlanner(df, data_version)
+    owns_charts = charts is None
+    if owns_charts:
+        charts = ChartStream()
+
     # Add filters for borough and offense type
     st.markdown("### Filter Demographics")
     st.markdown(
@@ -1091,7 +1660,7 @@ def create_demographic_analysis(df: pd.DataFrame) -> None:
     with col1:
         try:
             # Create borough options with full names for display
-            borough_codes = sorted(df["ARREST_BORO"].dropna().astype(str).unique())
+            borough_codes = planner.options("ARREST_BORO")
             borough_names = {
                 "B": "Bronx",
                 "K": "Brooklyn",
@@ -1130,177 +1699,316 @@ def create_demographic_analysis(df: pd.DataFrame) -> None:
 
     with col2:
         try:
-            # Create offense options with "All Incidents" option
-            offense_options = sorted(df["OFNS_DESC"].dropna().astype(str).unique())
-            offense_display_options = ["All Incidents"] + offense_options
-
-            selected_offense_display = st.selectbox(
-                "Select Offense Type:",
-                options=offense_display_options,
-                index=0,
-                key="demographic_offense_select",
-                help="Choose which offense type to analyze, or select 'All Incidents' for all offense types",
+            # Drill down from law category to offense type to PD description
+            selected_offenses_filter, offense_path = select_offense_path(
+                planner, "demographic"
             )
 
-            # Convert selection to list for filtering
-            if selected_offense_display == "All Incidents":
-                selected_offenses_filter = offense_options  # Include all offense types
-            else:
-                selected_offenses_filter = [selected_offense_display]
-
         except Exception as e:
             st.error(f"Error loading offense options: {str(e)}")
-            selected_offenses_filter = []
+            selected_offenses_filter, offense_path = {}, {}
 
     # Apply filters to the data
     if selected_boroughs_filter and selected_offenses_filter:
-        filtered_df = df[
-            (df["ARREST_BORO"].isin(selected_boroughs_filter))
-            & (df["OFNS_DESC"].isin(selected_offenses_filter))
-        ]
+        filtered = planner.filter(
+            ARREST_BORO=selected_boroughs_filter,
+            **selected_offenses_filter,
+        )
+        filtered_count = describe_arrest_count(planner, filtered)
+        offense_scope = (
+            " > ".join(
+                LAW_CATEGORY_NAMES.get(value, value) for value in offense_path.values()
+            )
+            if offense_path
+            else "all offense types"
+        )
 
         # Show filter summary
         st.success(
-            f"Showing demographics for {len(filtered_df):,} arrests from {len(selected_boroughs_filter)} borough(s) and {len(selected_offenses_filter)} offense type(s)"
+            f"Showing demographics for {filtered_count} from {len(selected_boroughs_filter)} borough(s) and {offense_scope}"
+        )
+        show_offense_breakdown(
+            planner, planner.filter(ARREST_BORO=selected_boroughs_filter), offense_path
         )
 
         # Use filtered data for all demographic visualizations
-        df_to_analyze = filtered_df
+        data_to_analyze = filtered
+        tab_selections = {
+            "ARREST_BORO": selected_boroughs_filter,
+            **selected_offenses_filter,
+        }
     else:
         st.info("Select filters above to customize the demographic analysis")
-        df_to_analyze = df
+        data_to_analyze = planner.filter()
+        tab_selections = {}
+
+    # Charts that select values are not narrowed by their own selection
+    age_data = planner.filter("AGE_GROUP_CLEAN", **tab_selections)
+    race_data = planner.filter("PERP_RACE", **tab_selections)
 
     # Age group analysis
     col1, col2 = st.columns(2)
 
     with col1:
-        age_arrests = df_to_analyze["AGE_GROUP_CLEAN"].value_counts().reset_index()
-        age_arrests.columns = ["Age_Group", "Arrests"]
-
-        # Define distinct colors for age groups
-        age_colors = {
-            "18-24": "#FF5733",
-            "25-44": "#33FF57",
-            "45-64": "#3357FF",
-            "65+": "#F1C40F",
-            "<18": "#8E44AD",
-            "Unknown": "#1ABC9C",
-        }
+        selected_ages = planner.cross_filters.get("AGE_GROUP_CLEAN")
 
-        # Create the bar chart with different colors for each age group
-        fig_age = go.Figure()
-
-        for _, row in age_arrests.iterrows():
-            age_group = row["Age_Group"]
-            arrests = row["Arrests"]
-            color = age_colors.get(
-                age_group, "#E74C3C"
-            )  # Default to Red if age group not found
-
-            fig_age.add_trace(
-                go.Bar(
-                    x=[age_group],
-                    y=[arrests],
-                    name=age_group,
-                    marker_color=color,
-                    showlegend=False,
-                )
+        def build_age_chart() -> go.Figure:
+            age_arrests = planner.value_counts(age_data, "AGE_GROUP_CLEAN")
+            age_error_bars = count_error_bars(
+                planner.count_intervals(age_data, "AGE_GROUP_CLEAN"),
+                list(age_arrests.index),
             )
-
-        fig_age.update_layout(
-            title="Arrests by Age Group",
-            xaxis_title="Age Group",
-            yaxis_title="Number of Arrests",
-            height=400,
-            showlegend=False,
+            return age_bar_chart(age_arrests, age_error_bars, selected_ages)
+
+        charts.submit(
+            lambda: planner.figure(
+                age_data, "age_group", build_age_chart, selected=selected_ages
+            ),
+            error_message="Error creating age group analysis",
+            **chart_options("age_group"),
         )
-        st.plotly_chart(fig_age, use_container_width=True)
 
     with col2:
-        gender_arrests = df_to_analyze["PERP_SEX"].value_counts().reset_index()
-        gender_arrests.columns = ["Gender", "Arrests"]
 
-        # Define gender colors
-        gender_colors = {"M": "#0000FF", "F": "#FF0000", "UNKNOWN": "#00FF00"}
+        def build_gender_chart() -> go.Figure:
+            gender_arrests = planner.value_counts(
+                data_to_analyze, "PERP_SEX"
+            ).reset_index()
+            gender_arrests.columns = ["Gender", "Arrests"]
+
+            # Define gender colors
+            gender_colors = {"M": "#0000FF", "F": "#FF0000", "UNKNOWN": "#00FF00"}
+
+            # Create the pie chart with explicit color control using go.Figure
+            fig_gender = go.Figure(
+                data=[
+                    go.Pie(
+                        labels=gender_arrests["Gender"],
+                        values=gender_arrests["Arrests"],
+                        marker_colors=[
+                            gender_colors.get(gender, "#00FF00")
+                            for gender in gender_arrests["Gender"]
+                        ],
+                    )
+                ]
+            )
 
-        # Create the pie chart with explicit color control using go.Figure
-        fig_gender = go.Figure(
-            data=[
-                go.Pie(
-                    labels=gender_arrests["Gender"],
-                    values=gender_arrests["Arrests"],
-                    marker_colors=[
-                        gender_colors.get(gender, "#00FF00")
-                        for gender in gender_arrests["Gender"]
-                    ],
-                )
-            ]
-        )
+            fig_gender.update_layout(title="Arrest Distribution by Gender", height=400)
+            return fig_gender
 
-        fig_gender.update_layout(title="Arrest Distribution by Gender", height=400)
-        st.plotly_chart(fig_gender, use_container_width=True)
+        charts.submit(
+            lambda: planner.figure(data_to_analyze, "gender", build_gender_chart),
+            error_message="Error creating gender analysis",
+        )
 
     # Race analysis
-    race_arrests = df_to_analyze["PERP_RACE"].value_counts().reset_index()
-    race_arrests.columns = ["Race", "Arrests"]
-
-    # Show top 10 races
-    top_races = race_arrests.head(10)
-
-    # Define distinct colors for races
-    race_colors = {
-        "BLACK": "#FF5733",
-        "WHITE": "#FFF0D0",
-        "HISPANIC": "#9D33FF",
-        "ASIAN": "#33FF57",
-        "OTHER": "#FFC733",
-        "UNKNOWN": "#FF33A8",
-        "AMERICAN INDIAN": "#334BFF",
-        "BLACK HISPANIC": "#FFC733",
-        "WHITE HISPANIC": "#33C1FF",
-        "ASIAN / PACIFIC ISLANDER": "#33FF57",
-        "AMERICAN INDIAN/ALASKAN NATIVE": "#334BFF",
-    }
+    selected_races = planner.cross_filters.get("PERP_RACE")
 
-    # Create the bar chart with different colors for each race
-    # Use Plotly Express for more reliable color handling
-    fig_race = px.bar(
-        top_races,
-        x="Race",
-        y="Arrests",
-        title="Top 10 Races by Number of Arrests",
-        color="Race",
-        color_discrete_map=race_colors,
-    )
+    def build_race_chart() -> go.Figure:
+        race_arrests = planner.value_counts(race_data, "PERP_RACE")
+
+        # Show top 10 races
+        top_races = race_arrests.head(10)
 
-    fig_race.update_layout(
-        xaxis_title="Race",
-        yaxis_title="Number of Arrests",
-        height=400,
-        showlegend=False,
+        # Confidence intervals of the counts in approximate query mode
+        race_error_bars = count_error_bars(
+            planner.count_intervals(race_data, "PERP_RACE"),
+            list(top_races.index),
+        )
+        return race_bar_chart(top_races, race_error_bars, selected_races)
+
+    charts.submit(
+        lambda: planner.figure(
+            race_data, "race", build_race_chart, selected=selected_races
+        ),
+        error_message="Error creating race analysis",
+        **chart_options("race"),
     )
 
-    # Ensure colors are applied correctly - force color assignment
-    for i, race in enumerate(top_races["Race"]):
-        if race in race_colors:
-            fig_race.data[i].marker.color = race_colors[race]
+    # Crosstabs over up to four demographic, offense and time dimensions
+    st.markdown("### Crosstabs")
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        crosstab_dimensions = st.multiselect(
+            "Dimensions:",
+            options=[column for column in CROSSTAB_DIMENSIONS if column in df.columns],
+            default=["PERP_RACE", "AGE_GROUP_CLEAN"],
+            format_func=lambda column: CROSSTAB_DIMENSIONS[column],
+            max_selections=MAX_CROSSTAB_DIMENSIONS,
+            key="crosstab_dimensions_select",
+            help="The last dimension becomes the columns of the table",
+        )
+    with col2:
+        normalizations = {
+            "Counts": False,
+            "Share of total": "all",
+            "Share of row": "index",
+            "Share of column": "columns",
+        }
+        crosstab_normalization = st.selectbox(
+            "Show:",
+            options=list(normalizations),
+            key="crosstab_normalize_select",
+        )
+    with col3:
+        crosstab_margins = st.checkbox(
+            "Totals", value=True, key="crosstab_margins_checkbox"
+        )
+
+    if crosstab_dimensions:
+        table = planner.crosstab(data_to_analyze, crosstab_dimensions).to_frame(
+            normalize=normalizations[crosstab_normalization],
+            margins=crosstab_margins,
+        )
+        table = table.rename_axis(
+            index=dimension_labels(table.index.names),
+            columns=dimension_labels([table.columns.name]).get(table.columns.name),
+        )
+        # Formatted by the browser; a Styler costs milliseconds per table on
+        # every rerun
+        table.columns = table.columns.astype(str)
+        if normalizations[crosstab_normalization]:
+            st.dataframe(
+                table * 100,
+                width="stretch",
+                column_config={
+                    column: st.column_config.NumberColumn(format="%.1f%%")
+                    for column in table.columns
+                },
+            )
         else:
-            # Fallback to cycling through colors
-            fallback_colors = [
-                "#FF5733",
-                "#33C1FF",
-                "#9D33FF",
-                "#33FF57",
-                "#FFC733",
-                "#FF33A8",
-                "#334BFF",
-            ]
-            fig_race.data[i].marker.color = fallback_colors[i % len(fallback_colors)]
+            st.dataframe(
+                table.round(),
+                width="stretch",
+                column_config={
+                    column: st.column_config.NumberColumn(format="localized")
+                    for column in table.columns
+                },
+            )
+        if planner.cube is None and WEIGHT_COLUMN in df.columns:
+            st.caption(
+                "Counts are weighted estimates for the whole selected date range"
+            )
+    else:
+        st.info("Select at least one dimension to build a crosstab")
 
-    # Additional styling
-    fig_race.update_traces(marker_line_width=0, opacity=0.8)
+    # Chi-square and proportion tests over a stack of crosstabs, one per stratum
+    st.markdown("### Significance Tests")
+    # Defaults fall back to the first option for a source without the column
+    test_dimensions = [column for column in CROSSTAB_DIMENSIONS if column in df.columns]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        group_dimension = st.selectbox(
+            "Compare:",
+            options=test_dimensions,
+            index=(
+                test_dimensions.index("ARREST_BORO")
+                if "ARREST_BORO" in test_dimensions
+                else 0
+            ),
+            format_func=lambda column: CROSSTAB_DIMENSIONS[column],
+            key="significance_group_select",
+        )
+    with col2:
+        category_dimension = st.selectbox(
+            "Distribution of:",
+            options=test_dimensions,
+            index=(
+                test_dimensions.index("AGE_GROUP_CLEAN")
+                if "AGE_GROUP_CLEAN" in test_dimensions
+                else 0
+            ),
+            format_func=lambda column: CROSSTAB_DIMENSIONS[column],
+            key="significance_category_select",
+        )
+    with col3:
+        stratum_dimension = st.selectbox(
+            "For each:",
+            options=["None"] + test_dimensions,
+            index=(
+                1 + test_dimensions.index("OFNS_DESC")
+                if "OFNS_DESC" in test_dimensions
+                else 0
+            ),
+            format_func=lambda column: CROSSTAB_DIMENSIONS.get(column, column),
+            key="significance_stratum_select",
+        )
+    with col4:
+        correction_name = st.selectbox(
+            "Correction:",
+            options=list(CORRECTIONS),
+            key="significance_correction_select",
+        )
 
-    st.plotly_chart(fig_race, use_container_width=True)
+    test_columns = [group_dimension, category_dimension]
+    if stratum_dimension != "None":
+        test_columns = [stratum_dimension] + test_columns
+    if planner.cube is None and WEIGHT_COLUMN in df.columns:
+        st.info("Significance tests need exact counts and are not run on a sample")
+    elif len(set(test_columns)) < len(test_columns):
+        st.info("Select different dimensions to compare")
+    else:
+        counts = planner.crosstab(data_to_analyze, test_columns)
+        correction = CORRECTIONS[correction_name]
+        distributions = compare_distributions(counts, correction)
+        significant = int(distributions["Significant"].sum())
+        group_label = CROSSTAB_DIMENSIONS[group_dimension]
+        category_label = CROSSTAB_DIMENSIONS[category_dimension]
+        st.metric(
+            f"{category_label} distribution differs by {group_label.lower()}",
+            f"{significant:,} of {len(distributions):,}",
+            help=(
+                f"Chi-square tests of independence at the {SIGNIFICANCE_LEVEL:.0%} "
+                "level, after correcting for the number of tests"
+            ),
+        )
+        st.dataframe(
+            distributions.rename_axis(
+                index=dimension_labels(distributions.index.names)
+            ).assign(
+                **{"Low Expected Cells": distributions["Low Expected Cells"] * 100}
+            ),
+            width="stretch",
+            column_config={
+                "N": st.column_config.NumberColumn(format="localized"),
+                "Chi-Square": st.column_config.NumberColumn(format="%.1f"),
+                "P-Value": st.column_config.NumberColumn(format="%.2e"),
+                "Cramer's V": st.column_config.NumberColumn(format="%.3f"),
+                "Low Expected Cells": st.column_config.NumberColumn(format="%.0f%%"),
+                "Adjusted P-Value": st.column_config.NumberColumn(format="%.2e"),
+            },
+        )
+        st.caption(
+            "Tables with many cells expected below 5 arrests give unreliable p-values"
+        )
+
+        with st.expander(f"{category_label} shares by {group_label.lower()}"):
+            proportions = compare_proportions(counts, correction)
+            proportions = proportions[proportions["Significant"]].rename(
+                columns=dimension_labels(test_columns)
+            )
+            percent_columns = ["Share", "Share Elsewhere", "Difference"]
+            proportions[percent_columns] = proportions[percent_columns] * 100
+            st.dataframe(
+                proportions,
+                hide_index=True,
+                width="stretch",
+                column_config={
+                    "Share": st.column_config.NumberColumn(format="%.1f%%"),
+                    "Share Elsewhere": st.column_config.NumberColumn(format="%.1f%%"),
+                    "Difference": st.column_config.NumberColumn(format="%+.1f%%"),
+                    "Z": st.column_config.NumberColumn(format="%.2f"),
+                    "P-Value": st.column_config.NumberColumn(format="%.2e"),
+                    "Adjusted P-Value": st.column_config.NumberColumn(format="%.2e"),
+                },
+            )
+            st.caption(
+                f"Significant two-proportion tests of each {group_label.lower()} "
+                "against all others"
+            )
+
+    if owns_charts:
+        charts.render()
 
 
 def main() -> None:
@@ -1344,6 +2052,22 @@ def main() -> None:
             help="Select the end date for filtering arrests (inclusive)",
         )
 
+        approximate_mode = st.sidebar.checkbox(
+            "Approximate query mode",
+            value=False,
+            key="approximate_mode_checkbox",
+            help="Pick the smallest sample that meets an error target and show confidence intervals on the chart counts",
+        )
+        error_target = None
+        if approximate_mode:
+            error_target = st.sidebar.select_slider(
+                "Error Target (± share, percentage points):",
+                options=ERROR_TARGETS,
+                value=1.0,
+                key="error_target_slider",
+                help=f"Worst-case margin of error on the share of any borough, age group, race etc. at {CONFIDENCE_LEVEL:.0%} confidence. Looser targets load fewer rows and respond faster",
+            )
+
         # Sample size option for testing
         sample_size = st.sidebar.selectbox(
             "Sample Size:",
@@ -1365,6 +2089,22 @@ def main() -> None:
             index=0,
             key="sample_size_select",
             help="Number of rows to sample from the date-filtered data",
+            disabled=approximate_mode,
+        )
+
+        sampling_method = st.sidebar.selectbox(
+            "Sampling Method:",
+            options=["Uniform", "Stratified"],
+            index=0,
+            key="sampling_method_select",
+            help="Stratified sampling keeps a minimum number of rows for every borough and offense type and weights the counts accordingly",
+        )
+
+        optimize_memory = st.sidebar.checkbox(
+            "Optimize memory usage",
+            value=False,
+            key="optimize_memory_checkbox",
+            help="Downcast numeric columns, store low-cardinality text as categoricals and drop duplicated raw columns when loading",
         )
 
         if st.sidebar.button("Load Data", key="load_data_button"):
@@ -1378,16 +2118,59 @@ def main() -> None:
                 start_date = datetime.combine(start_date_str, datetime.min.time())
                 end_date = datetime.combine(end_date_str, datetime.max.time())
 
-                # Load full dataset only once (cached)
-                if "full_df" not in st.session_state:
+                # Load full dataset only once per source file and memory option (cached)
+                file_path = DATASET_FILE
+                source_version = fingerprint_source(file_path)
+                full_version = dataset_version(source_version, optimize_memory)
+                if st.session_state.get("full_version") != full_version:
                     st.session_state.full_df = load_full_nypd_data(
-                        "nypd_arrests_dataset.csv"
+                        file_path, source_version, optimize_memory
                     )
+                    st.session_state.full_version = full_version
+                    st.session_state.catalog = read_catalog(
+                        catalog_path(file_path), source_version, optimize_memory
+                    )
+
+                # Version token of the requested selection
+                data_version = derive_version(
+                    st.session_state.full_version,
+                    start_date=start_date,
+                    end_date=end_date,
+                    sample_size=sample_size if error_target is None else None,
+                    error_target=error_target,
+                    sample_seed=SAMPLE_SEED,
+                    sampling_method=sampling_method,
+                )
+
+                # Session cache of recent selections, held as row positions
+                if "selection_cache" not in st.session_state:
+                    st.session_state.selection_cache = SelectionCache()
 
                 # Apply filters and sampling to the cached full dataset
                 st.session_state.df = filter_and_sample_data(
-                    st.session_state.full_df, sample_size, start_date, end_date
+                    st.session_state.full_df,
+                    sample_size,
+                    start_date,
+                    end_date,
+                    date_index=cached_date_index(
+                        st.session_state.full_version, st.session_state.full_df
+                    ),
+                    sample_keys=cached_sample_keys(
+                        st.session_state.full_version, len(st.session_state.full_df)
+                    ),
+                    strata_codes=(
+                        cached_strata_codes(
+                            st.session_state.full_version, st.session_state.full_df
+                        )
+                        if sampling_method == "Stratified"
+                        else None
+                    ),
+                    selection_cache=st.session_state.selection_cache,
+                    cache_key=data_version,
+                    error_target=error_target,
                 )
+                st.session_state.data_version = data_version
+                st.session_state.date_range = (start_date, end_date)
 
                 # Store the filtered date range for display purposes
                 st.session_state.filtered_date_range = f"{start_date.strftime('%m/%d/%Y')} to {end_date.strftime('%m/%d/%Y')}"
@@ -1402,9 +2185,40 @@ def main() -> None:
             st.stop()
 
         df = st.session_state.df
+        data_version = st.session_state.data_version
+
+        # Exact chart counts from the count cube, unless approximate answers were requested
+        cube = None
+        if df.design is None:
+            full_cube = cached_count_cube(
+                st.session_state.full_version, st.session_state.full_df
+            )
+            if full_cube is not None:
+                cube = full_cube.date_slice(*st.session_state.date_range)
+
+        # One query layer per rerun, shared by all tabs
+        planner = QueryPlanner(
+            df,
+            data_version,
+            cube=cube,
+            bitmaps=cached_bitmap_index(
+                st.session_state.full_version, st.session_state.full_df
+            ),
+            catalog=st.session_state.get("catalog"),
+            date_index=cached_date_index(
+                st.session_state.full_version, st.session_state.full_df
+            ),
+            full_version=st.session_state.full_version,
+            cross_filters=active_cross_filters(),
+        )
 
         # Create dashboard sections
-        display_dataset_overview(df)
+        display_dataset_overview(
+            df,
+            data_version,
+            full_rows=len(st.session_state.full_df),
+            planner=planner,
+        )
 
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
@@ -0,0 +1,189 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from crosstab import Crosstab
+
+
+# Levels of the offense hierarchy, from the broadest to the most detailed.
+OFFENSE_LEVELS = ["LAW_CAT_CD", "OFNS_DESC", "PD_DESC"]
+
+# Levels the hierarchy needs at least; PD descriptions are optional.
+REQUIRED_OFFENSE_LEVELS = 2
+
+# Display names of the offense hierarchy levels.
+OFFENSE_LEVEL_NAMES = {
+    "LAW_CAT_CD": "Law Category",
+    "OFNS_DESC": "Offense",
+    "PD_DESC": "PD Description",
+}
+
+# Display names of the law categories.
+LAW_CATEGORY_NAMES = {
+    "F": "Felony",
+    "M": "Misdemeanor",
+    "V": "Violation",
+    "I": "Infraction",
+}
+
+
+@dataclass(frozen=True)
+class OffenseHierarchy:
+    """Arrest counts rolled up at every level of the offense hierarchy.
+
+    Attributes
+    ----------
+    rollups : Dict[str, pd.Series]
+        Per level, the arrests of every path from the top of the hierarchy down
+        to that level, e.g. for ``OFNS_DESC`` the counts indexed by (law
+        category, offense). Only paths with arrests are listed. The levels are
+        the leading ``OFFENSE_LEVELS`` the data has, see ``offense_levels``.
+    memo : Dict[Tuple, pd.Series]
+        Results of ``rollup`` by level and selection. A hierarchy is shared
+        across reruns, so a drill-down seen before is a dictionary lookup.
+
+    Purpose
+    -------
+    Offenses are not strictly nested: an offense description can be booked
+    as a felony or a misdemeanor, and a PD description under more than one
+    offense. Keeping the counts of whole paths, aggregated once per level,
+    lets a drill-down list the children of any selection and roll them up by
+    looking at a few hundred paths instead of scanning the arrests.
+    """
+
+    rollups: Dict[str, pd.Series]
+    memo: Dict[Tuple, pd.Series] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+
+    @property
+    def levels(self) -> List[str]:
+        """Levels of the hierarchy, from the broadest to the most detailed."""
+        return list(self.rollups)
+
+    def rollup(self, level: str, **ancestors: Optional[Sequence[str]]) -> pd.Series:
+        """Return the arrests per value of one level under the selected values.
+
+        Parameters
+        ----------
+        level : str
+            One of ``levels``.
+        **ancestors : Optional[Sequence[str]]
+            Selected values of other levels, usually the levels above
+            ``level``; None or a missing level means all values.
+
+        Returns
+        -------
+        pd.Series
+            Arrests indexed by the values of ``level``, in descending order.
+        """
+        key = (level,) + tuple(
+            (name, tuple(values))
+            for name, values in sorted(ancestors.items())
+            if values is not None
+        )
+        if key in self.memo:
+            return self.memo[key]
+
+        # The paths down to the deepest level involved carry every selection
+        depth = max(OFFENSE_LEVELS.index(name) for name in [level, *ancestors])
+        paths = self.rollups[OFFENSE_LEVELS[depth]]
+        mask = np.ones(len(paths), dtype=bool)
+        for ancestor, values in ancestors.items():
+            if values is not None:
+                mask &= paths.index.get_level_values(ancestor).isin(values)
+        counts = paths[mask].groupby(level=level).sum()
+        self.memo[key] = counts.sort_values(ascending=False, kind="stable")
+        return self.memo[key]
+
+    def children(self, level: str, **ancestors: Optional[Sequence[str]]) -> List[str]:
+        """Return the sorted values of one level under the selected values."""
+        return sorted(self.rollup(level, **ancestors).index)
+
+    def to_records(self) -> List[list]:
+        """Return the paths of the most detailed level as JSON-serializable rows."""
+        paths = self.rollups[self.levels[-1]]
+        return [list(path) + [int(count)] for path, count in paths.items()]
+
+
+def offense_levels(columns: Sequence[str]) -> Optional[List[str]]:
+    """Return the levels of the offense hierarchy a dataset has.
+
+    Parameters
+    ----------
+    columns : Sequence[str]
+        Columns of the dataset.
+
+    Returns
+    -------
+    Optional[List[str]]
+        The leading ``OFFENSE_LEVELS`` present in ``columns``, e.g. without
+        ``PD_DESC`` for a source without PD descriptions, or None if the
+        required levels are missing.
+    """
+    levels = []
+    for level in OFFENSE_LEVELS:
+        if level not in columns:
+            break
+        levels.append(level)
+    return levels if len(levels) >= REQUIRED_OFFENSE_LEVELS else None
+
+
+def _hierarchy_from_paths(paths: pd.Series) -> OffenseHierarchy:
+    """Roll up the counts of the most detailed paths to every level."""
+    levels = list(paths.index.names)
+    rollups = {}
+    for depth, level in enumerate(levels, start=1):
+        rollups[level] = paths.groupby(level=levels[:depth]).sum()
+    return OffenseHierarchy(rollups)
+
+
+def build_offense_hierarchy(counts: Crosstab) -> OffenseHierarchy:
+    """Build the offense hierarchy from a crosstab over its levels.
+
+    Parameters
+    ----------
+    counts : Crosstab
+        Counts over the levels from ``offense_levels``, in order, from
+        ``crosstab.cube_crosstab`` or ``crosstab.frame_crosstab``. Weighted
+        estimates are rounded.
+
+    Returns
+    -------
+    OffenseHierarchy
+        Rollups of the paths with arrests.
+    """
+    # Only the few paths with arrests are indexed, not every combination
+    arrests = np.rint(counts.counts).astype(np.int64)
+    codes = np.nonzero(arrests > 0)
+    index = pd.MultiIndex.from_arrays(
+        [level[level_codes] for level, level_codes in zip(counts.levels, codes)],
+        names=list(counts.dimensions),
+    )
+    return _hierarchy_from_paths(pd.Series(arrests[codes], index=index))
+
+
+def hierarchy_from_records(records: Optional[List[list]]) -> Optional[OffenseHierarchy]:
+    """Rebuild a hierarchy from ``OffenseHierarchy.to_records``, e.g. of a catalog."""
+    if records is None:
+        return None
+    levels = OFFENSE_LEVELS[: len(records[0]) - 1] if records else OFFENSE_LEVELS
+    frame = pd.DataFrame(records, columns=levels + ["count"])
+    paths = frame.set_index(levels)["count"].astype(np.int64)
+    return _hierarchy_from_paths(paths)
+
+
+def merge_hierarchies(
+    left: OffenseHierarchy, right: OffenseHierarchy
+) -> OffenseHierarchy:
+    """Add up the arrests of two hierarchies over the same levels.
+
+    E.g. the hierarchy of a dataset and that of rows appended to it; the
+    result equals the hierarchy of all the rows.
+    """
+    level = left.levels[-1]
+    paths = left.rollups[level].add(right.rollups[level], fill_value=0)
+    return _hierarchy_from_paths(paths.astype(np.int64))
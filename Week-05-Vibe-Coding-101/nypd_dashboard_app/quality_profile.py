@@ -0,0 +1,86 @@
+# Import libraries.
+import pandas as pd
+
+from typing import Any, Dict
+
+from dedupe import duplicate_counts
+
+
+def build_quality_report(df: pd.DataFrame) -> Dict[str, Any]:
+    """Compute the data quality metrics of a dataset in one pass over its columns.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataset, or a ``DataView`` of it. Columns are materialized one at a
+        time.
+
+    Returns
+    -------
+    Dict[str, Any]
+        JSON-serializable report with the number of rows, the duplicated rows
+        over all columns and over each of ``dedupe.DUPLICATE_SUBSETS``, and
+        per column the data type, missing values, distinct values and memory
+        in bytes.
+
+    Purpose
+    -------
+    The Dataset Information tab shows missing values, memory usage and
+    duplicate rows, in total and per column. Computing them together once per
+    data version, and at load time for the full dataset (stored in the
+    metadata catalog), lets the tab render them without scanning the data.
+    """
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        columns[column] = {
+            "dtype": str(series.dtype),
+            "nulls": int(series.isna().sum()),
+            "distinct": int(series.nunique()),
+            "bytes": int(series.memory_usage(index=False, deep=True)),
+        }
+    duplicates = duplicate_counts(df)
+    return {
+        "rows": len(df),
+        "duplicate_rows": duplicates["All columns"],
+        "duplicates": duplicates,
+        "columns": columns,
+    }
+
+
+def summarize_quality(report: Dict[str, Any]) -> Dict[str, int]:
+    """Sum the missing values and memory of a quality report over its columns."""
+    return {
+        "missing_values": sum(column["nulls"] for column in report["columns"].values()),
+        "memory_bytes": sum(column["bytes"] for column in report["columns"].values()),
+        "duplicate_rows": report["duplicate_rows"],
+    }
+
+
+def duplicates_frame(report: Dict[str, Any]) -> pd.DataFrame:
+    """Tabulate the duplicated rows per column subset of a quality report."""
+    rows = report["rows"]
+    duplicates = pd.Series(report["duplicates"], dtype="int64")
+    return pd.DataFrame(
+        {
+            "Columns Compared": duplicates.index,
+            "Duplicate Rows": duplicates.to_numpy(),
+            "Duplicate %": (100 * duplicates / max(rows, 1)).round(3).to_numpy(),
+        }
+    )
+
+
+def quality_frame(report: Dict[str, Any]) -> pd.DataFrame:
+    """Tabulate the per-column metrics of a quality report for display."""
+    rows = report["rows"]
+    frame = pd.DataFrame.from_dict(report["columns"], orient="index")
+    return pd.DataFrame(
+        {
+            "Column": frame.index,
+            "Data Type": frame["dtype"].to_numpy(),
+            "Non-Null Count": (rows - frame["nulls"]).to_numpy(),
+            "Missing Values": frame["nulls"].to_numpy(),
+            "Missing %": (100 * frame["nulls"] / max(rows, 1)).round(2).to_numpy(),
+            "Distinct Values": frame["distinct"].to_numpy(),
+        }
+    )
@@ -0,0 +1,439 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from bitmap_index import BitmapIndex, filter_view
+from catalog import catalog_offense_paths, catalog_options
+from count_cube import CountCube
+from crosstab import CROSSTAB_DIMENSIONS, Crosstab, cube_crosstab, cube_tile
+from data_layer import (
+    cached_code_matrix,
+    cached_count_intervals,
+    cached_count_tile,
+    cached_crosstab,
+    cached_distinct_values,
+    cached_figure,
+    cached_offense_hierarchy,
+    cached_row_count,
+    cached_sharded_crosstab,
+    cached_value_counts,
+    derive_version,
+)
+from offense_hierarchy import (
+    OffenseHierarchy,
+    build_offense_hierarchy,
+    hierarchy_from_records,
+    offense_levels,
+)
+from selection import WEIGHT_COLUMN, DataView
+from shard_aggregation import MIN_SHARD_ROWS
+
+# Dimensions of the count tile that answers chart counts, see
+# ``QueryPlanner.value_counts``. They are the chart and cross-filter columns,
+# whose few values make a tile of about a million counts.
+TILE_DIMENSIONS = [
+    "YEAR",
+    "MONTH",
+    "DAY_OF_WEEK",
+    "ARREST_BORO",
+    "AGE_GROUP_CLEAN",
+    "PERP_SEX",
+    "PERP_RACE",
+]
+
+
+@dataclass(frozen=True)
+class FilteredData:
+    """The loaded data narrowed by the selections of an analysis tab.
+
+    Attributes
+    ----------
+    source : Union[DataView, Callable[[], DataView]]
+        The filtered view, or a function that builds it on first use of
+        ``df``.
+    version : str
+        Version token of ``df``, the key of its cached aggregates.
+    filters : Dict[str, List[str]]
+        The selections that actually restrict the rows, by column. Columns
+        whose selection covers all of their values are left out.
+    """
+
+    source: Union[DataView, Callable[[], DataView]]
+    version: str
+    filters: Dict[str, List[str]] = field(default_factory=dict)
+
+    @cached_property
+    def df(self) -> DataView:
+        """The filtered view, built on first use.
+
+        Counts answered by the count cube never read it, so a selection in a
+        chart does not filter the rows of the dataset.
+        """
+        return self.source() if callable(self.source) else self.source
+
+
+class QueryPlanner:
+    """Shared query layer of one rerun of the dashboard.
+
+    Parameters
+    ----------
+    df : DataView
+        The session's loaded data.
+    data_version : str
+        Version token of ``df``.
+    cube : Optional[CountCube]
+        Count cube of the selected date range; when given, counts are answered
+        from it.
+    bitmaps : Optional[BitmapIndex]
+        Bitmap index of the full dataset, used to apply filters.
+    catalog : Optional[Dict[str, Any]]
+        Metadata catalog of the full dataset from ``catalog.read_catalog``.
+        Option lists are read from it instead of being computed from the data.
+    date_index : Optional[np.ndarray]
+        Sorted arrest dates of the full dataset from ``cached_date_index``, used
+        to find the date range of the loaded rows without scanning them.
+    full_version : Optional[str]
+        Version token of the full dataset ``df`` is a view of, the key of
+        aggregates of the whole dataset such as the catalog's offense paths.
+        Crosstabs of large views that the count cube does not answer are
+        counted in shards by the process pool of ``data_layer.shard_executor``
+        over the codes of that dataset.
+    cross_filters : Optional[Dict[str, List[Any]]]
+        Values selected in the charts, by column, from
+        ``cross_filter.active_cross_filters``. Every filter is narrowed to
+        them, except on the column of the chart it is drawn for.
+
+    Purpose
+    -------
+    The geographic, temporal and demographic tabs offer the same borough and
+    offense selections. A planner is created once per rerun and passed to all
+    tabs, so option lists and filtered views are computed once per distinct
+    selection. Selections that cover every option are dropped before
+    filtering, and a selection of "All" in every filter returns the loaded data
+    itself.
+    """
+
+    def __init__(
+        self,
+        df: DataView,
+        data_version: str,
+        cube: Optional[CountCube] = None,
+        bitmaps: Optional[BitmapIndex] = None,
+        catalog: Optional[Dict[str, Any]] = None,
+        date_index: Optional[np.ndarray] = None,
+        full_version: Optional[str] = None,
+        cross_filters: Optional[Dict[str, List[Any]]] = None,
+    ) -> None:
+        self.df = df
+        self.data_version = data_version
+        self.cube = cube
+        self.bitmaps = bitmaps
+        self.catalog = catalog
+        self.date_index = date_index
+        self.full_version = full_version
+        self.cross_filters = cross_filters or {}
+        self.hits = 0
+        self.misses = 0
+        self._options: Dict[str, List[str]] = {}
+        self._filtered: Dict[Tuple, FilteredData] = {}
+        self._cross_filtered_cube: Optional[CountCube] = None
+
+    def with_cross_filters(self, cross_filters: Dict[str, List[Any]]) -> "QueryPlanner":
+        """Return a planner of the same data narrowed to other cross-filters.
+
+        Used by a fragment rerun, which receives the planner of the last full
+        run: option lists are shared, filtered views are not. Returns this
+        planner if the cross-filters are unchanged.
+        """
+        if cross_filters == self.cross_filters:
+            return self
+        planner = QueryPlanner(
+            self.df,
+            self.data_version,
+            cube=self.cube,
+            bitmaps=self.bitmaps,
+            catalog=self.catalog,
+            date_index=self.date_index,
+            full_version=self.full_version,
+            cross_filters=cross_filters,
+        )
+        planner._options = self._options
+        return planner
+
+    def options(self, column: str) -> List[str]:
+        """Return the sorted distinct values of a column, as offered in selectboxes.
+
+        Values come from the catalog of the full dataset when it lists the
+        column, and are otherwise computed from the loaded data.
+        """
+        if column not in self._options:
+            options = catalog_options(self.catalog, column)
+            if options is None:
+                options = cached_distinct_values(self.data_version, self.df, column)
+            self._options[column] = options
+        return self._options[column]
+
+    def date_bounds(
+        self,
+    ) -> Optional[Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]]:
+        """Return the first and last arrest date of the loaded rows.
+
+        The full dataset is sorted by date and the loaded rows are sorted
+        positions into it, so the bounds are the dates of the first and last
+        row with a date, found in O(log n). Returns None without a date index;
+        the bounds are None if no loaded row has a date.
+        """
+        if self.date_index is None or len(self.df.source) != len(self.date_index):
+            return None
+        dated_rows = int(np.searchsorted(self.date_index, np.datetime64("NaT")))
+        rows = self.df.rows
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(len(self.date_index))
+            first, last = start, min(stop, dated_rows) - 1
+        elif len(rows) > 0:
+            first = int(rows[0])
+            last = int(rows[int(np.searchsorted(rows, dated_rows)) - 1])
+        else:
+            return None, None
+        if first > last or first >= dated_rows:
+            return None, None
+        return pd.Timestamp(self.date_index[first]), pd.Timestamp(self.date_index[last])
+
+    def filter(
+        self, except_column: Optional[str] = None, **selections: List[Any]
+    ) -> FilteredData:
+        """Return the loaded data narrowed to the selected values.
+
+        Parameters
+        ----------
+        except_column : Optional[str]
+            Column whose cross-filter is not applied, usually the column of
+            the chart drawn from the result, so that it keeps showing every
+            value while some are selected.
+        **selections : List[Any]
+            Selected values per column, e.g. ``ARREST_BORO=["K"]``.
+
+        Returns
+        -------
+        FilteredData
+            The filtered view with its version token, narrowed to the
+            cross-filters as well. Identical selections within a rerun return
+            the same object.
+        """
+        filters = {}
+        for column, values in sorted(selections.items()):
+            if not set(self.options(column)) <= set(values):
+                filters[column] = sorted(values)
+        for column, values in self.cross_filters.items():
+            if column == except_column:
+                continue
+            if column in filters:
+                allowed = set(values)
+                filters[column] = [
+                    value for value in filters[column] if value in allowed
+                ]
+            else:
+                filters[column] = sorted(values)
+        filters = dict(sorted(filters.items()))
+        key = tuple((column, tuple(values)) for column, values in filters.items())
+        if key in self._filtered:
+            self.hits += 1
+            return self._filtered[key]
+
+        self.misses += 1
+        if not filters:
+            filtered = FilteredData(self.df, self.data_version)
+        else:
+            filtered = FilteredData(
+                lambda: filter_view(self.df, self.bitmaps, **filters),
+                derive_version(self.data_version, **filters),
+                filters,
+            )
+        self._filtered[key] = filtered
+        return filtered
+
+    def _cube_for(self, data: FilteredData) -> Optional[CountCube]:
+        """Return the smallest count cube holding every row of a filter.
+
+        A filter narrowed to all the cross-filters is answered from the cells
+        that match them, selected once per rerun, instead of from every cell
+        of the date range: a new selection in a chart then costs one scan of
+        the cube, however many tables and tests it narrows.
+        """
+        if self.cube is None or not self.cross_filters:
+            return self.cube
+        for column, values in self.cross_filters.items():
+            if column not in data.filters or not set(data.filters[column]) <= set(
+                values
+            ):
+                return self.cube
+        if self._cross_filtered_cube is None:
+            self._cross_filtered_cube = self.cube.filtered(**self.cross_filters)
+        return self._cross_filtered_cube
+
+    def _cube_has(self, dimensions: List[str]) -> bool:
+        """Return whether the count cube has every dimension, or date attribute."""
+        return self.cube is not None and all(
+            dimension in self.cube.codes or dimension in self.cube.attributes
+            for dimension in dimensions
+        )
+
+    def tile(self, data: FilteredData) -> Optional[Crosstab]:
+        """Return the count tile of a filter, if the count cube can build one.
+
+        The tile counts the cube over ``TILE_DIMENSIONS`` under the filters on
+        other columns, i.e. the offense selections, and is kept across reruns
+        by ``cached_count_tile``. Filters on the tile dimensions, such as the
+        cross-filters, select from it instead, so a new selection in a chart
+        slices an array of about a million counts instead of scanning the
+        cube's cells.
+        """
+        if not self._cube_has(TILE_DIMENSIONS):
+            return None
+        filters = {
+            column: values
+            for column, values in data.filters.items()
+            if column not in TILE_DIMENSIONS
+        }
+        return cached_count_tile(
+            derive_version(self.data_version, tile=TILE_DIMENSIONS, **filters),
+            lambda: cube_tile(self.cube, TILE_DIMENSIONS, **filters),
+        )
+
+    def row_count(self, data: FilteredData) -> int:
+        """Return the number of arrests matching a filter."""
+        tile = self.tile(data)
+        if tile is not None:
+            return int(tile.total(**data.filters))
+        if self.cube is not None:
+            return self._cube_for(data).total(**data.filters)
+        return cached_row_count(data.version, data.df)
+
+    def estimated_count(self, data: FilteredData) -> Optional[float]:
+        """Return the estimated arrests of the whole date range matching a filter.
+
+        Returns the weighted count of an approximate-query sample, or None if
+        the data is not one and ``row_count`` is exact.
+        """
+        view = data.df
+        if not isinstance(view, DataView) or view.design is None:
+            return None
+        return float(view[WEIGHT_COLUMN].sum())
+
+    def value_counts(self, data: FilteredData, column: str) -> pd.Series:
+        """Count the values of one column for a chart.
+
+        Returns exact counts of the selected date range from the count tile
+        of the filter if the column is one of ``TILE_DIMENSIONS``, otherwise
+        from the count cube if there is one, otherwise ``cached_value_counts``
+        of the filtered data.
+        """
+        if column in TILE_DIMENSIONS:
+            tile = self.tile(data)
+            if tile is not None:
+                return tile.value_counts(column, **data.filters)
+        if self.cube is not None:
+            return self._cube_for(data).value_counts(column, **data.filters)
+        return cached_value_counts(data.version, data.df, column)
+
+    def crosstab(self, data: FilteredData, dimensions: List[str]) -> Crosstab:
+        """Cross-tabulate up to four columns of a filter's rows.
+
+        Returns exact counts of the selected date range from the count tile of
+        the filter if every dimension is one of ``TILE_DIMENSIONS``, otherwise
+        from the count cube if it has every dimension. Otherwise, views of at
+        least two shards, such as the weighted samples of approximate queries,
+        are counted by ``cached_sharded_crosstab`` over the shared codes of the
+        full dataset, and other views by ``cached_crosstab`` of the filtered
+        data.
+        """
+        if all(dimension in TILE_DIMENSIONS for dimension in dimensions):
+            tile = self.tile(data)
+            if tile is not None:
+                return tile.rollup(dimensions, **data.filters)
+        if self._cube_has(dimensions):
+            return cube_crosstab(self._cube_for(data), dimensions, **data.filters)
+        view = data.df
+        if (
+            self.full_version is not None
+            and isinstance(view, DataView)
+            and len(view) >= 2 * MIN_SHARD_ROWS
+            and all(dimension in CROSSTAB_DIMENSIONS for dimension in dimensions)
+            and all(dimension in view.columns for dimension in dimensions)
+        ):
+            matrix = cached_code_matrix(self.full_version, view.source)
+            return cached_sharded_crosstab(
+                data.version, matrix, view.rows, view.weights, tuple(dimensions)
+            )
+        return cached_crosstab(data.version, data.df, tuple(dimensions))
+
+    def offense_hierarchy(
+        self, data: Optional[FilteredData] = None
+    ) -> Optional[OffenseHierarchy]:
+        """Return the offense hierarchy of a filter's rows, or of the dataset.
+
+        Without ``data``, the paths offered in drill-down selectboxes are
+        returned: from the catalog of the full dataset when it lists them, like
+        ``options``, otherwise from the loaded data. With ``data``, its counts
+        are rolled up from one ``crosstab`` over the ``offense_levels`` of the
+        data, i.e. from the count cube if there is one, and every drill-down
+        within the filter is answered from the result. Hierarchies are kept
+        across reruns by ``cached_offense_hierarchy``. Returns None if a
+        required level is missing from the data.
+        """
+        records = catalog_offense_paths(self.catalog) if data is None else None
+        if records is not None:
+            return cached_offense_hierarchy(
+                derive_version(
+                    self.full_version or self.data_version, offense_paths="catalog"
+                ),
+                lambda: hierarchy_from_records(records),
+            )
+        levels = offense_levels(self.df.columns)
+        if levels is None:
+            return None
+        # The options ignore the cross-filters, like ``options``
+        data = data or FilteredData(self.df, self.data_version)
+        return cached_offense_hierarchy(
+            data.version,
+            lambda: build_offense_hierarchy(self.crosstab(data, levels)),
+        )
+
+    def count_intervals(
+        self, data: FilteredData, column: str
+    ) -> Optional[pd.DataFrame]:
+        """Return the confidence intervals of the counts of one column, if any."""
+        return cached_count_intervals(data.version, data.df, column)
+
+    def figure(
+        self,
+        data: FilteredData,
+        chart_id: str,
+        build: Callable[[], Optional[go.Figure]],
+        **selections: Any,
+    ) -> Optional[go.Figure]:
+        """Return the figure of a chart drawn from ``data``, built at most once.
+
+        Parameters
+        ----------
+        data : FilteredData
+            The data the chart is drawn from; its version is part of the key.
+        chart_id : str
+            Name of the chart.
+        build : Callable[[], Optional[go.Figure]]
+            Builds the figure from ``data``; only called on a cache miss.
+        **selections : Any
+            Widget values that change the chart beyond ``data``.
+
+        Returns
+        -------
+        Optional[go.Figure]
+            The shared figure from ``cached_figure``.
+        """
+        token = derive_version(chart_id, **selections) if selections else ""
+        return cached_figure(data.version, chart_id, token, build)
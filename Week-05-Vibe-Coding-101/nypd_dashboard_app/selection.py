@@ -0,0 +1,539 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+
+# Seed of the per-row sampling priorities, fixed for reproducible samples.
+SAMPLE_SEED = 42
+
+# Columns whose combinations form the strata of the stratified sampler.
+STRATA_COLUMNS = ["ARREST_BORO", "OFNS_DESC"]
+
+# Rows guaranteed to every stratum (or all of its rows, if it has fewer).
+MIN_PER_STRATUM = 200
+
+# Column holding the inverse inclusion probability of each sampled row.
+WEIGHT_COLUMN = "SAMPLE_WEIGHT"
+
+# Memory budget of a session's cache of recent selections.
+SELECTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def sort_by_date(df: pd.DataFrame, date_column: str = "ARREST_DATE") -> pd.DataFrame:
+    """Sort a dataset by date so date ranges become contiguous row ranges.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset to sort.
+    date_column : str
+        Datetime column to sort on.
+
+    Returns
+    -------
+    pd.DataFrame
+        The dataset sorted by ``date_column`` with missing dates last and a fresh
+        RangeIndex. The dataset is returned unchanged if the column is missing.
+    """
+    if date_column not in df.columns:
+        return df
+    return df.sort_values(
+        date_column, kind="stable", na_position="last", ignore_index=True
+    )
+
+
+def build_date_index(
+    df: pd.DataFrame, date_column: str = "ARREST_DATE"
+) -> Optional[np.ndarray]:
+    """Build the date index of a dataset sorted by ``sort_by_date``.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset to index.
+    date_column : str
+        Datetime column the dataset is sorted on.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        The ``datetime64[ns]`` values of the column, or None if the column is
+        missing, not a datetime, or not sorted with missing dates last.
+
+    Purpose
+    -------
+    This function verifies the sort order once per data version. The returned
+    array is what ``date_range_slice`` binary-searches on every date change.
+    """
+    if date_column not in df.columns or not pd.api.types.is_datetime64_any_dtype(
+        df[date_column]
+    ):
+        return None
+    values = df[date_column].to_numpy(dtype="datetime64[ns]")
+    missing = np.isnat(values)
+    valid_count = len(values) - int(missing.sum())
+    if missing[:valid_count].any():
+        return None
+    valid = values[:valid_count]
+    if valid_count > 1 and not (valid[:-1] <= valid[1:]).all():
+        return None
+    return values
+
+
+def date_range_slice(
+    date_index: np.ndarray, start_date: datetime, end_date: datetime
+) -> slice:
+    """Return the row range holding the dates in ``[start_date, end_date]``.
+
+    Parameters
+    ----------
+    date_index : np.ndarray
+        Sorted date values from ``build_date_index``.
+    start_date : datetime
+        Start of the range (inclusive).
+    end_date : datetime
+        End of the range (inclusive).
+
+    Returns
+    -------
+    slice
+        Positional slice of the matching rows, found by binary search in
+        O(log n). Missing dates sort after every valid date and are excluded.
+    """
+    start = np.datetime64(pd.Timestamp(start_date), "ns")
+    end = np.datetime64(pd.Timestamp(end_date), "ns")
+    lower = int(np.searchsorted(date_index, start, side="left"))
+    upper = int(np.searchsorted(date_index, end, side="right"))
+    return slice(lower, max(lower, upper))
+
+
+def build_sample_keys(n_rows: int, seed: int = SAMPLE_SEED) -> np.ndarray:
+    """Assign every row of a dataset a unique random sampling priority.
+
+    Parameters
+    ----------
+    n_rows : int
+        Number of rows of the dataset.
+    seed : int
+        Seed of the random permutation.
+
+    Returns
+    -------
+    np.ndarray
+        A random permutation of ``0 .. n_rows - 1`` as int32; entry ``i`` is the
+        priority of row ``i``.
+
+    Purpose
+    -------
+    A uniform sample of size n from any set of rows is the n rows with the
+    lowest priority. Because the priorities are fixed, samples are reproducible
+    and nested: the 100k sample is contained in the 500k sample of the same
+    selection.
+    """
+    return np.random.default_rng(seed).permutation(n_rows).astype(np.int32)
+
+
+def sample_positions(
+    sample_keys: np.ndarray, rows: Union[slice, np.ndarray], sample_size: int
+) -> np.ndarray:
+    """Select the ``sample_size`` lowest-priority rows of a selection.
+
+    Parameters
+    ----------
+    sample_keys : np.ndarray
+        Per-row priorities from ``build_sample_keys``.
+    rows : Union[slice, np.ndarray]
+        The selected rows, as a positional slice or an array of positions.
+    sample_size : int
+        Number of rows to sample.
+
+    Returns
+    -------
+    np.ndarray
+        Sorted positions of the sampled rows. All selected rows are returned if
+        the selection has no more than ``sample_size`` rows.
+    """
+    if isinstance(rows, slice):
+        positions = np.arange(*rows.indices(len(sample_keys)))
+    else:
+        positions = np.asarray(rows)
+    if sample_size >= len(positions):
+        return positions
+    keys = sample_keys[rows]
+    chosen = np.argpartition(keys, sample_size - 1)[:sample_size]
+    return np.sort(positions[chosen])
+
+
+def build_strata_codes(
+    df: pd.DataFrame, columns: Optional[List[str]] = None
+) -> Optional[np.ndarray]:
+    """Assign every row of a dataset the integer code of its stratum.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataset to stratify.
+    columns : Optional[List[str]]
+        Columns whose value combinations form the strata. Defaults to
+        ``STRATA_COLUMNS``.
+
+    Returns
+    -------
+    Optional[np.ndarray]
+        Stratum code of every row as int32, or None if a column is missing.
+    """
+    columns = columns if columns is not None else STRATA_COLUMNS
+    if any(col not in df.columns for col in columns):
+        return None
+    codes = df.groupby(columns, sort=False, observed=True, dropna=False).ngroup()
+    return codes.to_numpy(dtype=np.int32)
+
+
+def allocate_stratified(
+    stratum_sizes: np.ndarray, sample_size: int, min_per_stratum: int
+) -> np.ndarray:
+    """Split a sample size across strata with a guaranteed minimum per stratum.
+
+    Parameters
+    ----------
+    stratum_sizes : np.ndarray
+        Number of selected rows in each stratum.
+    sample_size : int
+        Total number of rows to sample. Raised to the number of non-empty
+        strata if it is smaller, since every stratum needs a row.
+    min_per_stratum : int
+        Rows guaranteed to each stratum, capped at its size. If the minimums
+        alone exceed the sample size, they are lowered to an equal share, but
+        never below one row.
+
+    Returns
+    -------
+    np.ndarray
+        Number of rows to sample from each stratum, summing to the (raised)
+        sample size, at most ``stratum_sizes.sum()``.
+
+    Purpose
+    -------
+    Rows beyond the minimums are allocated proportionally to the remaining rows
+    of each stratum, with largest-remainder rounding. A stratum without
+    sampled rows would be missing from every weighted count, so each
+    non-empty stratum gets at least one.
+    """
+    sizes = np.asarray(stratum_sizes, dtype=np.int64)
+    strata = np.count_nonzero(sizes)
+    sample_size = max(sample_size, strata)
+    if sample_size >= sizes.sum():
+        return sizes.copy()
+
+    floor = np.minimum(sizes, max(min_per_stratum, 1))
+    if floor.sum() > sample_size:
+        floor = np.minimum(sizes, sample_size // strata)
+
+    remaining = sample_size - floor.sum()
+    capacity = sizes - floor
+    share = remaining * capacity / capacity.sum()
+    allocation = floor + np.floor(share).astype(np.int64)
+    shortfall = int(sample_size - allocation.sum())
+    if shortfall > 0:
+        remainders = share - np.floor(share)
+        allocation[np.argsort(-remainders, kind="stable")[:shortfall]] += 1
+    return allocation
+
+
+def stratified_sample(
+    strata_codes: np.ndarray,
+    sample_keys: np.ndarray,
+    rows: Union[slice, np.ndarray],
+    sample_size: int,
+    min_per_stratum: int = MIN_PER_STRATUM,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Draw a stratified sample of a selection with per-row weights.
+
+    Parameters
+    ----------
+    strata_codes : np.ndarray
+        Per-row stratum codes from ``build_strata_codes``.
+    sample_keys : np.ndarray
+        Per-row priorities from ``build_sample_keys``.
+    rows : Union[slice, np.ndarray]
+        The selected rows, as a positional slice or an array of positions.
+    sample_size : int
+        Total number of rows to sample; raised to one row per non-empty
+        stratum, see ``allocate_stratified``.
+    min_per_stratum : int
+        Rows guaranteed to each stratum, see ``allocate_stratified``.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Sorted positions of the sampled rows and their weights. The weight of a
+        row is the size of its stratum divided by the rows sampled from it.
+        Every non-empty stratum has a sampled row, so weighted counts are
+        unbiased estimates of the counts in the selection.
+
+    Purpose
+    -------
+    Uniform samples leave rare offenses and small boroughs with a handful of
+    rows. Within each stratum the lowest-priority rows are taken, so stratified
+    samples are reproducible like uniform ones.
+    """
+    if isinstance(rows, slice):
+        positions = np.arange(*rows.indices(len(sample_keys)))
+    else:
+        positions = np.asarray(rows)
+    codes = strata_codes[positions]
+    keys = sample_keys[positions]
+
+    sizes = np.bincount(codes)
+    allocation = allocate_stratified(sizes, sample_size, min_per_stratum)
+
+    # Group the selection by stratum, then take the lowest keys of each group
+    order = np.argsort(codes, kind="stable")
+    ends = np.cumsum(sizes)
+    chosen = []
+    for code in np.flatnonzero(allocation):
+        group = order[ends[code] - sizes[code] : ends[code]]
+        take = allocation[code]
+        if take < len(group):
+            group = group[np.argpartition(keys[group], take - 1)[:take]]
+        chosen.append(group)
+    chosen = np.sort(np.concatenate(chosen)) if chosen else np.array([], np.int64)
+
+    weights = sizes[codes[chosen]] / allocation[codes[chosen]]
+    return positions[chosen], weights
+
+
+@dataclass(frozen=True)
+class SampleDesign:
+    """How a sample was drawn, as needed to put error bounds on its estimates.
+
+    Attributes
+    ----------
+    population : int
+        Number of rows of the date-filtered selection the sample was drawn from.
+    sample_rows : int
+        Number of rows in the sample.
+    stratified : bool
+        Whether the sample was drawn per stratum of ``STRATA_COLUMNS`` rather
+        than uniformly.
+    strata_codes : Optional[np.ndarray]
+        Per-row stratum codes of the full dataset from ``build_strata_codes``,
+        shared rather than copied, for a stratified sample.
+    stratum_sampled : Optional[np.ndarray]
+        Rows sampled from each stratum, indexed by stratum code.
+    stratum_population : Optional[np.ndarray]
+        Rows of the selection in each stratum, indexed by stratum code.
+
+    Purpose
+    -------
+    Any view narrowed from the sample is a domain of every stratum, so its
+    error bounds need the sizes of the whole strata, which the view itself no
+    longer shows once a filter cuts inside a stratum.
+    """
+
+    population: int
+    sample_rows: int
+    stratified: bool = False
+    strata_codes: Optional[np.ndarray] = field(default=None, compare=False, repr=False)
+    stratum_sampled: Optional[np.ndarray] = field(
+        default=None, compare=False, repr=False
+    )
+    stratum_population: Optional[np.ndarray] = field(
+        default=None, compare=False, repr=False
+    )
+
+
+@dataclass(frozen=True)
+class RowSelection:
+    """Rows of the full dataset selected by a date range and sample.
+
+    Attributes
+    ----------
+    rows : Union[slice, np.ndarray]
+        Positional slice, or sorted int32 positions, into the full dataset.
+    weights : Optional[np.ndarray]
+        Per-row weights of a weighted sample, aligned with ``rows``.
+    design : Optional[SampleDesign]
+        Design of an approximate-query sample, whose counts get error bounds.
+    """
+
+    rows: Union[slice, np.ndarray]
+    weights: Optional[np.ndarray] = None
+    design: Optional[SampleDesign] = None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the selection's arrays."""
+        size = 0 if isinstance(self.rows, slice) else self.rows.nbytes
+        return size + (0 if self.weights is None else self.weights.nbytes)
+
+
+class DataView:
+    """A row selection of the shared full dataset, materialized column by column.
+
+    Parameters
+    ----------
+    source : pd.DataFrame
+        The full dataset. It is shared between sessions and never modified.
+    rows : Union[slice, np.ndarray]
+        Positional slice, or int32 positions, of the selected rows.
+    weights : Optional[np.ndarray]
+        Per-row weights of a weighted sample, exposed as ``WEIGHT_COLUMN``.
+    design : Optional[SampleDesign]
+        Design of the sample this view was taken from. Narrower views keep it,
+        since their estimates are domain estimates of the same sample.
+
+    Purpose
+    -------
+    A session keeps only this view, i.e. 4 bytes per selected row, instead of a
+    copy of every column. Indexing the view by column name materializes just
+    that column; indexing it with a boolean mask returns a narrower view, so
+    ``df[df["ARREST_BORO"] == "S"]`` works as it does on a DataFrame.
+    """
+
+    def __init__(
+        self,
+        source: pd.DataFrame,
+        rows: Union[slice, np.ndarray],
+        weights: Optional[np.ndarray] = None,
+        design: Optional[SampleDesign] = None,
+    ) -> None:
+        self.source = source
+        self.rows = rows
+        self.weights = weights
+        self.design = design
+
+    @classmethod
+    def from_selection(
+        cls, source: pd.DataFrame, selection: RowSelection
+    ) -> "DataView":
+        """Create the view of a ``RowSelection`` of ``source``."""
+        return cls(source, selection.rows, selection.weights, selection.design)
+
+    def __len__(self) -> int:
+        if isinstance(self.rows, slice):
+            return len(range(*self.rows.indices(len(self.source))))
+        return len(self.rows)
+
+    @property
+    def columns(self) -> pd.Index:
+        """Column names, including ``WEIGHT_COLUMN`` for weighted views."""
+        if self.weights is None:
+            return self.source.columns
+        return self.source.columns.append(pd.Index([WEIGHT_COLUMN]))
+
+    @property
+    def dtypes(self) -> pd.Series:
+        """Data types of the columns, without materializing any data."""
+        dtypes = self.source.dtypes
+        if self.weights is not None:
+            dtypes = pd.concat(
+                [dtypes, pd.Series({WEIGHT_COLUMN: self.weights.dtype}, dtype=object)]
+            )
+        return dtypes
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the view itself, excluding the shared dataset."""
+        return RowSelection(self.rows, self.weights).nbytes
+
+    def positions(self) -> np.ndarray:
+        """Return the positions of the selected rows in the full dataset."""
+        if isinstance(self.rows, slice):
+            return np.arange(*self.rows.indices(len(self.source)), dtype=np.int32)
+        return self.rows
+
+    def column(self, name: str) -> pd.Series:
+        """Materialize one column of the selected rows with a fresh RangeIndex."""
+        if name == WEIGHT_COLUMN and self.weights is not None:
+            return pd.Series(self.weights, name=WEIGHT_COLUMN)
+        return pd.Series(self.source[name].array[self.rows], name=name)
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Materialize the given columns (default: all) of the selected rows."""
+        columns = list(self.columns) if columns is None else columns
+        return pd.DataFrame({name: self.column(name) for name in columns})
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """Materialize the first ``n`` selected rows."""
+        return self.subset(np.arange(min(n, len(self)))).to_frame()
+
+    def subset(self, rows: Union[np.ndarray, pd.Series]) -> "DataView":
+        """Return the view of a subset of this view's rows.
+
+        Parameters
+        ----------
+        rows : Union[np.ndarray, pd.Series]
+            Boolean mask over the view's rows, or positions within the view.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        weights = None if self.weights is None else self.weights[rows]
+        return DataView(self.source, self.positions()[rows], weights, self.design)
+
+    def __getitem__(
+        self, key: Union[str, List[str], np.ndarray, pd.Series]
+    ) -> Union[pd.Series, pd.DataFrame, "DataView"]:
+        if isinstance(key, str):
+            return self.column(key)
+        if isinstance(key, list):
+            return self.to_frame(key)
+        return self.subset(key)
+
+
+class SelectionCache:
+    """Least-recently-used cache of row selections with a memory budget.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Total size of the cached selections above which the least recently used
+        ones are evicted.
+
+    Purpose
+    -------
+    Selections are stored as row positions into the shared full dataset rather
+    than as DataFrame copies, so a session can keep many recent date range and
+    sample size combinations and switch back to them without recomputing.
+    """
+
+    def __init__(self, max_bytes: int = SELECTION_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, RowSelection]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[RowSelection]:
+        """Return a cached selection and mark it as recently used."""
+        selection = self._entries.get(key)
+        if selection is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return selection
+
+    def put(self, key: str, selection: RowSelection) -> None:
+        """Cache a selection, evicting least recently used ones to fit the budget."""
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key).nbytes
+        if selection.nbytes > self.max_bytes:
+            return
+        self._entries[key] = selection
+        self.nbytes += selection.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
@@ -0,0 +1,308 @@
+# Import libraries.
+import multiprocessing
+import os
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+from crosstab import Crosstab, _check_dimensions, count_combinations
+
+
+# Smallest number of rows per shard; shipping a smaller shard to a worker costs
+# more than counting it in place.
+MIN_SHARD_ROWS = 500_000
+
+# Worker processes of the aggregation pool, one per core by default.
+SHARD_WORKERS = os.cpu_count() or 1
+
+# Shared memory segments a worker keeps attached, most recently used last.
+MAX_ATTACHED_SEGMENTS = 4
+
+_attached: "OrderedDict[str, Tuple[shared_memory.SharedMemory, np.ndarray]]" = (
+    OrderedDict()
+)
+
+
+def _release(segment: shared_memory.SharedMemory) -> None:
+    """Free a shared memory segment owned by this process."""
+    try:
+        segment.unlink()
+        segment.close()
+    except (BufferError, FileNotFoundError):
+        pass
+
+
+class SharedCodeMatrix:
+    """Integer codes of the categorical columns of a dataset, in shared memory.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The full dataset.
+    columns : Sequence[str]
+        Columns to encode; columns missing from ``df`` are skipped.
+
+    Attributes
+    ----------
+    columns : List[str]
+        The encoded columns, one row of ``codes`` each.
+    levels : dict
+        Sorted values of each column, without missing values.
+    codes : np.ndarray
+        Array of shape ``(len(columns), len(df))`` with each row's code into
+        the levels of each column, -1 for missing values. It lives in a shared
+        memory segment named ``name``, freed with this object.
+
+    Purpose
+    -------
+    Worker processes attach the segment by name instead of receiving a copy of
+    the data, so a shard is sent to a worker as a row range (or the positions
+    of a view) and only its small partial counts come back. The columns are
+    factorized once per dataset version, and every crosstab afterwards is pure
+    integer work.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Sequence[str]) -> None:
+        self.columns = [column for column in columns if column in df.columns]
+        self.levels = {}
+        encoded = []
+        for column in self.columns:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            index = pd.Index(uniques, name=column)
+            if isinstance(index, pd.CategoricalIndex):
+                index = index.astype(index.categories.dtype)
+            self.levels[column] = index
+            encoded.append(codes)
+
+        # The smallest integer type that holds every column's codes
+        largest = max((len(index) for index in self.levels.values()), default=0)
+        dtype = np.int16 if largest <= np.iinfo(np.int16).max else np.int32
+        shape = (len(self.columns), len(df))
+        self._segment = shared_memory.SharedMemory(
+            create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        )
+        self.name = self._segment.name
+        self.codes = np.ndarray(shape, dtype=dtype, buffer=self._segment.buf)
+        for row, codes in enumerate(encoded):
+            self.codes[row] = codes
+        weakref.finalize(self, _release, self._segment)
+
+    @property
+    def n_rows(self) -> int:
+        """Number of rows of the encoded dataset."""
+        return self.codes.shape[1]
+
+
+def _attach(name: str, shape: Tuple[int, int], dtype: str) -> np.ndarray:
+    """Return the code matrix of a shared memory segment, attaching it once."""
+    if name in _attached:
+        _attached.move_to_end(name)
+        return _attached[name][1]
+    # Spawned workers share the resource tracker of the process that created
+    # the segment, which unlinks it
+    segment = shared_memory.SharedMemory(name=name)
+    codes = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+    _attached[name] = (segment, codes)
+    while len(_attached) > MAX_ATTACHED_SEGMENTS:
+        _, (stale, stale_codes) = _attached.popitem(last=False)
+        del stale_codes
+        try:
+            stale.close()
+        except BufferError:
+            pass
+    return codes
+
+
+def _count_rows(
+    codes: np.ndarray,
+    indices: Sequence[int],
+    shape: Tuple[int, ...],
+    rows: Union[slice, np.ndarray],
+    weights: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Count the (weighted) combinations of some code rows over a shard of columns."""
+    return count_combinations([codes[index, rows] for index in indices], shape, weights)
+
+
+def _count_shard(task: tuple) -> np.ndarray:
+    """Count one shard in a worker process, see ``ShardExecutor.count``."""
+    name, matrix_shape, dtype, indices, shape, rows, weights = task
+    return _count_rows(
+        _attach(name, matrix_shape, dtype), indices, shape, rows, weights
+    )
+
+
+def split_rows(
+    rows: Union[slice, np.ndarray], n_rows: int, shards: int
+) -> List[Union[slice, np.ndarray]]:
+    """Split a row selection into up to ``shards`` contiguous parts of equal size.
+
+    Parameters
+    ----------
+    rows : Union[slice, np.ndarray]
+        Positional slice or positions of the selected rows.
+    n_rows : int
+        Number of rows of the dataset the selection refers to.
+    shards : int
+        Largest number of parts; fewer are made so each part has at least
+        ``MIN_SHARD_ROWS`` rows.
+
+    Returns
+    -------
+    List[Union[slice, np.ndarray]]
+        Slices for a slice selection, position arrays otherwise.
+    """
+    if isinstance(rows, slice):
+        start, stop, step = rows.indices(n_rows)
+        if step != 1:
+            rows = np.arange(start, stop, step)
+        else:
+            count = max(stop - start, 0)
+            parts = max(1, min(shards, count // MIN_SHARD_ROWS))
+            bounds = np.linspace(start, stop, parts + 1).astype(np.int64)
+            return [slice(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+    parts = max(1, min(shards, len(rows) // MIN_SHARD_ROWS))
+    return np.array_split(rows, parts)
+
+
+def _shard_length(shard: Union[slice, np.ndarray]) -> int:
+    """Return the number of rows of a shard from ``split_rows``."""
+    if isinstance(shard, slice):
+        return shard.stop - shard.start
+    return len(shard)
+
+
+def split_weights(
+    weights: np.ndarray, shards: Sequence[Union[slice, np.ndarray]]
+) -> List[np.ndarray]:
+    """Split the weights of a row selection like the selection's shards.
+
+    ``weights`` is aligned with the selection, and ``split_rows`` keeps its
+    rows in order, so each shard's weights are the next run of its length.
+    """
+    bounds = np.cumsum([0] + [_shard_length(shard) for shard in shards])
+    return [weights[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def combine_partials(partials: Iterable[np.ndarray]) -> np.ndarray:
+    """Merge partial counts of disjoint shards by adding them.
+
+    Addition is associative and commutative, so partials can be merged in
+    any order or grouping, e.g. as they arrive from the workers.
+    """
+    total = None
+    for partial in partials:
+        total = partial.copy() if total is None else total + partial
+    return total
+
+
+class ShardExecutor:
+    """Process pool computing aggregates over shards of a shared code matrix.
+
+    Parameters
+    ----------
+    workers : Optional[int]
+        Number of worker processes; defaults to ``SHARD_WORKERS``. With a
+        single worker, everything is counted in the calling process.
+
+    Purpose
+    -------
+    ``np.bincount`` holds the GIL for its whole duration, so threads do not
+    spread counting over cores. The workers are separate processes,
+    started once with the ``spawn`` method, which is safe in a multithreaded
+    server, and reused for every query.
+    """
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers if workers is not None else SHARD_WORKERS
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        """Return the process pool, starting it on first use."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def count(
+        self,
+        matrix: SharedCodeMatrix,
+        dimensions: Sequence[str],
+        rows: Union[slice, np.ndarray] = slice(None),
+        weights: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Count every combination of some columns over a selection of rows.
+
+        Parameters
+        ----------
+        matrix : SharedCodeMatrix
+            Codes of the full dataset.
+        dimensions : Sequence[str]
+            Encoded columns to count.
+        rows : Union[slice, np.ndarray]
+            Positional slice or positions of the rows to count.
+        weights : Optional[np.ndarray]
+            Weight of each selected row, e.g. of an approximate-query sample;
+            each worker receives the weights of its shard.
+
+        Returns
+        -------
+        np.ndarray
+            Counts with one axis per dimension over its levels, as from
+            ``crosstab.count_combinations``, or weighted sums with weights.
+        """
+        indices = [matrix.columns.index(dimension) for dimension in dimensions]
+        shape = tuple(len(matrix.levels[dimension]) for dimension in dimensions)
+        shards = split_rows(rows, matrix.n_rows, self.workers)
+        shard_weights = (
+            [None] * len(shards) if weights is None else split_weights(weights, shards)
+        )
+        if len(shards) == 1:
+            return _count_rows(matrix.codes, indices, shape, shards[0], weights)
+        tasks = [
+            (
+                matrix.name,
+                matrix.codes.shape,
+                matrix.codes.dtype.str,
+                indices,
+                shape,
+                shard,
+                part_weights,
+            )
+            for shard, part_weights in zip(shards, shard_weights)
+        ]
+        return combine_partials(self._executor().map(_count_shard, tasks))
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def sharded_crosstab(
+    executor: ShardExecutor,
+    matrix: SharedCodeMatrix,
+    dimensions: Sequence[str],
+    rows: Union[slice, np.ndarray] = slice(None),
+    weights: Optional[np.ndarray] = None,
+) -> Crosstab:
+    """Cross-tabulate a selection of rows of a dataset across worker processes.
+
+    Returns the same counts as ``crosstab.frame_crosstab`` of the selected
+    rows, over the levels of the full dataset; values missing from the
+    selection have zero counts. With ``weights``, the rows of a weighted
+    sample count with their weight, as in ``frame_crosstab`` of the sample.
+    """
+    _check_dimensions(dimensions)
+    counts = executor.count(matrix, dimensions, rows, weights)
+    levels = tuple(matrix.levels[dimension] for dimension in dimensions)
+    return Crosstab(tuple(dimensions), levels, counts)
@@ -0,0 +1,253 @@
+# Import libraries.
+import numpy as np
+import pandas as pd
+
+from scipy.special import chdtrc, ndtr
+
+from crosstab import Crosstab
+
+
+# Significance level of the tests, applied to the corrected p-values.
+SIGNIFICANCE_LEVEL = 0.05
+
+# Multiple-comparison corrections, by display name.
+CORRECTIONS = {
+    "Benjamini-Hochberg (false discovery rate)": "fdr_bh",
+    "Holm (family-wise error)": "holm",
+    "Bonferroni (family-wise error)": "bonferroni",
+    "None": "none",
+}
+
+# Expected cell count below which the chi-square approximation is unreliable.
+MIN_EXPECTED_COUNT = 5
+
+
+def adjust_p_values(p_values: np.ndarray, method: str = "fdr_bh") -> np.ndarray:
+    """Correct a family of p-values for multiple comparisons.
+
+    Parameters
+    ----------
+    p_values : np.ndarray
+        Raw p-values of any shape; NaN marks tests that were not run and are
+        not counted in the family.
+    method : str
+        ``"fdr_bh"`` (Benjamini-Hochberg), ``"holm"``, ``"bonferroni"`` or
+        ``"none"``.
+
+    Returns
+    -------
+    np.ndarray
+        Adjusted p-values of the same shape, capped at 1.
+
+    Purpose
+    -------
+    The step-up and step-down procedures only need the p-values in sorted
+    order, so a whole family is corrected with one sort and a cumulative
+    minimum or maximum instead of a loop over tests.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    flat = p_values.ravel()
+    tested = np.flatnonzero(~np.isnan(flat))
+    m = len(tested)
+    adjusted = np.full(flat.shape, np.nan)
+    if m == 0 or method == "none":
+        adjusted[tested] = flat[tested]
+        return adjusted.reshape(p_values.shape)
+
+    order = tested[np.argsort(flat[tested], kind="stable")]
+    ranked = flat[order]
+    rank = np.arange(1, m + 1)
+    if method == "bonferroni":
+        values = ranked * m
+    elif method == "holm":
+        values = np.maximum.accumulate(ranked * (m - rank + 1))
+    elif method == "fdr_bh":
+        values = np.minimum.accumulate((ranked * m / rank)[::-1])[::-1]
+    else:
+        raise ValueError(f"Unknown correction: {method!r}")
+    adjusted[order] = np.minimum(values, 1.0)
+    return adjusted.reshape(p_values.shape)
+
+
+def chi_square_tests(tables: np.ndarray) -> pd.DataFrame:
+    """Run the chi-square test of independence on a stack of contingency tables.
+
+    Parameters
+    ----------
+    tables : np.ndarray
+        Counts of shape ``(K, R, C)``: K tables of R groups by C categories.
+        Empty rows and columns of a table are ignored.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per table with the number of counted rows ``N``, the
+        ``Chi-Square`` statistic, the degrees of freedom ``DoF``, the
+        ``P-Value``, the effect size ``Cramer's V`` and the share of non-empty
+        cells whose expected count is below ``MIN_EXPECTED_COUNT``. Tables with
+        fewer than two non-empty rows or columns have no p-value.
+    """
+    tables = np.asarray(tables, dtype=np.float64)
+    totals = tables.sum(axis=(1, 2))
+    row_totals = tables.sum(axis=2)
+    column_totals = tables.sum(axis=1)
+    expected = (
+        row_totals[:, :, None]
+        * column_totals[:, None, :]
+        / np.maximum(totals, 1)[:, None, None]
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0)
+    statistic = terms.sum(axis=(1, 2))
+
+    rows = (row_totals > 0).sum(axis=1)
+    columns = (column_totals > 0).sum(axis=1)
+    dof = np.maximum(rows - 1, 0) * np.maximum(columns - 1, 0)
+    testable = dof > 0
+    p_value = np.where(testable, chdtrc(np.maximum(dof, 1), statistic), np.nan)
+    smaller_side = np.maximum(np.minimum(rows, columns) - 1, 1)
+    cramers_v = np.where(
+        testable, np.sqrt(statistic / np.maximum(totals, 1) / smaller_side), np.nan
+    )
+    cells = np.maximum(rows * columns, 1)
+    low_expected = ((expected > 0) & (expected < MIN_EXPECTED_COUNT)).sum(axis=(1, 2))
+    return pd.DataFrame(
+        {
+            "N": totals.astype(np.int64),
+            "Chi-Square": statistic,
+            "DoF": dof,
+            "P-Value": p_value,
+            "Cramer's V": cramers_v,
+            "Low Expected Cells": low_expected / cells,
+        }
+    )
+
+
+def proportion_tests(tables: np.ndarray) -> pd.DataFrame:
+    """Compare each group's share of each category with the rest of its table.
+
+    Parameters
+    ----------
+    tables : np.ndarray
+        Counts of shape ``(K, R, C)``, as for ``chi_square_tests``.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per table, group and category (flattened in that order) with
+        the ``Share`` of the category within the group, its ``Share Elsewhere``
+        in the other groups of the table, the ``Difference``, the two-proportion
+        ``Z`` statistic and its two-sided ``P-Value``. Comparisons with an
+        empty side have no p-value.
+    """
+    tables = np.asarray(tables, dtype=np.float64)
+    group_totals = tables.sum(axis=2, keepdims=True)
+    category_totals = tables.sum(axis=1, keepdims=True)
+    totals = tables.sum(axis=(1, 2), keepdims=True)
+
+    inside = tables
+    outside = category_totals - tables
+    inside_n = np.broadcast_to(group_totals, tables.shape)
+    outside_n = np.broadcast_to(totals - group_totals, tables.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = inside / inside_n
+        share_elsewhere = outside / outside_n
+        pooled = category_totals / totals
+        standard_error = np.sqrt(pooled * (1 - pooled) * (1 / inside_n + 1 / outside_n))
+        z = (share - share_elsewhere) / standard_error
+    testable = (inside_n > 0) & (outside_n > 0) & (standard_error > 0)
+    p_value = np.where(testable, 2 * ndtr(-np.abs(z)), np.nan)
+    return pd.DataFrame(
+        {
+            "Share": share.ravel(),
+            "Share Elsewhere": share_elsewhere.ravel(),
+            "Difference": (share - share_elsewhere).ravel(),
+            "Z": np.where(testable, z, np.nan).ravel(),
+            "P-Value": p_value.ravel(),
+        }
+    )
+
+
+def _stacked_tables(crosstab: Crosstab) -> np.ndarray:
+    """Return the counts of a 2 or 3 dimensional crosstab as a stack of tables."""
+    if len(crosstab.dimensions) == 2:
+        return crosstab.counts[None, :, :]
+    if len(crosstab.dimensions) == 3:
+        return crosstab.counts
+    raise ValueError("Significance tests need a crosstab of 2 or 3 dimensions")
+
+
+def compare_distributions(
+    crosstab: Crosstab,
+    correction: str = "fdr_bh",
+    alpha: float = SIGNIFICANCE_LEVEL,
+) -> pd.DataFrame:
+    """Test whether groups differ in their distribution over categories.
+
+    Parameters
+    ----------
+    crosstab : Crosstab
+        Counts over (groups, categories), e.g. borough by age group, or over
+        (strata, groups, categories) to run one test per stratum, e.g. per
+        offense.
+    correction : str
+        Multiple-comparison correction across the strata, see
+        ``adjust_p_values``.
+    alpha : float
+        Significance level of the corrected p-values.
+
+    Returns
+    -------
+    pd.DataFrame
+        Output of ``chi_square_tests`` indexed by stratum, with the
+        ``Adjusted P-Value`` and whether the difference is ``Significant``,
+        sorted by adjusted p-value. Strata without rows are left out.
+    """
+    tables = _stacked_tables(crosstab)
+    results = chi_square_tests(tables)
+    if len(crosstab.dimensions) == 3:
+        results.index = pd.Index(crosstab.levels[0], name=crosstab.dimensions[0])
+    else:
+        results.index = pd.Index(["All"], name="Stratum")
+    results = results[results["N"] > 0]
+    results["Adjusted P-Value"] = adjust_p_values(results["P-Value"], correction)
+    results["Significant"] = results["Adjusted P-Value"] < alpha
+    return results.sort_values("Adjusted P-Value", kind="stable")
+
+
+def compare_proportions(
+    crosstab: Crosstab,
+    correction: str = "fdr_bh",
+    alpha: float = SIGNIFICANCE_LEVEL,
+) -> pd.DataFrame:
+    """Test every group's share of every category against the other groups.
+
+    Parameters
+    ----------
+    crosstab : Crosstab
+        Counts over (groups, categories) or (strata, groups, categories), as
+        for ``compare_distributions``.
+    correction : str
+        Multiple-comparison correction across all comparisons.
+    alpha : float
+        Significance level of the corrected p-values.
+
+    Returns
+    -------
+    pd.DataFrame
+        Output of ``proportion_tests`` with one column per crosstab dimension,
+        the ``Adjusted P-Value`` and ``Significant``, sorted by adjusted
+        p-value. Comparisons without a p-value are left out.
+    """
+    tables = _stacked_tables(crosstab)
+    results = proportion_tests(tables)
+    levels = list(crosstab.levels)
+    names = list(crosstab.dimensions)
+    if len(names) == 2:
+        levels, names = [pd.Index(["All"])] + levels, ["Stratum"] + names
+    grid = pd.MultiIndex.from_product(levels, names=names).to_frame(index=False)
+    results = pd.concat([grid, results], axis=1)
+    results = results[results["P-Value"].notna()].reset_index(drop=True)
+    results["Adjusted P-Value"] = adjust_p_values(results["P-Value"], correction)
+    results["Significant"] = results["Adjusted P-Value"] < alpha
+    return results.sort_values("Adjusted P-Value", kind="stable")